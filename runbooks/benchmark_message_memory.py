@@ -0,0 +1,72 @@
+"""
+Memory per chat message: the slotted ChatMessage/ChatMessageAgnostic against the previous __dict__-based versions,
+and what the render memo (see llm_utils.render_message) adds once a message has been sent to the LLM.
+
+Usage: python runbooks/benchmark_message_memory.py [num_messages]
+"""
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Optional
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.core.ChatMessage import ChatMessage, ChatMessageAgnostic
+from src.core.Constants import AgentName, Role
+from src.utils import llm_utils
+
+COT = "The user is greeting me, so I should greet them back."
+
+
+# The message types as they were before __slots__ (and before the render memo)
+@dataclass
+class DictChatMessage:
+    role: Role
+    cot: Optional[str]
+    content: Optional[str]
+    off_switch: Optional[bool]
+
+
+class DictChatMessageAgnostic:
+    def __init__(self, agent: AgentName, content: str):
+        self.agent = agent
+        self.content = content
+
+
+def measure_bytes_per_message(make_message, num_messages: int, render: Optional[Callable] = None) -> float:
+    """
+    Bytes allocated per message, not counting the message text (the contents are created up front and shared).
+    With render, each message is rendered once, so the bytes include its render memo.
+    """
+    contents = [f"Message number {i}, with a bit of text in it." for i in range(num_messages)]
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    messages = [make_message(i, contents[i]) for i in range(num_messages)]
+    if render is not None:
+        for message in messages:
+            render(message)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding the messages is the same for all variants
+    list_bytes = sys.getsizeof(messages)
+    return (after - before - list_bytes) / num_messages
+
+
+def main(num_messages: int) -> None:
+    agent_name = next(iter(AgentName))
+    user_message = lambda i, text: ChatMessage(role=Role.user, cot=None, content=text, off_switch=False)
+    assistant_message = lambda i, text: ChatMessage(role=Role.assistant, cot=COT, content=text, off_switch=False)
+    variants = [
+        ("ChatMessage (dict)", lambda i, text: DictChatMessage(role=Role.user, cot=None, content=text, off_switch=False), None),
+        ("ChatMessage (slots)", user_message, None),
+        ("ChatMessage (slots), rendered", user_message, lambda message: llm_utils.render_message(message, None)),
+        ("ChatMessage (slots), rendered with CoT", assistant_message, lambda message: llm_utils.render_message(message, message.cot)),
+        ("ChatMessageAgnostic (dict)", lambda i, text: DictChatMessageAgnostic(agent_name, text), None),
+        ("ChatMessageAgnostic (slots)", lambda i, text: ChatMessageAgnostic(agent_name, text), None),
+    ]
+    print(f"{num_messages} messages")
+    for name, make_message, render in variants:
+        print(f"{name:<40} {measure_bytes_per_message(make_message, num_messages, render):7.1f} bytes/message")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -83,6 +83,9 @@ class Presenter:
         # Create NPC instance using the provided class
         # Note: The NPC will automatically detect if it's a new game based on save file existence
         self.npc = npc_class(npc_name_for_template_and_save=npc_names[0], save_enabled=save_enabled)
+        # Save each turn as a delta rather than rewriting the whole save file
+        if save_enabled and hasattr(self.npc, "enable_journaled_saves"):
+            self.npc.enable_journaled_saves()
 
         # Set the events so they are non blocking until used
         self.response_finished_event.set()
@@ -1,57 +1,82 @@
 from dataclasses import dataclass, field
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Dict, List, Tuple
 
 from src.core.ResponseTypes import ChatResponse
 from src.core.Agent import Agent
 from src.core.schemas.CollectionSchemas import Entity
-from src.utils import Logger, Utilities
+from src.utils import Logger, Utilities, VectorUtils
+from src.utils.Logger import Level
 from src.utils.QdrantCollection import QdrantCollection
 from src.utils import io_utils
 
 
+# Shared by all brain memories: writes their queued memories in the background
+_write_behind_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="brain_memory_writes")
+
+
 class BrainMemory:
     collection: QdrantCollection
     TEST_DIMENSION: int = 1536
     collection_name: str
     save_enabled: bool
+    # Queue add_memory writes and upsert them in batches on a background thread. Queued memories are
+    # still returned by get_memories (searched locally), and maintain() flushes the queue
+    write_behind: bool = True
 
     def __init__(self, collection_name: str, save_enabled: bool = True):
         # Bind Qdrant collection wrapper to this NPC's brain collection
         self.collection_name = collection_name
         self.save_enabled = save_enabled
         self.collection = QdrantCollection(self.collection_name)
+        self._pending: Dict[int, Entity] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One batch is written at a time
+        self._flush_scheduled = False
         if save_enabled:
             self.collection.create(dim=self.TEST_DIMENSION)
 
     def maintain(self) -> None:
-        # Persist embedding cache associated with the collection
+        # Write queued memories, then persist embedding cache associated with the collection
         if self.save_enabled:
+            self.flush()
             self.collection.maintain()
 
+    def flush(self) -> None:
+        """Write all queued memories now"""
+        while self._write_pending_batch():
+            pass
+
     def add_memory(self, preprocessed_user_text: str):
         if not self.save_enabled:
             Logger.verbose(f"Saving disabled, skipping memory addition: {preprocessed_user_text}")
             return
             
-        rows = [
-            Entity(
-                key=preprocessed_user_text,
-                content=preprocessed_user_text,
-                tags=["memories"],
-                id=int(Utilities.generate_hash_int64(preprocessed_user_text)),
-            ),
-        ]
+        entity = Entity(
+            key=preprocessed_user_text,
+            content=preprocessed_user_text,
+            tags=["memories"],
+            id=int(Utilities.generate_hash_int64(preprocessed_user_text)),
+        )
         Logger.verbose(f"Updating memory with {preprocessed_user_text}")
-        self.collection.insert_dataclasses(rows)
+        if not self.write_behind:
+            self.collection.insert_dataclasses([entity])
+            return
+        with self._pending_lock:
+            self._pending[entity.id] = entity
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                _write_behind_executor.submit(self._flush_in_background)
 
     def get_memories(self, preprocessed_user_text: str, topk: int = 5, as_str: bool = False) -> Any:
         if not self.save_enabled:
             Logger.verbose(f"Saving disabled, returning empty memories for: {preprocessed_user_text}")
             return [] if not as_str else ""
             
-        hits = self.collection.search_text(preprocessed_user_text, topk=topk)
+        hits = self._merge_pending_hits(preprocessed_user_text, self.collection.search_text(preprocessed_user_text, topk=topk), topk)
         Logger.verbose(f"Found {len(hits)} memories for {preprocessed_user_text}")
         # Print the memories with their similarity scores
         # Sort the hits by similarity score
@@ -70,6 +95,7 @@ class BrainMemory:
             Logger.verbose("Saving disabled, returning empty memories list")
             return []
             
+        self.flush()
         all_memories = self.collection.export_entities()
         Logger.verbose(f"All memories:")
         return all_memories
@@ -105,5 +131,56 @@ class BrainMemory:
             Logger.verbose("Saving disabled, skipping memory clearing")
             return
             
-        self.collection.drop_if_exists()
-        self.collection.create(dim=self.TEST_DIMENSION)
\ No newline at end of file
+        with self._pending_lock:
+            self._pending.clear()
+        # Wait for a batch that is already being written, so it can't land in the new collection
+        with self._flush_lock:
+            self.collection.drop_if_exists()
+            self.collection.create(dim=self.TEST_DIMENSION)
+
+    # ---------- Write-behind queue ----------
+    def _write_pending_batch(self) -> bool:
+        """Write the queued memories as one batch. Returns False if nothing was queued."""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch = list(self._pending.values())
+            if not batch:
+                return False
+            self.collection.insert_dataclasses(batch)
+            with self._pending_lock:
+                for entity in batch:
+                    # Only drop entries that weren't re-queued (or cleared) while the batch was written
+                    if self._pending.get(entity.id) is entity:
+                        del self._pending[entity.id]
+            return True
+
+    def _flush_in_background(self) -> None:
+        while True:
+            with self._pending_lock:
+                if not self._pending:
+                    self._flush_scheduled = False
+                    return
+            try:
+                self._write_pending_batch()
+            except Exception as e:
+                # The memories stay queued and are re-tried by the next add_memory or flush
+                Logger.log(f"Failed to write queued memories to {self.collection_name}: {e}", Level.ERROR)
+                with self._pending_lock:
+                    self._flush_scheduled = False
+                return
+
+    def _merge_pending_hits(self, text: str, hits: List[Tuple[Entity, float]], topk: int) -> List[Tuple[Entity, float]]:
+        """Add queued (not yet written) memories to the search hits, scored the way the collection scores (cosine)"""
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        hit_ids = {hit[0].id for hit in hits}
+        pending = [entity for entity in pending if entity.id not in hit_ids]
+        if not pending:
+            return hits
+        query_embedding = self.collection.get_embedding(text)
+        pending_embeddings = self.collection.get_embeddings([entity.key for entity in pending])
+        pending_hits = [
+            (entity, float(VectorUtils.cosine_similarity(query_embedding, embedding)))
+            for entity, embedding in zip(pending, pending_embeddings)
+        ]
+        return sorted(hits + pending_hits, key=lambda hit: hit[1], reverse=True)[:topk]
\ No newline at end of file
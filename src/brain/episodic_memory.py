@@ -0,0 +1,131 @@
+"""
+Episodic memory: an index of past conversation exchanges that can be recalled verbatim.
+
+Once the conversation memory summarizes, the trimmed turns only survive as a lossy summary. The
+episodic memory keeps every completed exchange (the user message and the response, with their
+roles and off switches) and returns the ones most relevant to the current message, so prompts
+can keep a short live window and still recall specifics. Exchanges are embedded lazily, in one
+batch at the next search, so recording a turn never waits on the embedding model.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from src.core.ChatMessage import ChatMessage
+
+
+@dataclass
+class Episode:
+    turn: int  # Index of the exchange in the conversation, counting from 0
+    messages: List[ChatMessage]  # The user message and the response, as they appeared in the conversation
+
+    def to_text(self) -> str:
+        return "\n".join(f"{message.role.value}: {message.content}" for message in self.messages)
+
+
+class EpisodicMemory:
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], episodes: Optional[List[Episode]] = None, first_live_turn: int = 0):
+        """
+        Args:
+            embed_batch: Embeds several texts in one call (e.g. a collection's cached get_embeddings, so queries
+                already embedded for brain retrieval are reused)
+            episodes: Previously recorded episodes (e.g. from a save), re-embedded at the first search
+            first_live_turn: Turn of the first episode still in the live window (e.g. from a save, see link_live_window)
+        """
+        self.embed_batch = embed_batch
+        self.episodes: List[Episode] = list(episodes) if episodes else []
+        # Episodes from this turn on may still be in the live window; the ones before it were trimmed from it
+        self.first_live_turn = first_live_turn
+        self._lock = threading.Lock()
+        # Unit-normalized embeddings of episodes[:len(self._embeddings)]; the rest are embedded at the next search
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    def add_exchange(self, messages: List[ChatMessage]) -> Episode:
+        with self._lock:
+            episode = Episode(turn=len(self.episodes), messages=list(messages))
+            self.episodes.append(episode)
+        return episode
+
+    def track_live_window(self, live_window: List[ChatMessage]) -> int:
+        """
+        Advance first_live_turn past the episodes no longer in live_window (e.g. trimmed by summarization) and return it.
+        Episodes share their message objects with the live window, so this goes by identity, not by text.
+        """
+        live_ids = {id(message) for message in live_window}
+        with self._lock:
+            while self.first_live_turn < len(self.episodes) and id(self.episodes[self.first_live_turn].messages[-1]) not in live_ids:
+                self.first_live_turn += 1
+            return self.first_live_turn
+
+    def link_live_window(self, live_window: List[ChatMessage]) -> None:
+        """
+        Point the live episodes at live_window's messages. Call after loading a save, where the episodes and the
+        live window are loaded as separate objects. Live episodes appear in the window in order, as consecutive messages.
+        """
+        start = 0
+        with self._lock:
+            for episode in self.episodes[self.first_live_turn:]:
+                num_messages = len(episode.messages)
+                for position in range(start, len(live_window) - num_messages + 1):
+                    candidate = live_window[position:position + num_messages]
+                    if all(_same_message(a, b) for a, b in zip(candidate, episode.messages)):
+                        episode.messages = candidate
+                        start = position + num_messages
+                        break
+
+    def search(self, text: str, topk: int = 3, exclude_from_turn: Optional[int] = None) -> List[Episode]:
+        """
+        The topk episodes most similar to text, oldest first.
+
+        Args:
+            exclude_from_turn: Skip the episodes from this turn on (e.g. the live ones, see track_live_window)
+        """
+        with self._lock:
+            episodes = self.episodes if exclude_from_turn is None else self.episodes[:exclude_from_turn]
+        if not text or not episodes or topk <= 0:
+            return []
+
+        embeddings = self._embed_new_episodes()
+        turns = np.array([episode.turn for episode in episodes])
+        if len(embeddings) <= turns.max():
+            return []  # Cleared while embedding
+        query_embedding = self._normalize(np.asarray(self.embed_batch([text]), dtype=np.float32))[0]
+        similarities = embeddings[turns] @ query_embedding
+        best = np.argsort(-similarities)[:topk]
+        return sorted((episodes[i] for i in best), key=lambda episode: episode.turn)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.episodes = []
+            self.first_live_turn = 0
+            self._embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    # ---------- Helpers ----------
+    def _embed_new_episodes(self) -> np.ndarray:
+        """Embed the episodes recorded since the last search. Returns the embeddings of all of them."""
+        with self._lock:
+            episodes = self.episodes
+            start = len(self._embeddings)
+            new_episodes = episodes[start:]
+            if not new_episodes:
+                return self._embeddings
+        # The embedding call is a network round trip, so it runs without the lock and add_exchange never waits on it
+        new_embeddings = self._normalize(np.asarray(self.embed_batch([episode.to_text() for episode in new_episodes]), dtype=np.float32))
+        with self._lock:
+            if self.episodes is not episodes:
+                return self._embeddings  # Cleared meanwhile
+            # A concurrent search may have embedded some of them already
+            new_embeddings = new_embeddings[len(self._embeddings) - start:]
+            if len(new_embeddings):
+                self._embeddings = new_embeddings if len(self._embeddings) == 0 else np.vstack([self._embeddings, new_embeddings])
+            return self._embeddings
+
+    def _normalize(self, embeddings: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+
+def _same_message(a: ChatMessage, b: ChatMessage) -> bool:
+    return a.role == b.role and a.content == b.content and a.cot == b.cot
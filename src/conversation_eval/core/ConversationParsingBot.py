@@ -1,10 +1,13 @@
 
 
-from typing import List, Tuple
+from pathlib import Path
+from typing import Dict, List, Tuple
 from src.core.ResponseTypes import EvaluationResponse
 from src.core import Constants
 from src.core.Constants import Role, Constants, Llm
-from src.utils import io_utils, parsing_utils
+from src.utils import Logger, io_utils, llm_batch, parsing_utils
+from src.utils.Logger import Level
+from src.utils.llm_batch import BatchBackend, BatchRequest
 from src.utils.ChatBot import ChatBot
 from src.conversation_eval.core.EvalClasses import Proposition
 from src.core.TokenTracking import TokenCount
@@ -12,7 +15,7 @@ from src.core.TokenTracking import TokenCount
 class ConversationParsingBot:
 
     chat_bot: ChatBot = ChatBot
-    chat_bot.set_chat_model(Llm.gpt_4o_mini)
+    evaluator_model: Llm = Llm.gpt_4o_mini  # Passed per call, so evaluations never change the model other callers use
 
     @staticmethod
     def evaluate_conversation_timestamps(conversation_message_history: List[str], proposition: Proposition) -> Tuple[EvaluationResponse, TokenCount]:
@@ -22,6 +25,45 @@ class ConversationParsingBot:
         Returns:
             Tuple of (EvaluationResponse, TokenCount)
         """
+        evaluation_message_history = ConversationParsingBot.build_evaluation_messages(conversation_message_history, proposition)
+        response, token_count = ConversationParsingBot.chat_bot.call_llm(evaluation_message_history, None, ConversationParsingBot.evaluator_model)
+        responseObj = ConversationParsingBot.parse_evaluation_response(response)
+
+        return responseObj, token_count
+
+    @staticmethod
+    def evaluate_conversation_timestamps_batch(evaluation_requests: Dict[str, Tuple[List[str], Proposition]], batch_backend: BatchBackend, batch_work_dir: Path) -> Dict[str, Tuple[EvaluationResponse, TokenCount]]:
+        """
+        Evaluate many (conversation, proposition) pairs as one batch job.
+        Requests that fail or come back unparseable in the batch are re-run synchronously.
+
+        Args:
+            evaluation_requests: Map of request id -> (conversation message history, proposition)
+
+        Returns:
+            Map of request id -> (EvaluationResponse, TokenCount)
+        """
+        model = ConversationParsingBot.evaluator_model
+        batch_requests = [
+            BatchRequest(custom_id=request_id, model=model, messages=ConversationParsingBot.build_evaluation_messages(conversation, proposition))
+            for request_id, (conversation, proposition) in evaluation_requests.items()
+        ]
+        batch_results = llm_batch.run_batch(batch_requests, batch_backend, batch_work_dir)
+
+        evaluations = {}
+        for request_id, (conversation, proposition) in evaluation_requests.items():
+            batch_result = batch_results[request_id]
+            try:
+                if batch_result.response is None:
+                    raise Exception(batch_result.error)
+                evaluations[request_id] = (ConversationParsingBot.parse_evaluation_response(batch_result.response), batch_result.token_count)
+            except Exception as e:
+                Logger.log(f"Batch evaluation {request_id} failed ({e}), re-running it synchronously", Level.WARNING)
+                evaluations[request_id] = ConversationParsingBot.evaluate_conversation_timestamps(conversation, proposition)
+        return evaluations
+
+    @staticmethod
+    def build_evaluation_messages(conversation_message_history: List[str], proposition: Proposition) -> List[Dict[str, str]]:
         if proposition.antecedent is not None:
             evaluation_system_prompt_raw = "\n".join(io_utils.load_rules_from_file("evaluation_prompt.json", "Ruleset 5"))
             evaluation_system_prompt = evaluation_system_prompt_raw.replace(Constants.antecedent_placeholder, proposition.antecedent.value).replace(Constants.consequent_placeholder, proposition.consequent.value)
@@ -35,12 +77,11 @@ class ConversationParsingBot:
         {conversation_message_history_str}
         """
 
-        evaluation_message_history = [
+        return [
             {"role": Role.system.value, "content": evaluation_system_prompt},
             {"role": Role.user.value, "content": evaluation_user_prompt},
         ]
 
-        response, token_count = ConversationParsingBot.chat_bot.call_llm(evaluation_message_history)
-        responseObj = parsing_utils.extract_obj_from_json_str(response, EvaluationResponse, trim=True)
-
-        return responseObj, token_count
\ No newline at end of file
+    @staticmethod
+    def parse_evaluation_response(response: str) -> EvaluationResponse:
+        return parsing_utils.extract_obj_from_json_str(response, EvaluationResponse, trim=True)
@@ -7,6 +7,7 @@ from src.conversation_eval.core.EvalConvoMember import EvalConvoMember
 from src.core.ChatMessage import ChatMessageAgnostic
 from src.core.ResponseTypes import ChatResponse
 from src.npcs.npc_protocol import NPCProtocol
+from src.core.ModelPolicy import ModelPolicy
 
 DEBUG_LEVEL = ""
 
@@ -22,8 +23,8 @@ class EvalConversation:
         self.message_history = []
         self.agents = {}
 
-    def add_agent_simple(self, name: AgentName, agent_rules: List[str]):
-        agent = EvalConvoMember(name, "\n".join(agent_rules))
+    def add_agent_simple(self, name: AgentName, agent_rules: List[str], model_policy: Optional[ModelPolicy] = None):
+        agent = EvalConvoMember(name, "\n".join(agent_rules), model_policy=model_policy)
         self.agents[name] = agent
 
     def add_agent_with_npc_protocol(self, name: AgentName, agent_rules: List[str], npc_protocol: NPCProtocol) -> EvalConvoMember:
@@ -104,8 +105,5 @@ class EvalConversation:
         return message_history_list
 
     def get_message_history_as_string(self) -> str:
-        message_history_str = ""
-        for message in self.message_history:
-            message_history_str += f"{message.agent.value}: {message.content}\n"
-        return message_history_str
+        return "".join(f"{message.agent.value}: {message.content}\n" for message in self.message_history)
 
@@ -3,18 +3,19 @@ from src.core.Constants import AgentName, Role
 from src.npcs.npc_protocol import NPCProtocol
 from src.core.ResponseTypes import ChatResponse
 from src.npcs.npc0.npc0 import NPC0
+from src.core.ModelPolicy import ModelPolicy
 
 class EvalConvoMember:
     name: AgentName
     rules: str
     npc_protocol: NPCProtocol
 
-    def __init__(self, name: AgentName, rules: str, npc_protocol: Optional[NPCProtocol] = None):
+    def __init__(self, name: AgentName, rules: str, npc_protocol: Optional[NPCProtocol] = None, model_policy: Optional[ModelPolicy] = None):
         self.name = name
         self.rules = rules
         # If no NPC protocol provided, create a simple NPC0 with the rules as system prompt
         if npc_protocol is None:
-            self.npc_protocol = NPC0(system_prompt=rules)
+            self.npc_protocol = NPC0(system_prompt=rules, model_policy=model_policy)
         else:
             self.npc_protocol = npc_protocol
 
@@ -23,6 +24,10 @@ class EvalConvoMember:
         """Use NPC protocol to generate response"""
         return self.npc_protocol.chat(user_message)
 
+    async def achat(self, user_message: Optional[str]) -> ChatResponse:
+        """Use NPC protocol to generate response without blocking the event loop"""
+        return await self.npc_protocol.achat(user_message)
+
     def inject_message_to_npc(self, message: str, role: Role = Role.user) -> None:
         """Inject a message into the NPC's conversation history"""
         self.npc_protocol.inject_message(message, role)
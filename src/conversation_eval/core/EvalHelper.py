@@ -1,7 +1,8 @@
 from dataclasses import asdict
 import sys
 import json
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from statistics import mean
 
 
@@ -16,6 +17,7 @@ from src.conversation_eval.core.EvalReports import EvalReport, AssistantPromptEv
 from src.utils import Utilities, io_utils
 from src.utils import Logger
 from src.utils.Logger import Level
+from src.utils.llm_batch import BatchBackend
 
 # Notes:
 # - See runbooks/test.ipynb for sample usage
@@ -235,14 +237,29 @@ class EvalHelper:
             raise Exception("Unexpected fallthrough")
 
     @staticmethod
-    def run_evaluations_on_conversation(conversation_map: Dict[str, List[str]], evaluation_propositions: List[Proposition], eval_iterations_per_eval: int, eval_progress_callback=None) -> List[EvaluationEvalReport]:
+    def run_evaluations_on_conversation(conversation_map: Dict[str, List[str]], evaluation_propositions: List[Proposition], eval_iterations_per_eval: int, eval_progress_callback=None, batch_backend: Optional[BatchBackend] = None, batch_work_dir: Optional[Path] = None) -> List[EvaluationEvalReport]:
+        """
+        If batch_backend is given, all evaluation calls are submitted up front as one batch job
+        (cheaper, but results only arrive once the whole batch completes), then assembled into reports as usual.
+        """
         evaluation_reports = []
 
         Logger.log("∟ Evaluating conversations", Level.VERBOSE)
+
+        batch_evaluations = None
+        if batch_backend is not None:
+            evaluation_requests = {
+                EvalHelper.get_evaluation_request_id(proposition_idx, conversation_name, i): (conversation, evaluation_proposition)
+                for proposition_idx, evaluation_proposition in enumerate(evaluation_propositions)
+                for conversation_name, conversation in conversation_map.items()
+                for i in range(1, eval_iterations_per_eval + 1)
+            }
+            Logger.log(f"∟ Submitting {len(evaluation_requests)} evaluations as a batch", Level.VERBOSE)
+            batch_evaluations = ConversationParsingBot.evaluate_conversation_timestamps_batch(evaluation_requests, batch_backend, batch_work_dir)
             
         # Begin the evaluations
         Logger.increment_indent() # Begin evaluations section
-        for evaluation_proposition in evaluation_propositions:
+        for proposition_idx, evaluation_proposition in enumerate(evaluation_propositions):
             evaluation_report = EvaluationEvalReport(evaluation_proposition=evaluation_proposition, conversation_evaluations=[], result_score="", tokens=[])
             
             Logger.log(f"∟ Evaluating: {evaluation_proposition}", Level.VERBOSE)
@@ -260,7 +277,10 @@ class EvalHelper:
                     if eval_progress_callback:
                         eval_progress_callback(i, eval_iterations_per_eval)
                     
-                    timestamping_result, token_count = ConversationParsingBot.evaluate_conversation_timestamps(conversation, evaluation_proposition)
+                    if batch_evaluations is not None:
+                        timestamping_result, token_count = batch_evaluations[EvalHelper.get_evaluation_request_id(proposition_idx, conversation_name, i)]
+                    else:
+                        timestamping_result, token_count = ConversationParsingBot.evaluate_conversation_timestamps(conversation, evaluation_proposition)
                     # Print the result as a json
                     Logger.increment_indent() # Begin result section
                     Logger.log(json.dumps(timestamping_result.__dict__, indent=4), Level.VERBOSE)
@@ -290,6 +310,10 @@ class EvalHelper:
             evaluation_reports.append(evaluation_report)
         Logger.decrement_indent() # End evaluations section
         return evaluation_reports
+
+    @staticmethod
+    def get_evaluation_request_id(proposition_idx: int, conversation_name: str, iteration: int) -> str:
+        return f"prop{proposition_idx}|{conversation_name}|iter{iteration}"
     
     @staticmethod
     def validate_input(proposition: Proposition):
@@ -4,7 +4,8 @@ Orchestrates concurrent execution of evaluation cases and conversations
 """
 import sys
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Callable
+from pathlib import Path
+from typing import List, Dict, Callable, Optional, Tuple
 from dataclasses import dataclass
 
 sys.path.insert(0, "../..")
@@ -20,8 +21,11 @@ from src.conversation_eval.core.EvalReports import (
 from src.conversation_eval.core.EvalHelper import EvalHelper
 from src.core.Constants import AgentName
 from src.core.ResponseTypes import EvaluationResponse
+from src.core.ModelPolicy import ModelPolicy
+from src.core.TokenTracking import TokenCount
 from src.npcs.npc_protocol import NPCProtocol
 from src.utils import Utilities
+from src.utils.llm_batch import BatchBackend
 
 
 @dataclass
@@ -46,6 +50,7 @@ class ParallelEvalRunner:
     """
     Manages parallel execution of evaluation cases with real-time terminal updates.
     """
+    mock_user_model_policy: Optional[ModelPolicy] = None  # None follows ChatBot.default_chat_model
     
     @staticmethod
     def run_parallel_eval(
@@ -58,7 +63,9 @@ class ParallelEvalRunner:
         eval_cases: List[EvalCase],
         convos_per_user_prompt: int,
         eval_iterations_per_eval: int,
-        convo_length: int
+        convo_length: int,
+        batch_backend: Optional[BatchBackend] = None,
+        batch_work_dir: Optional[Path] = None
     ) -> EvalReport:
         """
         Run evaluation with parallel execution of cases and conversations.
@@ -74,6 +81,8 @@ class ParallelEvalRunner:
             convos_per_user_prompt: Number of conversations per case
             eval_iterations_per_eval: Number of evaluation iterations
             convo_length: Length of each conversation
+            batch_backend: If given, each case submits its evaluations as one batch job instead of calling the LLM directly
+            batch_work_dir: Directory for the batch request/result files
             
         Returns:
             Complete evaluation report
@@ -112,7 +121,9 @@ class ParallelEvalRunner:
                     mock_user_base_rules=mock_user_base_rules,
                     convos_per_user_prompt=convos_per_user_prompt,
                     eval_iterations_per_eval=eval_iterations_per_eval,
-                    convo_length=convo_length
+                    convo_length=convo_length,
+                    batch_backend=batch_backend,
+                    batch_work_dir=batch_work_dir
                 )
                 case_futures.append((case_idx, future))
             
@@ -158,7 +169,9 @@ class ParallelEvalRunner:
         mock_user_base_rules: List[str],
         convos_per_user_prompt: int,
         eval_iterations_per_eval: int,
-        convo_length: int
+        convo_length: int,
+        batch_backend: Optional[BatchBackend] = None,
+        batch_work_dir: Optional[Path] = None
     ) -> UserPromptEvalReport:
         """
         Run a single evaluation case with parallel conversations and evaluations.
@@ -176,6 +189,8 @@ class ParallelEvalRunner:
             convos_per_user_prompt: Number of conversations
             eval_iterations_per_eval: Number of evaluation iterations
             convo_length: Conversation length
+            batch_backend: Optional batch backend for the evaluations
+            batch_work_dir: Directory for the batch files
             
         Returns:
             User prompt evaluation report for this case
@@ -211,18 +226,34 @@ class ParallelEvalRunner:
         user_prompt_report.conversations = conversation_map
         
         # Step 2: Run evaluations in parallel (after all conversations complete)
-        evaluation_results = ParallelEvalRunner._run_evaluations_parallel(
-            case_idx=case_idx,
-            total_cases=total_cases,
-            conversation_map=conversation_map,
-            propositions=eval_case.propositions,
-            ui=ui,
-            test_name=test_name,
-            npc_type=npc_type,
-            convos_per_user_prompt=convos_per_user_prompt,
-            eval_iterations_per_eval=eval_iterations_per_eval,
-            convo_length=convo_length
-        )
+        if batch_backend is not None:
+            evaluation_results = ParallelEvalRunner._run_evaluations_batch(
+                case_idx=case_idx,
+                total_cases=total_cases,
+                conversation_map=conversation_map,
+                propositions=eval_case.propositions,
+                ui=ui,
+                test_name=test_name,
+                npc_type=npc_type,
+                convos_per_user_prompt=convos_per_user_prompt,
+                eval_iterations_per_eval=eval_iterations_per_eval,
+                convo_length=convo_length,
+                batch_backend=batch_backend,
+                batch_work_dir=batch_work_dir
+            )
+        else:
+            evaluation_results = ParallelEvalRunner._run_evaluations_parallel(
+                case_idx=case_idx,
+                total_cases=total_cases,
+                conversation_map=conversation_map,
+                propositions=eval_case.propositions,
+                ui=ui,
+                test_name=test_name,
+                npc_type=npc_type,
+                convos_per_user_prompt=convos_per_user_prompt,
+                eval_iterations_per_eval=eval_iterations_per_eval,
+                convo_length=convo_length
+            )
         
         # Add evaluation reports
         user_prompt_report.evaluations = evaluation_results
@@ -339,7 +370,7 @@ class ParallelEvalRunner:
         # Create conversation
         conversation = EvalConversation()
         conversation.add_agent_with_npc_protocol(AgentName.pat, assistant_rules, assistant_npc)
-        conversation.add_agent_simple(AgentName.mock_user, mock_user_base_rules + eval_case.goals)
+        conversation.add_agent_simple(AgentName.mock_user, mock_user_base_rules + eval_case.goals, ParallelEvalRunner.mock_user_model_policy)
         
         # Progress callback - tracks units completed
         # Each turn = 1 unit (since each side speaking is a turn)
@@ -429,21 +460,70 @@ class ParallelEvalRunner:
                     convo_eval_report = future.result()
                     evaluation_report.conversation_evaluations.append(convo_eval_report)
             
-            # Calculate result score (average of all conversation evaluations)
-            if evaluation_report.conversation_evaluations:
-                scores = [ce.result_score for ce in evaluation_report.conversation_evaluations]
-                evaluation_report.result_score = sum(scores) / len(scores)
-            
-            # Aggregate tokens from all conversation evaluations
-            all_tokens = []
-            for convo_eval in evaluation_report.conversation_evaluations:
-                all_tokens.extend(convo_eval.tokens)
-            evaluation_report.tokens = all_tokens
-            
+            ParallelEvalRunner._aggregate_evaluation_report(evaluation_report)
             evaluation_reports.append(evaluation_report)
         
         return evaluation_reports
     
+    @staticmethod
+    def _run_evaluations_batch(
+        case_idx: int,
+        total_cases: int,
+        conversation_map: Dict[str, List[str]],
+        propositions: List[Proposition],
+        ui: TableTerminalUI,
+        test_name: str,
+        npc_type: str,
+        convos_per_user_prompt: int,
+        eval_iterations_per_eval: int,
+        convo_length: int,
+        batch_backend: BatchBackend,
+        batch_work_dir: Optional[Path]
+    ) -> List[EvaluationEvalReport]:
+        """
+        Run all evaluations for a case as a single batch job, then build the same reports as _run_evaluations_parallel.
+        
+        Returns:
+            List of evaluation reports
+        """
+        conversation_units = convos_per_user_prompt * convo_length * 2
+        ui.update_progress(test_name, case_idx, total_cases, npc_type, conversation_units, "eval")
+        
+        evaluation_requests = {
+            EvalHelper.get_evaluation_request_id(proposition_idx, conversation_name, i): (conversation, proposition)
+            for proposition_idx, proposition in enumerate(propositions)
+            for conversation_name, conversation in conversation_map.items()
+            for i in range(1, eval_iterations_per_eval + 1)
+        }
+        evaluations = ConversationParsingBot.evaluate_conversation_timestamps_batch(
+            evaluation_requests, batch_backend, batch_work_dir
+        )
+        
+        evaluation_reports = []
+        for proposition_idx, proposition in enumerate(propositions):
+            evaluation_report = EvaluationEvalReport(
+                evaluation_proposition=proposition,
+                conversation_evaluations=[],
+                result_score="",
+                tokens=[]
+            )
+            for conversation_name, conversation in conversation_map.items():
+                conversation_evaluations = [
+                    evaluations[EvalHelper.get_evaluation_request_id(proposition_idx, conversation_name, i)]
+                    for i in range(1, eval_iterations_per_eval + 1)
+                ]
+                evaluation_report.conversation_evaluations.append(
+                    ParallelEvalRunner._build_conversation_evaluation_report(
+                        conversation_name, conversation, proposition, conversation_evaluations
+                    )
+                )
+            ParallelEvalRunner._aggregate_evaluation_report(evaluation_report)
+            evaluation_reports.append(evaluation_report)
+        
+        total_units = conversation_units + eval_iterations_per_eval
+        ui.update_progress(test_name, case_idx, total_cases, npc_type, total_units, "saving")
+        return evaluation_reports
+    
     @staticmethod
     def _evaluate_single_conversation(
         case_idx: int,
@@ -464,23 +544,46 @@ class ParallelEvalRunner:
         Returns:
             Conversation evaluation report
         """
-        conversation_evaluation_report = ConversationEvaluationEvalReport(
-            conversation_name=conversation_name,
-            evaluation_iterations=[],
-            result_score=0,
-            tokens=[]  # Will be populated after all iterations
-        )
-        
+        evaluations = []
         for i in range(1, eval_iterations_per_eval + 1):
             # Update progress with units: conversation_units + eval iteration
             completed_units = conversation_units + i
             ui.update_progress(test_name, case_idx, total_cases, npc_type, completed_units, "eval")
             
             # Run evaluation
-            timestamping_result, token_count = ConversationParsingBot.evaluate_conversation_timestamps(
+            evaluations.append(ConversationParsingBot.evaluate_conversation_timestamps(
                 conversation, proposition
-            )
-            
+            ))
+        
+        # Mark as saving status when done evaluating
+        total_units = conversation_units + eval_iterations_per_eval
+        ui.update_progress(test_name, case_idx, total_cases, npc_type, total_units, "saving")
+        
+        return ParallelEvalRunner._build_conversation_evaluation_report(
+            conversation_name, conversation, proposition, evaluations
+        )
+    
+    @staticmethod
+    def _build_conversation_evaluation_report(
+        conversation_name: str,
+        conversation: List[str],
+        proposition: Proposition,
+        evaluations: List[Tuple[EvaluationResponse, TokenCount]]
+    ) -> ConversationEvaluationEvalReport:
+        """
+        Score the evaluation iterations of one conversation.
+        
+        Returns:
+            Conversation evaluation report
+        """
+        conversation_evaluation_report = ConversationEvaluationEvalReport(
+            conversation_name=conversation_name,
+            evaluation_iterations=[],
+            result_score=0,
+            tokens=[]  # Will be populated after all iterations
+        )
+        
+        for timestamping_result, token_count in evaluations:
             evaluation_result = EvalHelper.evaluate_result_from_timestamps(
                 timestamping_result, len(conversation), proposition
             )
@@ -494,10 +597,6 @@ class ParallelEvalRunner:
             
             conversation_evaluation_report.evaluation_iterations.append(evaluation_iteration_report)
         
-        # Mark as saving status when done evaluating
-        total_units = conversation_units + eval_iterations_per_eval
-        ui.update_progress(test_name, case_idx, total_cases, npc_type, total_units, "saving")
-        
         # Calculate result score (percentage of passed iterations)
         passed = sum(1 for ei in conversation_evaluation_report.evaluation_iterations 
                     if ei.result.value == "PASS")
@@ -510,4 +609,17 @@ class ParallelEvalRunner:
         conversation_evaluation_report.tokens = all_tokens
         
         return conversation_evaluation_report
-
+    
+    @staticmethod
+    def _aggregate_evaluation_report(evaluation_report: EvaluationEvalReport) -> None:
+        """Set the score and tokens of a proposition's report from its conversation evaluations."""
+        # Calculate result score (average of all conversation evaluations)
+        if evaluation_report.conversation_evaluations:
+            scores = [ce.result_score for ce in evaluation_report.conversation_evaluations]
+            evaluation_report.result_score = sum(scores) / len(scores)
+        
+        # Aggregate tokens from all conversation evaluations
+        all_tokens = []
+        for convo_eval in evaluation_report.conversation_evaluations:
+            all_tokens.extend(convo_eval.tokens)
+        evaluation_report.tokens = all_tokens
@@ -210,9 +210,9 @@ def _extract_propositions_scores_and_costs(report: dict) -> List[Tuple[str, floa
                 # Extract score
                 score = evaluation.get("result_score", 0.0)
                 
-                # Extract cost from tokens list
+                # Extract cost from tokens list (cached responses incurred no spend)
                 tokens_list = evaluation.get("tokens", [])
-                cost = sum(token.get("cost", 0.0) for token in tokens_list)
+                cost = sum(token.get("cost", 0.0) for token in tokens_list if not token.get("cached", False))
                 
                 propositions.append((prop_text, score, cost))
     
@@ -26,6 +26,9 @@ from src.core import proj_paths, proj_settings
 from src.core.JsonUtils import EnumEncoder
 from src.npcs.npc1.npc1 import NPCTemplate
 from src.utils import Logger
+from src.utils.ChatBot import ChatBot
+from src.utils.llm_batch import BatchBackend, LocalFileBatchBackend, OpenAIBatchBackend
+from src.utils.llm_transcript import LatencyModel, TranscriptMode
 from src.utils.Logger import Level
 import time
 import json
@@ -118,7 +121,7 @@ def create_npc_factory(npc_type: str, eval_dir: Path, config: TestConfig):
     return factory
 
 
-def run_single_test_for_npc(config_path: Path, npc_type: str, eval_dir: Path, run_folder: Path, ui: TableTerminalUI):
+def run_single_test_for_npc(config_path: Path, npc_type: str, eval_dir: Path, run_folder: Path, ui: TableTerminalUI, batch_backend: Optional[BatchBackend] = None):
     """Run a single test for a single NPC type using parallel execution"""
     test_name = config_path.stem
     
@@ -165,7 +168,9 @@ def run_single_test_for_npc(config_path: Path, npc_type: str, eval_dir: Path, ru
         eval_cases=test_suite.eval_cases,
         convos_per_user_prompt=config.convos_per_user_prompt,
         eval_iterations_per_eval=config.eval_iterations_per_eval,
-        convo_length=config.convo_length
+        convo_length=config.convo_length,
+        batch_backend=batch_backend,
+        batch_work_dir=run_folder / "batches"
     )
     
     # Save the report
@@ -181,10 +186,11 @@ def parse_arguments():
     """
     Parse command line arguments.
     
-    Format: run_tests.py <test_suite> [npc_type1 npc_type2 ...] [test_name]
+    Format: run_tests.py <test_suite> [npc_type1 npc_type2 ...] [test_name] [--flags]
     - First arg: test suite folder name (required, e.g., memory_wipe_tests)
     - If arg is valid NPC type (npc0, npc1, npc2): add to npc_list
-    - If arg is not NPC type: assume it's test_name
+    - If arg starts with "--": it's a flag, handled in main()
+    - Otherwise: assume it's test_name
     - Default: all NPCs, all tests
     
     Returns:
@@ -202,6 +208,8 @@ def parse_arguments():
     
     # Parse remaining arguments
     for arg in sys.argv[2:]:
+        if arg.startswith("--"):
+            continue
         if arg in valid_npc_types:
             npc_types.append(arg)
         else:
@@ -225,6 +233,14 @@ def main():
         print("  test_suite: name of test suite folder (e.g., memory_wipe_tests)")
         print("  npc_type: npc0, npc1, or npc2 (can specify multiple)")
         print("  test_name: (optional) specific test to run (without .json extension)")
+        print("  --llm-cache: (optional) serve repeated LLM requests from the on-disk response cache")
+        print("  --record-llm: (optional) record every LLM exchange to <test_suite>/transcripts/llm_transcript.jsonl")
+        print("  --replay-llm: (optional) answer LLM requests from the recorded transcript, with no network access")
+        print("  --replay-latency=<seconds|sampled>: (optional) synthetic latency for replayed responses")
+        print("  --rate-limit: (optional) throttle LLM calls to the per-model RPM/TPM budgets in Constants.LLM_RATE_LIMITS")
+        print("  --no-coalescing: (optional) give every conversation its own LLM sample, even for identical concurrent requests")
+        print("  --hedge: (optional) send a second copy of LLM requests that run past the model's p95 latency and use whichever answers first")
+        print("  --batch-eval[=openai|local]: (optional) submit evaluations through the OpenAI Batch API (half price, slower) or a local stand-in")
         print("\nExamples:")
         print("  python run_tests.py memory_wipe_tests                                 # Run all tests for all NPCs")
         print("  python run_tests.py memory_wipe_tests npc0                            # Run all tests for npc0")
@@ -261,6 +277,49 @@ def main():
             print(f"Error: No test configs found in {test_configs_dir}")
             sys.exit(1)
     
+    transcript_path = eval_dir / "transcripts" / "llm_transcript.jsonl"
+    if "--record-llm" in sys.argv and "--replay-llm" in sys.argv:
+        print("Error: --record-llm and --replay-llm are mutually exclusive")
+        sys.exit(1)
+    if "--record-llm" in sys.argv:
+        ChatBot.set_transcript(transcript_path, TranscriptMode.record)
+        print(f"🎙️  Recording LLM transcript to {transcript_path}")
+    elif "--replay-llm" in sys.argv:
+        latency_model = None
+        for arg in sys.argv:
+            if arg.startswith("--replay-latency="):
+                latency_value = arg.split("=", 1)[1]
+                latency_model = LatencyModel.sampled() if latency_value == "sampled" else LatencyModel.fixed(float(latency_value))
+        ChatBot.set_transcript(transcript_path, TranscriptMode.replay, latency_model=latency_model)
+        print(f"📼 Replaying LLM transcript from {transcript_path}")
+
+    if "--llm-cache" in sys.argv:
+        # Note: identical requests get identical responses, which reduces diversity across conversations
+        ChatBot.enable_response_cache()
+        print("💾 LLM response cache enabled")
+
+    if "--no-coalescing" in sys.argv:
+        ChatBot.set_request_coalescing(False)
+        print("🎲 Coalescing of identical concurrent LLM requests disabled")
+
+    if "--rate-limit" in sys.argv:
+        ChatBot.enable_rate_limiter()
+        print("🚦 LLM rate limiter enabled")
+
+    if "--hedge" in sys.argv:
+        ChatBot.enable_hedging()
+        print("🏁 Hedged LLM requests enabled")
+
+    batch_backend = None
+    for arg in sys.argv:
+        if arg == "--batch-eval" or arg.startswith("--batch-eval="):
+            batch_mode = arg.split("=", 1)[1] if "=" in arg else "openai"
+            if batch_mode not in ("openai", "local"):
+                print(f"Error: unknown batch mode '{batch_mode}' (expected openai or local)")
+                sys.exit(1)
+            batch_backend = OpenAIBatchBackend() if batch_mode == "openai" else LocalFileBatchBackend()
+            print(f"📦 Evaluations will be submitted as {batch_mode} batch jobs")
+
     npc_list_str = ", ".join(npc.upper() for npc in npc_types)
     print(f"\n🧪 Running {len(test_paths)} test(s) for {npc_list_str}")
     
@@ -338,7 +397,8 @@ def main():
                     npc_type,
                     eval_dir,
                     run_folder,
-                    ui
+                    ui,
+                    batch_backend
                 )
                 futures[future] = (test_path, npc_type)
         
@@ -357,6 +417,24 @@ def main():
     ui.move_cursor_to_end()
     
     print(f"\n🎉 All tests completed successfully!\n")
+
+    if ChatBot.response_cache is not None:
+        stats = ChatBot.response_cache.get_stats()
+        print(f"💾 LLM response cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, {stats['entries']} entries\n")
+
+    if ChatBot.rate_limiter is not None:
+        for model_name, stats in ChatBot.rate_limiter.get_stats().items():
+            if stats["throttled_requests"] or stats["rate_limit_errors"]:
+                print(f"🚦 {model_name}: {stats['throttled_requests']} requests throttled for {stats['total_wait_s']:.1f}s total, {stats['rate_limit_errors']} rate limit errors")
+        print()
+
+    if ChatBot.hedging is not None:
+        stats = ChatBot.hedging.get_stats()
+        print(f"🏁 Hedging: {stats['hedged_calls']} of {stats['calls']} LLM calls hedged, {stats['hedge_wins']} won by the hedge\n")
+
+    repair_stats = ChatBot.json_repair_stats
+    if repair_stats.repairs or repair_stats.failed_repairs:
+        print(f"🔧 Local JSON repair: {repair_stats.repairs} LLM retries saved (~{repair_stats.tokens_saved} tokens, ${repair_stats.cost_saved:.4f}), {repair_stats.failed_repairs} responses beyond repair\n")
     
     # Generate summary report
     print(f"📊 Generating summary report...")
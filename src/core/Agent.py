@@ -1,32 +1,50 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import json
-from typing import List, Type, TypeVar, Dict, Tuple
+from typing import List, Optional, Type, TypeVar, Dict, Tuple, Union
 
 from src.core.ChatMessage import ChatMessage
+from src.core.ContextPacker import ContextPacker, ContextSegment, DynamicContext, render_segments
+from src.core.HistoryPolicy import CotHistoryPolicy
+from src.core.ModelPolicy import FixedModel, ModelPolicy
 from src.core.ResponseTypes import ChatResponse
-from src.utils import Logger, llm_utils
+from src.utils import Logger, deadline, llm_utils, token_counter
 from src.core.Constants import Constants as constants, Role, Llm
 from src.utils.ChatBot import ChatBot
 from src.core.TokenTracking import TokenCount
+from src.core.ResponseStream import AsyncResponseStream, ResponseStream
 
 T = TypeVar('T')
 
 class Agent:
-    llm_model: Llm = None
+    model_policy: ModelPolicy
     
     response_type: Type[T]
     response_formatting_suffix: str = ""
 
     system_prompt: str
+    dynamic_context: DynamicContext = None  # Per-turn context (summaries, retrieved memories), sent after the history
+    context_packer: Optional[ContextPacker] = None  # Fits each request into a token budget (None sends everything)
+    cot_history_policy: CotHistoryPolicy  # Which past hidden thought processes are replayed in full
     user_prompt_wrapper: str = constants.user_message_placeholder
     last_token_count: TokenCount = None  # Track the most recent token count
 
-    def __init__(self, system_prompt: str, response_type: Type[T], llm_model: Llm = None):
+    def __init__(self, system_prompt: str, response_type: Type[T], llm_model: Llm = None, model_policy: Optional[ModelPolicy] = None, context_packer: Optional[ContextPacker] = None, cot_history_policy: Optional[CotHistoryPolicy] = None):
+        """
+        Args:
+            llm_model: Shorthand for a FixedModel policy. Without a model or policy the agent follows ChatBot.default_chat_model
+            model_policy: Chooses the model for each call (see ModelPolicy.py)
+            context_packer: Drops or truncates history and dynamic context that doesn't fit the model's token budget
+            cot_history_policy: Keeps only recent hidden thought processes in the replayed history (all of them by default).
+                The prompt tokens this saves are reported in last_token_count.cot_tokens_saved
+        """
         self.system_prompt = system_prompt
+        self.dynamic_context = None
         self.response_type = response_type
         if response_type not in [str, int, float, bool, None]:
             self.response_formatting_suffix = llm_utils.get_formatting_suffix(response_type)
-        self.llm_model = llm_model
+        self.model_policy = model_policy if model_policy is not None else FixedModel(llm_model)
+        self.context_packer = context_packer
+        self.cot_history_policy = cot_history_policy if cot_history_policy is not None else CotHistoryPolicy()
         self.last_token_count = None
 
     def chat_with_message(self, user_message: str) -> T:
@@ -34,42 +52,142 @@ class Agent:
         response_obj: T = self.chat_with_history([message])
         return response_obj
 
-    def chat_with_history(self, message_history: List[ChatMessage]) -> T:
+    def chat_with_history(self, message_history: List[ChatMessage], timeout_s: Optional[float] = None) -> T:
         """
         Chat with the LLM given a message history.
+
+        Args:
+            timeout_s: Optional budget for the call, including re-tries. An enclosing deadline (see deadline.py)
+                still applies if it is sooner. Raises DeadlineExceeded when it runs out.
         
         Returns:
             The response object. Token count is stored in self.last_token_count
         """
-        if self.system_prompt is None:
-            raise Exception("System prompt is required for agent chat")
-
-        chat_history_dict = llm_utils.convert_message_history_to_llm_format(message_history, include_hidden_details=True)
-
-        # Prepend the system prompt to the chat history
-        full_system_prompt = self.system_prompt + "\n\n" + self.response_formatting_suffix
-        full_message_history_dict = self._prepend_system_prompt(chat_history_dict, full_system_prompt)
-
-        # Wrap the latest user message if requested
-        if self.user_prompt_wrapper and message_history and message_history[-1].role == Role.user:
-            user_message = message_history[-1].content
-            user_prompt_wrapped = self.user_prompt_wrapper.replace(constants.user_message_placeholder, user_message)
-            full_message_history_dict[-1]["content"] = user_prompt_wrapped
+        model = self.model_policy.select_model()
+        full_message_history_dict, cot_tokens_saved = self._build_llm_request(message_history, model)
 
         # Call the LLM and append assistant response
         Logger.debug(f"Full message history dict:\n" + json.dumps(full_message_history_dict, indent=4))
-        response_obj, token_count = ChatBot.call_llm(full_message_history_dict, self.response_type, self.llm_model)
+        with deadline.deadline(timeout_s):
+            response_obj, token_count = ChatBot.call_llm(full_message_history_dict, self.response_type, model, self.model_policy.get_fallback_model())
         
         # Store the token count for retrieval
-        self.last_token_count = token_count
+        self.last_token_count = self._with_cot_savings(token_count, cot_tokens_saved)
         
         return response_obj
+
+    async def achat_with_history(self, message_history: List[ChatMessage], timeout_s: Optional[float] = None) -> T:
+        """
+        Async version of chat_with_history, for running many agent calls on one event loop.
+
+        Returns:
+            The response object. Token count is stored in self.last_token_count
+        """
+        model = self.model_policy.select_model()
+        full_message_history_dict, cot_tokens_saved = self._build_llm_request(message_history, model)
+
+        Logger.debug(f"Full message history dict:\n" + json.dumps(full_message_history_dict, indent=4))
+        with deadline.deadline(timeout_s):
+            response_obj, token_count = await ChatBot.call_llm_async(full_message_history_dict, self.response_type, model, self.model_policy.get_fallback_model())
+
+        self.last_token_count = self._with_cot_savings(token_count, cot_tokens_saved)
+
+        return response_obj
+
+    def stream_chat_with_history(self, message_history: List[ChatMessage]) -> ResponseStream[T]:
+        """
+        Streaming version of chat_with_history. Iterating the stream yields the text of the response's
+        "response" field as it is generated (the raw text for untyped agents).
+
+        Returns:
+            The stream. Once exhausted, stream.response holds the parsed response object and
+            the token count is stored in self.last_token_count
+        """
+        model = self.model_policy.select_model()
+        full_message_history_dict, cot_tokens_saved = self._build_llm_request(message_history, model)
+
+        Logger.debug(f"Full message history dict:\n" + json.dumps(full_message_history_dict, indent=4))
+        stream = ChatBot.stream_llm(full_message_history_dict, self.response_type, model)
+        stream.add_done_callback(lambda _: self._set_last_token_count(self._with_cot_savings(stream.token_count, cot_tokens_saved)))
+        return stream
+
+    def astream_chat_with_history(self, message_history: List[ChatMessage]) -> AsyncResponseStream[T]:
+        """Async version of stream_chat_with_history. Iterate the stream with async for."""
+        model = self.model_policy.select_model()
+        full_message_history_dict, cot_tokens_saved = self._build_llm_request(message_history, model)
+
+        Logger.debug(f"Full message history dict:\n" + json.dumps(full_message_history_dict, indent=4))
+        stream = ChatBot.astream_llm(full_message_history_dict, self.response_type, model)
+        stream.add_done_callback(lambda _: self._set_last_token_count(self._with_cot_savings(stream.token_count, cot_tokens_saved)))
+        return stream
     
         
     def update_system_prompt(self, system_prompt: str) -> None:
+        """The system prompt should stay byte-identical between turns; put anything that changes per turn in the dynamic context."""
         self.system_prompt = system_prompt
+
+    def update_dynamic_context(self, dynamic_context: DynamicContext) -> None:
+        """
+        Args:
+            dynamic_context: A string, or segments in priority order so a context packer can drop the least important parts first
+        """
+        self.dynamic_context = dynamic_context
     
 
     # ---------- Helpers ----------
+    def _set_last_token_count(self, token_count: TokenCount) -> None:
+        self.last_token_count = token_count
+
+    def _with_cot_savings(self, token_count: TokenCount, cot_tokens_saved: int) -> TokenCount:
+        # A copy, since token counts can be shared (e.g. by coalesced or cached responses)
+        if token_count is None or not cot_tokens_saved:
+            return token_count
+        return replace(token_count, cot_tokens_saved=cot_tokens_saved)
+
+    def _count_cot_tokens_saved(self, rewritten_cots: List[Tuple[str, str]], model: Llm) -> int:
+        # The rest of a message is the same either way, so its saving is the difference between its CoTs. Counted as
+        # message contents, which are cached (see token_counter), so each CoT is only encoded once across turns
+        return sum(
+            token_counter.count_tokens_for_message({"content": full_cot}, model) - token_counter.count_tokens_for_message({"content": replayed_cot}, model)
+            for full_cot, replayed_cot in rewritten_cots
+        )
+
+    def _build_llm_messages(self, message_history: List[ChatMessage], model: Optional[Llm] = None) -> List[Dict[str, str]]:
+        return self._build_llm_request(message_history, model)[0]
+
+    def _build_llm_request(self, message_history: List[ChatMessage], model: Optional[Llm] = None) -> Tuple[List[Dict[str, str]], int]:
+        """The messages to send, and the prompt tokens the CoT history policy saved in them"""
+        if self.system_prompt is None:
+            raise Exception("System prompt is required for agent chat")
+
+        model = model if model is not None else self.model_policy.select_model()
+        chat_history_dict, rewritten_cots = llm_utils.convert_message_history_with_cot_policy(message_history, include_hidden_details=True, cot_policy=self.cot_history_policy)
+        cot_tokens_saved = self._count_cot_tokens_saved(rewritten_cots, model)
+
+        # Prepend the system prompt to the chat history
+        full_system_prompt = self.system_prompt + "\n\n" + self.response_formatting_suffix
+        full_message_history_dict = self._prepend_system_prompt(chat_history_dict, full_system_prompt)
+
+        # Wrap the latest user message if requested
+        ends_with_user_message = bool(message_history) and message_history[-1].role == Role.user
+        if self.user_prompt_wrapper and ends_with_user_message:
+            user_message = message_history[-1].content
+            user_prompt_wrapped = self.user_prompt_wrapper.replace(constants.user_message_placeholder, user_message)
+            # A new dict, since the rendered history messages are the messages' read-only memos
+            full_message_history_dict[-1] = {**full_message_history_dict[-1], "content": user_prompt_wrapped}
+
+        if self.context_packer is not None:
+            system_message, history = full_message_history_dict[0], full_message_history_dict[1:]
+            return self.context_packer.pack(system_message, history, self.dynamic_context, ends_with_user_message, model), cot_tokens_saved
+
+        # Volatile context goes after the history (just before the latest user message), so the system prompt
+        # and the history form a stable prefix that the provider's prompt cache can reuse across turns
+        dynamic_context = self.dynamic_context if isinstance(self.dynamic_context, str) or self.dynamic_context is None else render_segments(self.dynamic_context)
+        if dynamic_context:
+            dynamic_context_message = {"role": Role.system.value, "content": dynamic_context}
+            insert_at = len(full_message_history_dict) - 1 if ends_with_user_message else len(full_message_history_dict)
+            full_message_history_dict.insert(insert_at, dynamic_context_message)
+        return full_message_history_dict, cot_tokens_saved
+
     def _prepend_system_prompt(self, chat_history_formatted: List[Dict[str, str]], system_prompt: str) -> List[Dict[str, str]]:
         return [{"role": Role.system.value, "content": system_prompt}] + chat_history_formatted
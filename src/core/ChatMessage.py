@@ -2,14 +2,36 @@ from typing import Optional
 from .Constants import AgentName, Role
 from dataclasses import dataclass
 
+# Sessions and eval runs hold very many messages, so the message types use __slots__ instead of a per-instance __dict__.
+# They stay plain objects rather than rows in an array-backed log: the same message objects are shared by identity
+# between the conversation memory, the episodic memory, the render memo and the save journal.
 @dataclass
 class ChatMessage:
+    __slots__ = ("role", "cot", "content", "off_switch", "_rendered")
     role: Role
     cot: Optional[str]
     content: Optional[str]
     off_switch: Optional[bool]
 
+    # The message's rendered content (see llm_utils.render_message) is memoized on the message, together with the CoT it
+    # was rendered with, so replaying a long history doesn't re-render it. Only the content string is kept, and only
+    # when it differs from the message's own content, so plain ASCII messages carry no memo at all. Only the latest
+    # rendering is kept, since a message's CoT only changes when the history policy starts digesting it. Editing a
+    # field clears the memo.
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name != "_rendered":
+            object.__setattr__(self, "_rendered", None)
+
+    def get_rendered(self, cot: Optional[str]) -> Optional[str]:
+        memo = getattr(self, "_rendered", None)
+        return memo[1] if memo is not None and memo[0] == cot else None
+
+    def set_rendered(self, cot: Optional[str], rendered_content: str) -> None:
+        object.__setattr__(self, "_rendered", (cot, rendered_content))
+
 class ChatMessageAgnostic:
+    __slots__ = ("agent", "content")
     agent: AgentName
     content: str
 
@@ -41,6 +41,19 @@ embedding_models = {
     ]
 }
 
+# Models that support a native JSON output mode (OpenAI response_format json_object, ollama format="json")
+json_mode_models = [
+    Llm.gpt_3_5_turbo,
+    Llm.gpt_4o_mini,
+    Llm.gpt_4o,
+    Llm.gpt_5_nano,
+    Llm.gpt_5_mini,
+    Llm.llama3,
+]
+
+# Cheapest low-latency model, for frequent small calls (NPC preprocessing, summaries, evaluations)
+fast_chat_model = Llm.gpt_4o_mini
+
 class EvaluationError(Enum):
     ANTECEDENT_UNEXPECTEDLY_OCCURRED = 0
     ANTECEDENT_UNEXPECTEDLY_DID_NOT_OCCUR = 1
@@ -55,17 +68,42 @@ class PassFail(Enum):
 # Pricing per 1M tokens (as of Nov 2024)
 # Source: OpenAI pricing page
 LLM_PRICING = {
-    Llm.gpt_4o_mini: {"input": 0.150, "output": 0.600},  # per 1M tokens
-    Llm.gpt_4o: {"input": 2.50, "output": 10.00},
+    Llm.gpt_4o_mini: {"input": 0.150, "cached_input": 0.075, "output": 0.600},  # per 1M tokens
+    Llm.gpt_4o: {"input": 2.50, "cached_input": 1.25, "output": 10.00},
     Llm.gpt_3_5_turbo: {"input": 0.50, "output": 1.50},
     Llm.gpt_3_5_turbo_instruct: {"input": 1.50, "output": 2.00},
-    Llm.o1: {"input": 15.00, "output": 60.00},
+    Llm.o1: {"input": 15.00, "cached_input": 7.50, "output": 60.00},
     # Placeholder pricing for models without official pricing
     Llm.gpt_5_nano: {"input": 0.10, "output": 0.40},
     Llm.gpt_5_mini: {"input": 0.20, "output": 0.80},
     Llm.llama3: {"input": 0.0, "output": 0.0},  # Local model, no cost
 }
 
+# Default per-model rate limits used by ChatBot.enable_rate_limiter (OpenAI usage tier 1).
+# Raise these to match the account's tier; models not listed here are not throttled.
+LLM_RATE_LIMITS = {
+    Llm.gpt_4o_mini: {"requests_per_minute": 500, "tokens_per_minute": 200_000},
+    Llm.gpt_4o: {"requests_per_minute": 500, "tokens_per_minute": 30_000},
+    Llm.gpt_3_5_turbo: {"requests_per_minute": 3_500, "tokens_per_minute": 200_000},
+    Llm.gpt_3_5_turbo_instruct: {"requests_per_minute": 3_500, "tokens_per_minute": 90_000},
+    Llm.o1: {"requests_per_minute": 500, "tokens_per_minute": 30_000},
+    Llm.gpt_5_nano: {"requests_per_minute": 500, "tokens_per_minute": 200_000},
+    Llm.gpt_5_mini: {"requests_per_minute": 500, "tokens_per_minute": 200_000},
+}
+
+# Default prompt token budgets used by ContextPacker (well below the context windows, to bound latency and cost per turn)
+LLM_PROMPT_TOKEN_BUDGETS = {
+    Llm.gpt_4o_mini: 16_000,
+    Llm.gpt_4o: 16_000,
+    Llm.gpt_3_5_turbo: 8_000,
+    Llm.gpt_3_5_turbo_instruct: 2_000,
+    Llm.o1: 16_000,
+    Llm.gpt_5_nano: 16_000,
+    Llm.gpt_5_mini: 16_000,
+    Llm.llama3: 4_000,
+}
+default_prompt_token_budget = 8_000
+
 class Constants:
     pass_name = "Pass"
     fail_name = "Fail"
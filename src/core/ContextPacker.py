@@ -0,0 +1,140 @@
+"""
+Fits an LLM request into a prompt token budget.
+
+The system prompt (with its formatting suffix) and the latest user message are always sent. The rest of
+the budget is filled by priority: the dynamic context segments in the order given (e.g. summary, then
+retrieved memories best first, then background knowledge), then the most recent turns of the history.
+Whatever doesn't fit is dropped (oldest turns first, lowest-ranked items first); segments marked
+truncate are cut short instead. Token counts come from token_counter's caches, so re-packing a growing
+conversation only encodes what is new.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from src.core.Constants import LLM_PROMPT_TOKEN_BUDGETS, Llm, Role, default_prompt_token_budget
+from src.utils import Logger
+from src.utils.token_counter import TOKENS_PER_MESSAGE, TOKENS_PER_REPLY, count_tokens_for_message, count_tokens_for_text
+
+
+@dataclass
+class ContextSegment:
+    """Part of an agent's dynamic context. Items are in priority order; lower-priority items are dropped first."""
+    name: str
+    items: List[str] = field(default_factory=list)
+    header: str = ""  # e.g. "Brain context:", only sent if at least one item is
+    truncate: bool = False  # Cut the last item that doesn't fit short, instead of dropping it (for long single items like a summary)
+
+    def render(self, items: Optional[List[str]] = None) -> str:
+        items = self.items if items is None else items
+        body = "\n".join(items)
+        return self.header + "\n" + body if self.header else body
+
+
+def render_segments(segments: List[ContextSegment]) -> str:
+    """The dynamic context as one string (segments without items are left out)"""
+    return "\n\n".join(segment.render() for segment in segments if segment.items)
+
+
+DynamicContext = Union[str, List[ContextSegment], None]
+
+
+class ContextPacker:
+    def __init__(self, token_budget: Optional[int] = None):
+        """
+        Args:
+            token_budget: Max prompt tokens per request. None uses the model's default from LLM_PROMPT_TOKEN_BUDGETS
+        """
+        self.token_budget = token_budget
+
+    def get_token_budget(self, model: Llm) -> int:
+        if self.token_budget is not None:
+            return self.token_budget
+        return LLM_PROMPT_TOKEN_BUDGETS.get(model, default_prompt_token_budget)
+
+    def pack(self, system_message: Dict[str, str], history: List[Dict[str, str]], dynamic_context: DynamicContext, ends_with_user_message: bool, model: Llm) -> List[Dict[str, str]]:
+        """
+        Build the request messages in the Agent's layout: system prompt, history, dynamic context, latest user message.
+
+        Args:
+            history: The formatted history, including the latest user message if ends_with_user_message
+        """
+        latest_user_message = history[-1] if ends_with_user_message else None
+        earlier_history = history[:-1] if ends_with_user_message else history
+
+        remaining = self.get_token_budget(model) - TOKENS_PER_REPLY - count_tokens_for_message(system_message, model)
+        if latest_user_message is not None:
+            remaining -= count_tokens_for_message(latest_user_message, model)
+        if remaining < 0:
+            Logger.warning(f"System prompt and latest user message alone exceed the {self.get_token_budget(model)} token budget")
+
+        dynamic_context_text, remaining = self._pack_segments(self._as_segments(dynamic_context), remaining, model)
+        kept_history, remaining = self._pack_history(earlier_history, remaining, model)
+        if len(kept_history) < len(earlier_history):
+            Logger.debug(f"Context packer dropped {len(earlier_history) - len(kept_history)} older messages to fit the token budget")
+
+        messages = [system_message] + kept_history
+        if dynamic_context_text:
+            messages.append({"role": Role.system.value, "content": dynamic_context_text})
+        if latest_user_message is not None:
+            messages.append(latest_user_message)
+        return messages
+
+    # ---------- Helpers ----------
+    def _as_segments(self, dynamic_context: DynamicContext) -> List[ContextSegment]:
+        if not dynamic_context:
+            return []
+        if isinstance(dynamic_context, str):
+            return [ContextSegment(name="context", items=[dynamic_context], truncate=True)]
+        return dynamic_context
+
+    def _pack_segments(self, segments: List[ContextSegment], remaining: int, model: Llm):
+        """Fill segments in priority order. Returns the rendered dynamic context and the remaining budget."""
+        # The dynamic context message's overhead, plus the blank lines between segments (generously counted)
+        remaining -= TOKENS_PER_MESSAGE
+        rendered: List[str] = []
+        for segment in segments:
+            kept_items: List[str] = []
+            segment_cost = (count_tokens_for_text(segment.header, model) + 2) if segment.header else 2
+            for item in segment.items:
+                # +1 for the newline before the item
+                item_cost = count_tokens_for_text(item, model) + 1
+                if segment_cost + item_cost <= remaining:
+                    kept_items.append(item)
+                    segment_cost += item_cost
+                elif segment.truncate and remaining - segment_cost - 1 > 0:
+                    truncated = self._truncate_to_tokens(item, remaining - segment_cost - 1, model)
+                    if truncated:
+                        kept_items.append(truncated)
+                        segment_cost += count_tokens_for_text(truncated, model) + 1
+                    break
+                else:
+                    break
+            if kept_items:
+                rendered.append(segment.render(kept_items))
+                remaining -= segment_cost
+        if not rendered:
+            return "", remaining + TOKENS_PER_MESSAGE
+        return "\n\n".join(rendered), remaining
+
+    def _pack_history(self, history: List[Dict[str, str]], remaining: int, model: Llm):
+        """Keep the most recent messages that fit. Returns them (in order) and the remaining budget."""
+        kept = 0
+        for message in reversed(history):
+            message_cost = count_tokens_for_message(message, model)
+            if message_cost > remaining:
+                break
+            remaining -= message_cost
+            kept += 1
+        return history[len(history) - kept:], remaining
+
+    def _truncate_to_tokens(self, text: str, max_tokens: int, model: Llm) -> str:
+        suffix = "..."
+        max_tokens -= count_tokens_for_text(suffix, model)
+        total_tokens = count_tokens_for_text(text, model)
+        if max_tokens <= 0 or total_tokens == 0:
+            return ""
+        # Estimate the cut from the characters per token, then shrink until it fits
+        cut = int(len(text) * max_tokens / total_tokens)
+        while cut > 0 and count_tokens_for_text(text[:cut], model) > max_tokens:
+            cut = int(cut * 0.9)
+        return text[:cut] + suffix if cut > 0 else ""
@@ -1,28 +1,46 @@
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 import json
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from src.core.schemas.Schemas import AppSettings
 from src.utils import Utilities, Logger, llm_utils
 from src.utils.ChatBot import ChatBot
 from src.utils.Logger import Level
-from .Constants import Role
+from .Constants import Role, fast_chat_model
+from .ModelPolicy import EscalateOnParseFailure, ModelPolicy
 from .ChatMessage import ChatMessage
 from .ResponseTypes import ChatResponse, ChatSummary
 from src.core import proj_settings
 
+# Shared by all conversation memories: runs background summarizations
+_summarization_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="summarization")
+
+
 @dataclass
 class ConversationMemoryState:
     chat_memory: List[ChatMessage]
     conversation_summary: Optional[ChatSummary]
+    # summary_levels[0] holds summaries of chunks of messages, summary_levels[1] summaries of groups of those, and so on
+    summary_levels: List[List[ChatSummary]] = field(default_factory=list)
 
 class ConversationMemory:
     chat_memory: List[ChatMessage]
-    conversation_summary: Optional[ChatSummary]
+    conversation_summary: Optional[ChatSummary]  # The most recent chunk summary
+    # Hierarchical summaries: each summarization only summarizes the messages it trims (a level-1 summary), and once a
+    # level holds summaries_per_level summaries they are merged into one summary on the next level up. So a
+    # summarization costs O(chunk) instead of O(history), and the prompt gets a bounded number of summaries:
+    # coarse ones for the distant past, finer ones for recent events
+    summary_levels: List[List[ChatSummary]]
+    summaries_per_level: int = 4
 
     summarization_prompt: str
     system_prompt_summary_suffix: str
 
     game_settings: AppSettings
+    summarizer_model_policy: ModelPolicy
+    # Summarize on a background thread from a snapshot of the chat memory. Until the summary is ready the
+    # old summary and the full history are used; it is swapped in by the next append_chat or maintain
+    background_summarization: bool = True
 
     @classmethod
     def from_new(cls, summarization_prompt: str) -> 'ConversationMemory':
@@ -42,47 +60,78 @@ class ConversationMemory:
         if state is None:
             self.chat_memory = []
             self.conversation_summary = None
+            self.summary_levels = []
         else:
             self.chat_memory = state.chat_memory
             self.conversation_summary = state.conversation_summary
+            self.summary_levels = state.summary_levels
+            if not self.summary_levels and self.conversation_summary is not None:
+                # Saved before hierarchical summaries: the single rolling summary becomes the first level-1 summary
+                self.summary_levels = [[self.conversation_summary]]
 
         self.game_settings = proj_settings.get_settings().app_settings
+        self.summarizer_model_policy = EscalateOnParseFailure(self.game_settings.summarizer_model or fast_chat_model, self.game_settings.model)
         self.summarization_prompt = summarization_prompt
         self.system_prompt_summary_suffix = llm_utils.get_formatting_suffix(ChatSummary)
+        # The in-flight background summarization, the snapshot of chat_memory it started from and how many of its messages it summarizes
+        self._pending_summarization: Optional[Tuple[Future, List[ChatMessage], int]] = None
 
     def get_state(self) -> ConversationMemoryState:
         """Returns the current state of the conversation memory."""
         return ConversationMemoryState(
             chat_memory=self.chat_memory,
-            conversation_summary=self.conversation_summary
+            conversation_summary=self.conversation_summary,
+            summary_levels=self.summary_levels,
         )
 
     def maintain(self):
         """Maintains the conversation memory, including consolidation via summarization if necessary."""
+        self._apply_finished_summarization()
+        if self._pending_summarization is not None:
+            return
         current_chat_length = self.get_chat_memory_length()
         if current_chat_length > self.game_settings.max_convo_mem_length:
             Logger.log(f"Chat history length exceeded {self.game_settings.max_convo_mem_length}. Summarizing chat history.", Level.INFO)
             num_last_messages_to_retain = self.game_settings.num_last_messages_to_retain_when_summarizing
-            self.summarize_message_history(include_cot=True, num_last_messages_to_retain=num_last_messages_to_retain, enable_printing=True)
+            if self.background_summarization:
+                self._start_background_summarization(include_cot=True, num_last_messages_to_retain=num_last_messages_to_retain)
+            else:
+                self.summarize_message_history(include_cot=True, num_last_messages_to_retain=num_last_messages_to_retain, enable_printing=True)
+
+    def wait_for_summarization(self) -> None:
+        """Blocks until an in-flight background summarization finishes, and swaps it in"""
+        if self._pending_summarization is not None:
+            future, _, _ = self._pending_summarization
+            try:
+                future.result()
+            except Exception:
+                pass  # Logged by _apply_finished_summarization
+            self._apply_finished_summarization()
 
     def append_chat(self, response: str, role: Role = Role.assistant, cot: str = None, off_switch: bool = False):
         """Injects a response into the message history, typically used for initial messages."""
+        self._apply_finished_summarization()
         self.chat_memory.append(ChatMessage(role=role, content=response, cot=cot, off_switch=off_switch))
 
     def get_chat_memory_as_string(self, include_cot = False) -> str:
-        chat_history_str = ""
-        chat_history_as_dict = llm_utils.convert_message_history_to_llm_format(self.chat_memory, include_cot)
-        for message in chat_history_as_dict:
-            chat_history_str += f"{message['role']}: {message['content']}\n"
-        return chat_history_str
+        return self._format_chat_history(self.chat_memory, include_cot)
+
+    def _format_chat_history(self, chat_memory: List[ChatMessage], include_cot: bool) -> str:
+        # Rendered content is memoized on the messages (see llm_utils.render_message), so only new messages are decoded
+        chat_history_as_dict = llm_utils.convert_message_history_to_llm_format(chat_memory, include_cot)
+        return "".join(f"{message['role']}: {message['content']}\n" for message in chat_history_as_dict)
     
     def get_chat_summary_as_string(self) -> str:
-        """Returns the conversation summary as a formatted string."""
-        if not self.conversation_summary:
+        """Returns the conversation summaries as a formatted string, oldest (highest level) first."""
+        if not self.summary_levels:
             return "(No summary available.)"
-        return json.dumps(asdict(self.conversation_summary), indent=4)
+        return "\n\n".join(json.dumps(asdict(summary), indent=4) for summary in self._get_summaries_oldest_first(self.summary_levels))
 
     def get_message_history_for_llm_summarization(self, include_cot: bool = False, num_last_messages_to_exclude: int = 0) -> List[Dict[str, str]]:
+        """The summarization request for the next chunk: everything but the last num_last_messages_to_exclude messages"""
+        return self._build_summarization_messages(self._get_chunk_to_summarize(self.chat_memory, num_last_messages_to_exclude), None, include_cot)
+
+    def _build_summarization_messages(self, chat_memory: List[ChatMessage], conversation_summary: Optional[ChatSummary], include_cot: bool) -> List[Dict[str, str]]:
         # Initialize the message history for summarization
         summarization_message_history = []
         
@@ -99,34 +148,114 @@ class ConversationMemory:
         instructions = self.summarization_prompt
         user_message_content += "Instructions:\n" + instructions + "\n\n"
         # Second, add the previous conversation summary if it exists
-        if self.conversation_summary:
-            user_message_content += "Previous Conversation Summary:\n" + str(self.conversation_summary) + "\n\n"
+        if conversation_summary:
+            user_message_content += "Previous Conversation Summary:\n" + str(conversation_summary) + "\n\n"
         # Third add the chat history as a string
-        chat_history_str = self.get_chat_memory_as_string(include_cot)
+        chat_history_str = self._format_chat_history(chat_memory, include_cot)
         user_message_content += "Chat History:\n" + chat_history_str + "\n\n\n"
 
         # Finally, add this user message to the message history
         summarization_message_history.append({"role": Role.user.value, "content": user_message_content})
         return summarization_message_history
 
-    def summarize_message_history(self, include_cot, num_last_messages_to_retain = 0, enable_printing = False) -> str:
-        """Summarizes the conversation history and updates the system prompt with the summary."""
-        summarization_prompt_and_message_history = self.get_message_history_for_llm_summarization(include_cot, num_last_messages_to_exclude=num_last_messages_to_retain)
-
-        print("Summarization prompt:\n")
-        for message in summarization_prompt_and_message_history:
-            print(f"{message['role']}: {message['content']}")
-
-        # Call the llm agent with the context, expecting an untyped response
-        summary, token_count = ChatBot.call_llm(summarization_prompt_and_message_history, ChatSummary)
-        # Note: We're not tracking tokens for summarization currently
+    def summarize_message_history(self, include_cot, num_last_messages_to_retain = 0, enable_printing = False) -> ChatSummary:
+        """Summarizes all but the last num_last_messages_to_retain messages into a level-1 summary and trims them from the chat memory."""
+        chunk = self._get_chunk_to_summarize(self.chat_memory, num_last_messages_to_retain)
+        summary, summary_levels = self._summarize_into_levels(chunk, self.summary_levels, include_cot)
 
         if enable_printing:
             Logger.log(f"Summary: {summary}", Level.VERBOSE)
 
         # Update the conversation summary and trim the chat memory
         self.conversation_summary = summary
-        self.chat_memory = self.chat_memory[-num_last_messages_to_retain:] if num_last_messages_to_retain > 0 else self.chat_memory
+        self.summary_levels = summary_levels
+        self.chat_memory = self.chat_memory[len(chunk):]
+
+        return summary
+
+    def _summarize(self, chat_memory: List[ChatMessage], conversation_summary: Optional[ChatSummary], include_cot: bool) -> ChatSummary:
+        summarization_prompt_and_message_history = self._build_summarization_messages(chat_memory, conversation_summary, include_cot)
+        Logger.verbose("Summarization prompt:\n" + "\n".join(f"{message['role']}: {message['content']}" for message in summarization_prompt_and_message_history))
 
+        # Call the llm agent with the context, expecting an untyped response
+        summary, token_count = ChatBot.call_llm(
+            summarization_prompt_and_message_history,
+            ChatSummary,
+            self.summarizer_model_policy.select_model(),
+            self.summarizer_model_policy.get_fallback_model(),
+        )
+        # Note: We're not tracking tokens for summarization currently
         return summary
 
+    # ---------- Hierarchical summaries ----------
+    def _get_chunk_to_summarize(self, chat_memory: List[ChatMessage], num_last_messages_to_exclude: int) -> List[ChatMessage]:
+        return chat_memory[:-num_last_messages_to_exclude] if num_last_messages_to_exclude > 0 else list(chat_memory)
+
+    def _summarize_into_levels(self, chunk: List[ChatMessage], summary_levels: List[List[ChatSummary]], include_cot: bool) -> Tuple[ChatSummary, List[List[ChatSummary]]]:
+        """
+        Summarizes the chunk on its own and adds it to a copy of summary_levels, merging full levels upwards.
+        Returns the chunk's summary and the new levels (summary_levels itself is left as is, so this can run in the background).
+        """
+        summary = self._summarize(chunk, None, include_cot)
+        summary_levels = [list(level) for level in summary_levels] or [[]]
+        summary_levels[0].append(summary)
+        level = 0
+        while len(summary_levels[level]) >= self.summaries_per_level:
+            merged_summary = self._merge_summaries(summary_levels[level])
+            summary_levels[level] = []
+            if level + 1 == len(summary_levels):
+                summary_levels.append([])
+            summary_levels[level + 1].append(merged_summary)
+            level += 1
+        return summary, summary_levels
+
+    def _merge_summaries(self, summaries: List[ChatSummary]) -> ChatSummary:
+        user_message_content = "Instructions:\n" + self.summarization_prompt + "\n\n"
+        user_message_content += "Summaries of consecutive parts of the conversation, oldest first:\n" + "\n\n".join(str(summary) for summary in summaries) + "\n\n\n"
+        merge_messages = [
+            {"role": Role.system.value, "content": "You are a conversation summarizer.\n\n" + self.system_prompt_summary_suffix},
+            {"role": Role.user.value, "content": user_message_content},
+        ]
+        Logger.verbose(f"Merging {len(summaries)} summaries into one")
+        summary, _ = ChatBot.call_llm(
+            merge_messages,
+            ChatSummary,
+            self.summarizer_model_policy.select_model(),
+            self.summarizer_model_policy.get_fallback_model(),
+        )
+        return summary
+
+    def _get_summaries_oldest_first(self, summary_levels: List[List[ChatSummary]]) -> List[ChatSummary]:
+        # Every summary on a level is more recent than all summaries on the levels above it
+        return [summary for level in reversed(summary_levels) for summary in level]
+
+    # ---------- Background summarization ----------
+    def _start_background_summarization(self, include_cot: bool, num_last_messages_to_retain: int) -> None:
+        snapshot = list(self.chat_memory)
+        # Same trimming as summarize_message_history: everything but the retained messages
+        chunk = self._get_chunk_to_summarize(snapshot, num_last_messages_to_retain)
+        future = _summarization_executor.submit(self._summarize_into_levels, chunk, self.summary_levels, include_cot)
+        self._pending_summarization = (future, snapshot, len(chunk))
+
+    def _apply_finished_summarization(self) -> None:
+        """Swaps in a finished background summary and trims the messages it covers. Runs on the caller's thread, so it never races with appends."""
+        if self._pending_summarization is None or not self._pending_summarization[0].done():
+            return
+        future, snapshot, num_messages_summarized = self._pending_summarization
+        self._pending_summarization = None
+        try:
+            summary, summary_levels = future.result()
+        except Exception as e:
+            Logger.log(f"Background summarization failed, will re-try on the next maintain: {e}", Level.ERROR)
+            return
+        Logger.log(f"Summary: {summary}", Level.VERBOSE)
+
+        # Only trim if the summarized messages are still the start of the history (it may have been replaced meanwhile)
+        summarized = snapshot[:num_messages_summarized]
+        if len(self.chat_memory) < len(summarized) or any(a is not b for a, b in zip(self.chat_memory, summarized)):
+            Logger.log("Chat memory changed during summarization, discarding the summary", Level.WARNING)
+            return
+        self.conversation_summary = summary
+        self.summary_levels = summary_levels
+        self.chat_memory = self.chat_memory[num_messages_summarized:]
+
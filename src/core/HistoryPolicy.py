@@ -0,0 +1,30 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+# How the hidden thought processes (CoT) of past assistant messages are replayed to the LLM. Every replayed CoT
+# is re-sent on every turn, so keeping only the recent ones stops the prompt from growing with all old thoughts.
+@dataclass
+class CotHistoryPolicy:
+    keep_last_n: Optional[int] = None  # Keep the full CoT of the last n assistant messages (None keeps all of them)
+    digest_chars: int = 0  # Older CoTs are cut to their first sentence, at most this many characters (0 drops them)
+
+    def keeps_all(self) -> bool:
+        return self.keep_last_n is None
+
+    def render_cot(self, cot: str, assistant_messages_after: int) -> str:
+        """
+        Args:
+            assistant_messages_after: How many assistant messages come after this one in the history
+        """
+        if self.keeps_all() or assistant_messages_after < self.keep_last_n:
+            return cot
+        if self.digest_chars <= 0:
+            return ""
+        first_sentence = _SENTENCE_END.split(cot.strip(), maxsplit=1)[0]
+        if len(first_sentence) <= self.digest_chars:
+            return first_sentence
+        return first_sentence[:self.digest_chars].rstrip() + "..."
@@ -0,0 +1,62 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from src.core.Constants import Llm
+from src.utils.ChatBot import ChatBot
+
+
+# Model policies decide which model an Agent (or other LLM caller) uses for each call.
+# They are per caller, so routing one agent to a cheap model never affects other agents or threads.
+class ModelPolicy(ABC):
+    @abstractmethod
+    def select_model(self) -> Llm:
+        """The model for the next call"""
+
+    def get_fallback_model(self) -> Optional[Llm]:
+        """The model to re-try with if the response cannot be parsed (None to re-try with the same model)"""
+        return None
+
+
+@dataclass
+class FixedModel(ModelPolicy):
+    """Always the same model. A model of None follows ChatBot.default_chat_model."""
+    model: Optional[Llm] = None
+
+    def select_model(self) -> Llm:
+        return self.model if self.model is not None else ChatBot.default_chat_model
+
+
+@dataclass
+class EscalateOnParseFailure(ModelPolicy):
+    """Start on the cheap model; if its response cannot be parsed, re-try on the strong one."""
+    cheap_model: Llm
+    strong_model: Llm
+
+    def select_model(self) -> Llm:
+        return self.cheap_model
+
+    def get_fallback_model(self) -> Optional[Llm]:
+        return self.strong_model
+
+
+@dataclass
+class LowestLatency(ModelPolicy):
+    """
+    Pick the candidate with the lowest recent latency percentile (as measured by ChatBot.latencies).
+    Candidates without enough samples yet are tried first, so every candidate gets measured.
+    """
+    candidates: List[Llm] = field(default_factory=list)
+    percentile: float = 0.5
+
+    def select_model(self) -> Llm:
+        if not self.candidates:
+            raise ValueError("LowestLatency needs at least one candidate model")
+        best_model, best_latency = None, None
+        for model in self.candidates:
+            latency = ChatBot.latencies.percentile(model, self.percentile)
+            if latency is None:
+                return model
+            if best_latency is None or latency < best_latency:
+                best_model, best_latency = model, latency
+        return best_model
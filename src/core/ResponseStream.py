@@ -0,0 +1,99 @@
+"""
+Iterators over a streamed LLM response.
+
+A stream yields the spoken text (e.g. ChatResponse.response) as it arrives. Once it is exhausted,
+the fully parsed response object and its TokenCount are available on the stream.
+"""
+from typing import AsyncIterator, Callable, Generic, Iterator, List, Optional, TypeVar
+
+from src.core.TokenTracking import TokenCount
+
+T = TypeVar('T')
+
+
+class _StreamResult(Generic[T]):
+    """Shared completion state: the parsed response, its token count and the done callbacks."""
+
+    def __init__(self):
+        self.response: Optional[T] = None
+        self.token_count: Optional[TokenCount] = None
+        self.done: bool = False
+        self._done_callbacks: List[Callable[[T], None]] = []
+
+    def set_result(self, response: T, token_count: Optional[TokenCount]) -> None:
+        """Called by the producer once, right before it stops yielding."""
+        self.response = response
+        self.token_count = token_count
+        self.done = True
+        for callback in self._done_callbacks:
+            callback(response)
+
+    def add_done_callback(self, callback: Callable[[T], None]) -> None:
+        """Run callback(response) when the stream completes (immediately if it already has)."""
+        if self.done:
+            callback(self.response)
+        else:
+            self._done_callbacks.append(callback)
+
+
+class ResponseStream(_StreamResult[T]):
+    """
+    Iterator over the text chunks of a streamed response.
+
+    The producer is a generator function that receives this stream, yields text chunks,
+    and calls stream.set_result(response, token_count) before it returns.
+    """
+
+    def __init__(self, producer: Callable[['ResponseStream[T]'], Iterator[str]]):
+        super().__init__()
+        self._chunks = producer(self)
+
+    @staticmethod
+    def completed(response: T, text: str, token_count: Optional[TokenCount] = None) -> 'ResponseStream[T]':
+        """A stream whose response is already known, yielding its text as a single chunk."""
+        def producer(stream: 'ResponseStream[T]') -> Iterator[str]:
+            if text:
+                yield text
+            stream.set_result(response, token_count)
+        return ResponseStream(producer)
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        return next(self._chunks)
+
+    def consume(self) -> T:
+        """Drain the remaining chunks and return the parsed response."""
+        for _ in self:
+            pass
+        return self.response
+
+
+class AsyncResponseStream(_StreamResult[T]):
+    """Async counterpart of ResponseStream; the producer is an async generator function."""
+
+    def __init__(self, producer: Callable[['AsyncResponseStream[T]'], AsyncIterator[str]]):
+        super().__init__()
+        self._chunks = producer(self)
+
+    @staticmethod
+    def completed(response: T, text: str, token_count: Optional[TokenCount] = None) -> 'AsyncResponseStream[T]':
+        """An async stream whose response is already known, yielding its text as a single chunk."""
+        async def producer(stream: 'AsyncResponseStream[T]') -> AsyncIterator[str]:
+            if text:
+                yield text
+            stream.set_result(response, token_count)
+        return AsyncResponseStream(producer)
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self
+
+    async def __anext__(self) -> str:
+        return await self._chunks.__anext__()
+
+    async def consume(self) -> T:
+        """Drain the remaining chunks and return the parsed response."""
+        async for _ in self:
+            pass
+        return self.response
@@ -13,29 +13,35 @@ class TokenCount:
     input_tokens: int
     output_tokens: int
     cost: float  # Cost in USD
+    cached: bool = False  # Served from the local response cache, so no API spend was incurred
+    cached_input_tokens: int = 0  # Input tokens served from the provider's prompt cache (a subset of input_tokens)
+    cot_tokens_saved: int = 0  # Input tokens the agent's CoT history policy left out of the replayed history
     
     @staticmethod
-    def calculate_cost(model: Llm, input_tokens: int, output_tokens: int) -> float:
+    def calculate_cost(model: Llm, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0) -> float:
         """Calculate cost in USD based on token counts and model pricing"""
         if model not in LLM_PRICING:
             return 0.0
         
         pricing = LLM_PRICING[model]
+        cached_input_tokens = min(cached_input_tokens, input_tokens)
         # Pricing is per 1M tokens, so divide by 1,000,000
-        input_cost = (input_tokens / 1_000_000) * pricing["input"]
+        input_cost = ((input_tokens - cached_input_tokens) / 1_000_000) * pricing["input"]
+        cached_input_cost = (cached_input_tokens / 1_000_000) * pricing.get("cached_input", pricing["input"])
         output_cost = (output_tokens / 1_000_000) * pricing["output"]
-        return input_cost + output_cost
+        return input_cost + cached_input_cost + output_cost
     
     @staticmethod
-    def create(model: Llm, input_tokens: int, output_tokens: int) -> 'TokenCount':
+    def create(model: Llm, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0) -> 'TokenCount':
         """Create a TokenCount with automatically calculated cost"""
-        cost = TokenCount.calculate_cost(model, input_tokens, output_tokens)
-        return TokenCount(model=model, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost)
+        cost = TokenCount.calculate_cost(model, input_tokens, output_tokens, cached_input_tokens)
+        return TokenCount(model=model, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, cached_input_tokens=cached_input_tokens)
 
 
 def aggregate_token_counts(token_counts: List[TokenCount]) -> float:
     """
     Aggregate a list of TokenCount objects and return total cost in USD.
+    Cached responses keep their original token counts but did not cost anything, so they are excluded.
     
     Args:
         token_counts: List of TokenCount objects to aggregate
@@ -43,7 +49,7 @@ def aggregate_token_counts(token_counts: List[TokenCount]) -> float:
     Returns:
         Total cost in USD
     """
-    return sum(tc.cost for tc in token_counts)
+    return sum(tc.cost for tc in token_counts if not tc.cached)
 
 
 
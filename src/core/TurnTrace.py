@@ -0,0 +1,23 @@
+"""
+Per-turn trace of what an NPC did while answering, for debugging and performance checks.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class RetrievalTrace:
+    query: str
+    topk: int
+    cache_hit: bool  # Served from a search already made earlier in the same turn
+
+
+@dataclass
+class TurnTrace:
+    retrievals: List[RetrievalTrace] = field(default_factory=list)
+    preprocess_source: str = "llm"  # "llm", or "local" when the local fast path skipped the preprocessor call
+    local_preprocess_reason: Optional[str] = None  # Why the local fast path did or didn't skip the call
+
+    def get_vector_search_count(self) -> int:
+        """Number of retrievals that needed a vector search (the rest were served from the turn's cache)"""
+        return sum(1 for retrieval in self.retrievals if not retrieval.cache_hit)
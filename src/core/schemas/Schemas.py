@@ -1,4 +1,5 @@
 from dataclasses import dataclass, fields
+from typing import Optional
 from src.core.Constants import Llm
 from src.utils import Logger
 
@@ -13,5 +14,7 @@ class AppSettings:
     log_level: Logger.Level
     max_convo_mem_length: int
     save_name: str = ""
+    preprocessor_model: Optional[Llm] = None  # Defaults to fast_chat_model, escalating to model on parse failures
+    summarizer_model: Optional[Llm] = None  # Defaults to fast_chat_model, escalating to model on parse failures
 
 
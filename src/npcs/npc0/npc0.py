@@ -4,6 +4,8 @@ from src.core.Constants import Role
 from src.core.schemas.CollectionSchemas import Entity
 from src.core.ResponseTypes import ChatResponse
 from src.core.Agent import Agent
+from src.core.ModelPolicy import ModelPolicy
+from src.core.ResponseStream import AsyncResponseStream, ResponseStream
 from src.core.ChatMessage import ChatMessage
 from src.utils import Utilities, io_utils
 from src.npcs.npc_protocol import NPCProtocol
@@ -20,12 +22,13 @@ class NPC0:
     - Implements NPCProtocol interface
     """
     
-    def __init__(self, system_prompt: str = "You are a helpful assistant."):
+    def __init__(self, system_prompt: str = "You are a helpful assistant.", model_policy: Optional[ModelPolicy] = None):
         """
         Initialize NPC0 with a system prompt
         
         Args:
             system_prompt: The system prompt to use for this NPC
+            model_policy: Optional model policy for the response agent (defaults to ChatBot.default_chat_model)
         """
         self.base_system_prompt = system_prompt
         self.message_history: List[ChatMessage] = []
@@ -33,7 +36,7 @@ class NPC0:
         self.injected_memories: List[str] = []
         
         # Initialize Agent for LLM interactions (like NPC1/NPC2)
-        self.response_agent = Agent(system_prompt=None, response_type=ChatResponse)
+        self.response_agent = Agent(system_prompt=None, response_type=ChatResponse, model_policy=model_policy)
     
     def _build_system_prompt(self) -> str:
         """Build the full system prompt including base prompt, memories, and entities"""
@@ -61,6 +64,58 @@ class NPC0:
         Returns:
             ChatResponse object with the LLM's response
         """
+        self._prepare_turn(user_message)
+        response_obj: ChatResponse = self.response_agent.chat_with_history(self.message_history)
+        self._record_response(response_obj)
+        return response_obj
+
+    async def achat(self, user_message: Optional[str]) -> ChatResponse:
+        """
+        Async version of chat: add user message, await the LLM, return response
+        
+        Args:
+            user_message: The user's message (can be None for initial response)
+            
+        Returns:
+            ChatResponse object with the LLM's response
+        """
+        self._prepare_turn(user_message)
+        response_obj: ChatResponse = await self.response_agent.achat_with_history(self.message_history)
+        self._record_response(response_obj)
+        return response_obj
+
+    def chat_stream(self, user_message: Optional[str]) -> ResponseStream[ChatResponse]:
+        """
+        Streaming version of chat: iterate the returned stream to get the response text as it is generated
+        
+        Args:
+            user_message: The user's message (can be None for initial response)
+            
+        Returns:
+            ResponseStream; the response is added to history once the stream is exhausted
+        """
+        self._prepare_turn(user_message)
+        stream = self.response_agent.stream_chat_with_history(self.message_history)
+        stream.add_done_callback(self._record_response)
+        return stream
+
+    async def achat_stream(self, user_message: Optional[str]) -> AsyncResponseStream[ChatResponse]:
+        """
+        Async version of chat_stream; iterate the returned stream with async for
+        
+        Args:
+            user_message: The user's message (can be None for initial response)
+            
+        Returns:
+            AsyncResponseStream; the response is added to history once the stream is exhausted
+        """
+        self._prepare_turn(user_message)
+        stream = self.response_agent.astream_chat_with_history(self.message_history)
+        stream.add_done_callback(self._record_response)
+        return stream
+
+    def _prepare_turn(self, user_message: Optional[str]) -> None:
+        """Add the user message to history and refresh the agent's system prompt"""
         # Add user message to history if provided
         if user_message is not None and user_message.strip():
             self.message_history.append(ChatMessage(
@@ -70,19 +125,17 @@ class NPC0:
                 off_switch=False
             ))
         
-        # Update agent's system prompt and call it (Agent handles formatting automatically)
+        # Update agent's system prompt (Agent handles formatting automatically)
         self.response_agent.update_system_prompt(self._build_system_prompt())
-        response_obj: ChatResponse = self.response_agent.chat_with_history(self.message_history)
-        
-        # Add assistant response to history
+
+    def _record_response(self, response_obj: ChatResponse) -> None:
+        """Add the assistant response to history"""
         self.message_history.append(ChatMessage(
             role=Role.assistant,
             content=response_obj.response,
             cot=response_obj.hidden_thought_process,
             off_switch=response_obj.off_switch
         ))
-        
-        return response_obj
     
     def maintain(self) -> None:
         """
@@ -8,10 +8,14 @@ from src.core.schemas.Schemas import AppSettings
 from src.utils import Utilities, io_utils, llm_utils
 from src.utils import Logger
 from src.utils.Logger import Level
+from src.utils.state_journal import StateJournal, replay_journal
 from src.core.ConversationMemory import ConversationMemory, ConversationMemoryState
 from src.core.ResponseTypes import ChatResponse
+from src.core.ResponseStream import AsyncResponseStream, ResponseStream
 from src.core.Constants import Role, Constants as constants
 from src.core.Agent import Agent
+from src.core.ContextPacker import ContextPacker, ContextSegment, render_segments
+from src.core.ModelPolicy import FixedModel
 from src.core import proj_paths, proj_settings
 
 
@@ -44,13 +48,17 @@ class NPC1:
     template: NPCTemplate
     brain_entities: List[Entity]
     save_enabled: bool
+    # Fits each request into a token budget (see enable_context_packing)
+    context_packer: Optional[ContextPacker] = None
+    # Saves deltas instead of the whole state (see enable_journaled_saves)
+    save_journal: Optional[StateJournal] = None
 
     def __init__(self, npc_name_for_template_and_save: str, *, save_enabled: bool = True):
         self.save_paths = proj_paths.get_paths()
         self.app_settings = proj_settings.get_settings().app_settings
         self.npc_name = npc_name_for_template_and_save
         self.save_enabled = save_enabled
-        self.response_agent = Agent(system_prompt=None, response_type=ChatResponse)
+        self.response_agent = Agent(system_prompt=None, response_type=ChatResponse, model_policy=FixedModel(self.app_settings.model))
 
         self.template = self.save_paths.load_npc_template_with_fallback(npc_name_for_template_and_save, NPCTemplate)
         
@@ -79,13 +87,30 @@ class NPC1:
         with open(config_path, "r") as f:
             return yaml.safe_load(f)
 
+    # The system prompt only holds content that is stable across turns, so the provider can cache the
+    # system prompt + history prefix; the summary changes on every summarization and goes after the history
     def _build_system_prompt(self) -> str:
         parts: List[str] = []
         parts.append("Context:\n" + self.template.system_prompt)
-        parts.append("Background knowledge:\n" + "\n".join([e.content for e in self.brain_entities]))
-        parts.append("Prior conversation summary:\n" + self.conversation_memory.get_chat_summary_as_string())
+        # With context packing on, the background knowledge becomes a droppable dynamic segment instead
+        if self.context_packer is None:
+            parts.append("Background knowledge:\n" + "\n".join([e.content for e in self.brain_entities]))
         return "\n\n".join(parts) + "\n\n"
 
+    def _build_dynamic_context(self) -> str:
+        return render_segments(self._build_dynamic_segments())
+
+    def _build_dynamic_segments(self) -> List[ContextSegment]:
+        """The dynamic context in priority order, for the context packer to trim from the end"""
+        segments = [ContextSegment(name="summary", items=[self.conversation_memory.get_chat_summary_as_string()], header="Prior conversation summary:", truncate=True)]
+        if self.context_packer is not None:
+            segments.append(ContextSegment(name="knowledge", items=[e.content for e in self.brain_entities], header="Background knowledge:"))
+        return segments
+
+    def _update_response_prompt(self) -> None:
+        self.response_agent.update_system_prompt(self._build_system_prompt())
+        self.response_agent.update_dynamic_context(self._build_dynamic_segments())
+
     def _get_initial_response(self) -> str:
         return self.template.initial_response or ""
 
@@ -104,13 +129,19 @@ class NPC1:
         os.makedirs(self.save_paths.npc_save_dir(self.npc_name), exist_ok=True)
         save_path = self.save_paths.npc_save_state(self.npc_name)
         current_state = self._get_state()
+        if self.save_journal is not None and self.save_journal.append_changes(current_state):
+            Logger.log(f"Session changes journaled to {self.save_journal.journal_path}", Level.DEBUG)
+            return
         io_utils.save_to_yaml_file(current_state, save_path)
+        if self.save_journal is not None:
+            self.save_journal.reset(current_state)
         Logger.log(f"Session saved successfully to {save_path}", Level.INFO)
 
     def _load_state(self) -> None:
         Logger.log(f"Loading state from {self.save_paths.npc_save_state(self.npc_name)}", Level.INFO)
         try:
             prior_state: NPCState = io_utils.load_yaml_into_dataclass(self.save_paths.npc_save_state(self.npc_name), NPCState)
+            prior_state = replay_journal(prior_state, self.save_paths.npc_save_state(self.npc_name))
             self.conversation_memory = ConversationMemory.from_state(prior_state.conversation_memory, summarization_prompt=self.summarization_prompt)
             self.user_prompt_wrapper = prior_state.user_prompt_wrapper
             # summarization_prompt is now loaded from global config, no need to override
@@ -132,6 +163,25 @@ class NPC1:
             self.brain_entities = []
 
     # ---------- Public API / Protocol ----------
+    def enable_context_packing(self, token_budget: Optional[int] = None) -> None:
+        """
+        Fit each LLM request into a prompt token budget (see ContextPacker.py). The background knowledge moves out of
+        the system prompt into the dynamic context, so the items that don't fit after the summary are dropped.
+
+        Args:
+            token_budget: Max prompt tokens per request. None uses the per-model default from LLM_PROMPT_TOKEN_BUDGETS
+        """
+        self.context_packer = ContextPacker(token_budget)
+        self.response_agent.context_packer = self.context_packer
+
+    def enable_journaled_saves(self, compact_every: int = 50) -> None:
+        """
+        Append only what changed since the last save to a journal next to the save file, instead of rewriting the
+        whole file each turn (see state_journal.py). Every compact_every saves the full file is rewritten and the
+        journal starts over. Loading always replays the journal, so it's never lost when this is off.
+        """
+        self.save_journal = StateJournal(self.save_paths.npc_save_state(self.npc_name), compact_every)
+
     def maintain(self) -> None:
         """Perform periodic maintenance (e.g., summarization) and persist state."""
         self.conversation_memory.maintain()
@@ -146,15 +196,48 @@ class NPC1:
         if user_message is not None:
             self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
 
-        self.response_agent.update_system_prompt(self._build_system_prompt())
+        self._update_response_prompt()
         response_obj: ChatResponse = self.response_agent.chat_with_history(self.conversation_memory.chat_memory)
+        self._record_response(response_obj)
+        return response_obj
+
+    async def achat(self, user_message: Optional[str] = None) -> ChatResponse:
+        """Async version of chat; the LLM call is awaited instead of blocking a thread."""
+        if user_message is not None:
+            self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
+
+        self._update_response_prompt()
+        response_obj: ChatResponse = await self.response_agent.achat_with_history(self.conversation_memory.chat_memory)
+        self._record_response(response_obj)
+        return response_obj
+
+    def chat_stream(self, user_message: Optional[str] = None) -> ResponseStream[ChatResponse]:
+        """Streaming version of chat; the response is added to conversation memory once the stream is exhausted."""
+        if user_message is not None:
+            self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
+
+        self._update_response_prompt()
+        stream = self.response_agent.stream_chat_with_history(self.conversation_memory.chat_memory)
+        stream.add_done_callback(self._record_response)
+        return stream
+
+    async def achat_stream(self, user_message: Optional[str] = None) -> AsyncResponseStream[ChatResponse]:
+        """Async version of chat_stream."""
+        if user_message is not None:
+            self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
+
+        self._update_response_prompt()
+        stream = self.response_agent.astream_chat_with_history(self.conversation_memory.chat_memory)
+        stream.add_done_callback(self._record_response)
+        return stream
+
+    def _record_response(self, response_obj: ChatResponse) -> None:
         self.conversation_memory.append_chat(
             response_obj.response,
             role=Role.assistant,
             off_switch=response_obj.off_switch,
             cot=response_obj.hidden_thought_process,
         )
-        return response_obj
     
     def load_entities_from_template(self, template_path: Path) -> None:
         Logger.log(f"Loading entities from {template_path}", Level.INFO)
@@ -0,0 +1,129 @@
+"""
+Local fast path for NPC2's preprocessor.
+
+Most turns ("ok", "lol", "how are you?") have no pronouns to resolve and nothing worth remembering,
+so the preprocessor LLM call only confirms the obvious. The classifier here decides locally when
+that call can be skipped: a pronoun regex rules out anything that may need resolving, a reply to a
+question always goes to the LLM (a bare "sure" can be a fact, e.g. "Do you have a sister?" "sure"),
+a small-talk regex catches the most common trivial messages, and the rest is compared (by embedding
+similarity) against labelled examples. It only ever skips; anything it is unsure about goes to the LLM.
+
+Shadow mode runs the LLM anyway and records how often the local decision would have been wrong.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils import VectorUtils
+
+NO_INFORMATION_LABEL = "no_information"
+
+PRONOUN_PATTERN = re.compile(r"\b(he|him|his|she|her|hers|they|them|their|theirs|it|its|this|that|these|those)\b", re.IGNORECASE)
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(ok(ay)?|k|lol|lmao|ha(ha)+|hi|hello|hey|thanks|thank you|cool|nice|bye|hm+|wow)[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class LocalPreprocessDecision:
+    skip_llm: bool
+    reason: str  # pronouns, answers_question, small_talk, too_long, similar_example or uncertain
+    similarity: Optional[float] = None  # Similarity to the nearest example, when embeddings were used
+
+
+class LocalPreprocessClassifier:
+    def __init__(
+        self,
+        embed: Callable[[str], List[float]],
+        examples: Dict[str, List[str]],
+        similarity_threshold: float = 0.85,
+        max_words: int = 12,
+    ):
+        """
+        Args:
+            embed: Embeds a message (e.g. a collection's cached embedding lookup, so retrieval reuses the embedding)
+            examples: Example messages by label; only the no_information label can skip the LLM
+            similarity_threshold: Minimum cosine similarity to a no_information example to skip the LLM
+            max_words: Longer messages always go to the LLM
+        """
+        self.embed = embed
+        self.examples = examples
+        self.similarity_threshold = similarity_threshold
+        self.max_words = max_words
+        self._example_embeddings: Optional[List[Tuple[str, List[float]]]] = None
+        self._embeddings_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.classified = 0
+        self.skipped = 0
+        self.shadow_compared = 0
+        self.disagreements = 0  # Would have skipped, but the LLM found information or needed clarification
+        self.missed_skips = 0  # Went to the LLM, which found nothing to remember or clarify
+
+    def classify(self, message: str, last_response: Optional[str] = None) -> LocalPreprocessDecision:
+        """
+        Args:
+            last_response: The NPC's message the user is replying to, if any
+        """
+        decision = self._classify(message, last_response)
+        with self._lock:
+            self.classified += 1
+            if decision.skip_llm:
+                self.skipped += 1
+        return decision
+
+    def record_shadow_result(self, decision: LocalPreprocessDecision, has_information: bool, needs_clarification: bool) -> None:
+        """Compare a local decision with the LLM preprocessor's result for the same message"""
+        llm_found_nothing = not has_information and not needs_clarification
+        with self._lock:
+            self.shadow_compared += 1
+            if decision.skip_llm and not llm_found_nothing:
+                self.disagreements += 1
+            elif not decision.skip_llm and llm_found_nothing:
+                self.missed_skips += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "classified": self.classified,
+                "skipped": self.skipped,
+                "skip_rate": self.skipped / self.classified if self.classified else 0.0,
+                "shadow_compared": self.shadow_compared,
+                "disagreements": self.disagreements,
+                "missed_skips": self.missed_skips,
+            }
+
+    # ---------- Helpers ----------
+    def _classify(self, message: str, last_response: Optional[str]) -> LocalPreprocessDecision:
+        if PRONOUN_PATTERN.search(message):
+            return LocalPreprocessDecision(skip_llm=False, reason="pronouns")
+        if last_response is not None and last_response.rstrip().endswith("?"):
+            return LocalPreprocessDecision(skip_llm=False, reason="answers_question")
+        if SMALL_TALK_PATTERN.match(message):
+            return LocalPreprocessDecision(skip_llm=True, reason="small_talk")
+        if len(message.split()) > self.max_words:
+            return LocalPreprocessDecision(skip_llm=False, reason="too_long")
+
+        label, similarity = self._get_nearest_example(message)
+        if label == NO_INFORMATION_LABEL and similarity >= self.similarity_threshold:
+            return LocalPreprocessDecision(skip_llm=True, reason="similar_example", similarity=similarity)
+        return LocalPreprocessDecision(skip_llm=False, reason="uncertain", similarity=similarity)
+
+    def _get_nearest_example(self, message: str) -> Tuple[Optional[str], float]:
+        embedding = self.embed(message)
+        best_label, best_similarity = None, -1.0
+        for label, example_embedding in self._get_example_embeddings():
+            similarity = float(VectorUtils.cosine_similarity(embedding, example_embedding))
+            if similarity > best_similarity:
+                best_label, best_similarity = label, similarity
+        return best_label, best_similarity
+
+    def _get_example_embeddings(self) -> List[Tuple[str, List[float]]]:
+        # Embedded once, on first use
+        with self._embeddings_lock:
+            if self._example_embeddings is None:
+                self._example_embeddings = [
+                    (label, self.embed(example)) for label, examples in self.examples.items() for example in examples
+                ]
+            return self._example_embeddings
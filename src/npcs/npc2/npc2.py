@@ -1,24 +1,39 @@
 from dataclasses import dataclass
+import asyncio
+import contextvars
+import copy
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 
 from src.brain.brain_memory import BrainMemory
+from src.brain.episodic_memory import EpisodicMemory, Episode
 from src.core.schemas.CollectionSchemas import Entity
-from src.utils import io_utils
+from src.utils import deadline, io_utils
+from src.utils.deadline import DeadlineExceeded
 from src.utils import Logger
 from src.utils.Logger import Level
+from src.utils.state_journal import StateJournal, replay_journal
 from src.core.ConversationMemory import ConversationMemory, ConversationMemoryState
 from src.core.ResponseTypes import ChatResponse
-from src.core.Constants import Role, Constants as constants
+from src.core.ResponseStream import AsyncResponseStream, ResponseStream
+from src.core.Constants import Role, Constants as constants, fast_chat_model
 from src.core.Agent import Agent
-from src.core import proj_paths
+from src.core.ContextPacker import ContextPacker, ContextSegment, render_segments
+from src.core.ModelPolicy import EscalateOnParseFailure, FixedModel
+from src.core.TurnTrace import RetrievalTrace, TurnTrace
+from src.npcs.npc2.local_preprocessor import LocalPreprocessClassifier, LocalPreprocessDecision
+from src.core import proj_paths, proj_settings
 from dataclasses import dataclass, field
 
 @dataclass
 class NPCState:
     conversation_memory: ConversationMemoryState
     user_prompt_wrapper: str
+    episodes: List[Episode] = field(default_factory=list)
+    first_live_episode: int = 0  # Turn of the first episode still in the conversation memory
 
 
 @dataclass
@@ -36,6 +51,10 @@ class PreprocessedUserInput:
     needs_clarification: bool = field(metadata={"desc": "Whether you need clarification on any of the pronouns."})
 
 
+# Shared by all NPC2 instances: runs the concurrent parts of pipelined turns (retrieval and speculative responses)
+_pipeline_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="npc2_pipeline")
+
+
 # NPC2 has the following features:
 # - All of the features of poc1
 # - A VDB that contains memories that can get queried on relevance
@@ -59,20 +78,47 @@ class NPC2:
 
     # Settings
     last_messages_to_retain_for_preprocessor: int = 4
+    chat_timeout_s: Optional[float] = None  # Default budget for a whole chat turn (preprocessing, retrieval and response)
+    # Pipelined turns run memory retrieval alongside the preprocessor (which then goes without brain context)
+    parallel_pipeline: bool = False
+    # With the pipeline on, also start the response call during preprocessing, and drop it if the preprocessor asks for clarification
+    speculative_response: bool = False
+    # Retrievals search for at least this many memories, so the preprocessor (top 3) and the response (top 5)
+    # share one search per turn; smaller requests are served by slicing the cached result
+    retrieval_topk: int = 5
+    # Local fast path that skips the preprocessor LLM call for trivial messages (see enable_local_preprocessor)
+    local_preprocessor: Optional[LocalPreprocessClassifier] = None
+    # Call the preprocessor LLM even when the fast path would skip it, and record where the two disagree
+    shadow_local_preprocessor: bool = False
+    # Fits the response and preprocessor requests into a token budget (see enable_context_packing)
+    context_packer: Optional[ContextPacker] = None
+    # Index of past exchanges, recalled verbatim once they leave the live window (see enable_episodic_memory)
+    episodic_memory: Optional[EpisodicMemory] = None
+    episodic_recall_topk: int = 3
+    # Saves deltas instead of the whole state (see enable_journaled_saves)
+    save_journal: Optional[StateJournal] = None
+    last_turn_trace: TurnTrace
 
     def __init__(self, npc_name_for_template_and_save: str, *, save_enabled: bool = True):
         self.save_paths = proj_paths.get_paths()
         self.npc_name = npc_name_for_template_and_save
         self.save_enabled = save_enabled
+        self._retrieval_lock = threading.Lock()
+        self._start_turn()
         self.template = self.save_paths.load_npc_template_with_fallback(npc_name_for_template_and_save, NPCTemplate)
         
         # Load global NPC configs
         self.preprocess_system_prompt = self._load_global_config("preprocess_system_prompt.yaml")["preprocess_system_prompt"]
         self.summarization_prompt = self._load_global_config("summarization_prompt.yaml")["summarization_prompt"]
         
-        # Init the agents
-        self.response_agent = Agent(system_prompt=None, response_type=ChatResponse)
-        self.preprocessor_agent = Agent(system_prompt=None, response_type=PreprocessedUserInput)
+        # Init the agents. Preprocessing runs every turn, so it goes to the fast model first
+        app_settings = proj_settings.get_settings().app_settings
+        self.response_agent = Agent(system_prompt=None, response_type=ChatResponse, model_policy=FixedModel(app_settings.model))
+        self.preprocessor_agent = Agent(
+            system_prompt=None,
+            response_type=PreprocessedUserInput,
+            model_policy=EscalateOnParseFailure(app_settings.preprocessor_model or fast_chat_model, app_settings.model),
+        )
 
         # Initialize the brain memory (backed by a persistent collection so doesn't matter if new game or not)
         # For the collection name, include the version, save name and NPC name
@@ -102,47 +148,238 @@ class NPC2:
         with open(config_path, "r") as f:
             return yaml.safe_load(f)
 
-    def _build_system_prompt(self, include_conversation_summary: bool = True, include_brain_context: bool = True) -> str:
-        parts: List[str] = []
-        parts.append("Context:\n" + self.template.system_prompt)
-        
+    # Prompts are split into a static system prompt (byte-identical every turn, so the provider can cache the
+    # system prompt + history prefix) and a dynamic context with the per-turn content, sent after the history
+    def _build_system_prompt(self) -> str:
+        return "Context:\n" + self.template.system_prompt + "\n\n"
+
+    def _build_dynamic_context(self, include_conversation_summary: bool = True, include_brain_context: bool = True, memories: Optional[List[str]] = None) -> str:
+        return render_segments(self._build_dynamic_segments(include_conversation_summary, include_brain_context, memories))
+
+    def _build_dynamic_segments(self, include_conversation_summary: bool = True, include_brain_context: bool = True, memories: Optional[List[str]] = None) -> List[ContextSegment]:
+        """
+        The dynamic context in priority order (summary, then memories best first), for the context packer to trim from the end.
+        memories: brain context already retrieved for the last user message (retrieved here if None)
+        """
+        segments: List[ContextSegment] = []
         if include_conversation_summary:
-            parts.append("Prior conversation summary:\n" + self.conversation_memory.get_chat_summary_as_string())
+            summary = self.conversation_memory.get_chat_summary_as_string()
+            segments.append(ContextSegment(name="summary", items=[summary], header="Prior conversation summary:", truncate=True))
         
         if include_brain_context:
-            # Get brain context from recent user input
-            recent_user_messages = [msg for msg in self.conversation_memory.chat_memory if msg.role == Role.user]
-            if recent_user_messages:
-                last_user_message = recent_user_messages[-1].content
-                memories = self.brain_memory.get_memories(last_user_message, topk=5, as_str=True)
-                if memories:
-                    parts.append("Brain context:\n" + memories)
-        
-        return "\n\n".join(parts) + "\n\n"
-
-    def _preprocess_input(self, user_message: str) -> PreprocessedUserInput:
-        # Use only the template-provided preprocess prompt
-        preprocess_agent_system_prompt = self.preprocess_system_prompt
-        if not preprocess_agent_system_prompt:
-            raise ValueError("preprocess_system_prompt is required in NPCTemplate")
+            if memories is None:
+                # Get brain context from recent user input
+                recent_user_messages = [msg for msg in self.conversation_memory.chat_memory if msg.role == Role.user]
+                if recent_user_messages:
+                    last_user_message = recent_user_messages[-1].content
+                    memories = self._get_memories(last_user_message, topk=5)
+            if memories:
+                segments.append(ContextSegment(name="memories", items=list(memories), header="Brain context:"))
+            episodes = self._recall_episodes()
+            if episodes:
+                segments.append(ContextSegment(name="episodes", items=[episode.to_text() for episode in episodes], header="Relevant past exchanges:"))
         
+        return segments
+
+    def _recall_episodes(self) -> List[Episode]:
+        """Past exchanges relevant to the last user message, leaving out those still in the conversation memory"""
+        if self.episodic_memory is None:
+            return []
+        recent_user_messages = [msg for msg in self.conversation_memory.chat_memory if msg.role == Role.user]
+        if not recent_user_messages:
+            return []
+        first_live_turn = self.episodic_memory.track_live_window(self.conversation_memory.chat_memory)
+        return self.episodic_memory.search(recent_user_messages[-1].content, topk=self.episodic_recall_topk, exclude_from_turn=first_live_turn)
+
+    def _start_turn(self) -> None:
+        """Reset the turn-scoped retrieval cache and start a new trace"""
+        with self._retrieval_lock:
+            self._turn_retrievals: Dict[str, Tuple[int, List[Entity]]] = {}
+            self.last_turn_trace = TurnTrace()
+
+    def _get_turn_state(self) -> Tuple[Dict[str, Tuple[int, List[Entity]]], TurnTrace]:
+        """The current turn's retrieval cache and trace, for work that may still be running when the next turn starts"""
+        with self._retrieval_lock:
+            return self._turn_retrievals, self.last_turn_trace
+
+    def _get_memories(self, text: str, topk: int, turn_state: Optional[Tuple[Dict[str, Tuple[int, List[Entity]]], TurnTrace]] = None) -> List[str]:
+        """
+        Contents of the top-k brain memories for text (best first), searching at most once per text per turn.
+        turn_state: the turn to record the retrieval in (see _get_turn_state), the current one if None
+        """
+        turn_retrievals, trace = turn_state if turn_state is not None else self._get_turn_state()
+        with self._retrieval_lock:
+            cached = turn_retrievals.get(text)
+        cache_hit = cached is not None and cached[0] >= topk
+        if cache_hit:
+            memories = cached[1]
+        else:
+            search_topk = max(topk, self.retrieval_topk)
+            memories = self.brain_memory.get_memories(text, topk=search_topk)
+            with self._retrieval_lock:
+                turn_retrievals[text] = (search_topk, memories)
+        with self._retrieval_lock:
+            trace.retrievals.append(RetrievalTrace(query=text, topk=topk, cache_hit=cache_hit))
+        return [memory.content for memory in memories[:topk]]
+
+    def _update_response_prompt(self, memories: Optional[List[str]] = None, agent: Optional[Agent] = None) -> None:
+        agent = agent if agent is not None else self.response_agent
+        agent.update_system_prompt(self._build_system_prompt())
+        agent.update_dynamic_context(self._build_dynamic_segments(memories=memories))
+
+    def _build_preprocess_context(self, user_message: str) -> Optional[str]:
         # Get brain memories to provide context for preprocessor, using the last user message
         if user_message:
-            memories = self.brain_memory.get_memories(user_message, topk=3, as_str=True)
+            memories = self._get_memories(user_message, topk=3)
             if memories:
-                preprocess_agent_system_prompt += f"""
-                Context:
-                {memories}
-                """
+                return "Context:\n" + "\n".join(memories)
+        return None
+
+    def _update_preprocess_prompt(self, user_message: str, include_brain_context: bool = True) -> None:
+        # Use only the template-provided preprocess prompt
+        if not self.preprocess_system_prompt:
+            raise ValueError("preprocess_system_prompt is required in NPCTemplate")
+        self.preprocessor_agent.update_system_prompt(self.preprocess_system_prompt)
+        self.preprocessor_agent.update_dynamic_context(self._build_preprocess_context(user_message) if include_brain_context else None)
 
-        self.preprocessor_agent.update_system_prompt(preprocess_agent_system_prompt)
+    def _preprocess_input(self, user_message: str, include_brain_context: bool = True) -> PreprocessedUserInput:
+        local_decision = self._classify_locally(user_message)
+        if local_decision is not None and local_decision.skip_llm and not self.shadow_local_preprocessor:
+            return self._get_local_preprocess_result(user_message)
+
+        self._update_preprocess_prompt(user_message, include_brain_context)
         message_history_truncated = self.conversation_memory.chat_memory[-self.last_messages_to_retain_for_preprocessor:]
-        Logger.verbose(f"Full input to preprocessor LLM:\nContext:{preprocess_agent_system_prompt}\nMessage History:\n{message_history_truncated}")
+        Logger.verbose(f"Full input to preprocessor LLM:\nContext:{self.preprocessor_agent.dynamic_context}\nMessage History:\n{message_history_truncated}")
         preprocessed_message: PreprocessedUserInput = self.preprocessor_agent.chat_with_history(message_history_truncated)
         if preprocessed_message.text == "":
             preprocessed_message.text = "<empty>"
+        self._record_shadow_result(local_decision, preprocessed_message)
+        return preprocessed_message
+
+    async def _apreprocess_input(self, user_message: str, include_brain_context: bool = True) -> PreprocessedUserInput:
+        # The brain memory and local classifier are synchronous (Qdrant + embeddings), so keep them off the event loop
+        local_decision = await asyncio.to_thread(self._classify_locally, user_message)
+        if local_decision is not None and local_decision.skip_llm and not self.shadow_local_preprocessor:
+            return self._get_local_preprocess_result(user_message)
+
+        await asyncio.to_thread(self._update_preprocess_prompt, user_message, include_brain_context)
+        message_history_truncated = self.conversation_memory.chat_memory[-self.last_messages_to_retain_for_preprocessor:]
+        Logger.verbose(f"Full input to preprocessor LLM:\nContext:{self.preprocessor_agent.dynamic_context}\nMessage History:\n{message_history_truncated}")
+        preprocessed_message: PreprocessedUserInput = await self.preprocessor_agent.achat_with_history(message_history_truncated)
+        if preprocessed_message.text == "":
+            preprocessed_message.text = "<empty>"
+        self._record_shadow_result(local_decision, preprocessed_message)
         return preprocessed_message
 
+    def _classify_locally(self, user_message: str) -> Optional[LocalPreprocessDecision]:
+        if self.local_preprocessor is None:
+            return None
+        # The user message is already in the chat memory, so the response it replies to comes right before it
+        chat_memory = self.conversation_memory.chat_memory
+        last_response = chat_memory[-2].content if len(chat_memory) >= 2 and chat_memory[-2].role == Role.assistant else None
+        decision = self.local_preprocessor.classify(user_message, last_response)
+        self.last_turn_trace.local_preprocess_reason = decision.reason
+        return decision
+
+    def _get_local_preprocess_result(self, user_message: str) -> PreprocessedUserInput:
+        # The fast path only skips messages without pronouns and without anything worth remembering
+        self.last_turn_trace.preprocess_source = "local"
+        Logger.verbose(f"Skipping the preprocessor LLM for: {user_message}")
+        return PreprocessedUserInput(text=user_message or "<empty>", has_information=False, ambiguous_pronouns="", needs_clarification=False)
+
+    def _record_shadow_result(self, local_decision: Optional[LocalPreprocessDecision], preprocessed_message: PreprocessedUserInput) -> None:
+        if local_decision is not None and self.shadow_local_preprocessor:
+            self.local_preprocessor.record_shadow_result(local_decision, preprocessed_message.has_information, preprocessed_message.needs_clarification)
+
+    # ---------- Private API - Pipelined turns ----------
+
+    def _submit(self, fn, *args, **kwargs) -> Future:
+        # Run with a copy of the caller's context so the turn's deadline carries over to the worker thread
+        context = contextvars.copy_context()
+        return _pipeline_executor.submit(context.run, fn, *args, **kwargs)
+
+    def _wait_for(self, future: Future, operation: str):
+        done, _ = wait([future], timeout=deadline.remaining_s())
+        if not done:
+            raise DeadlineExceeded(f"Deadline exceeded waiting for {operation}")
+        return future.result()
+
+    def _fork_response_agent(self) -> Agent:
+        # The speculative response may be discarded while it still runs, so it writes its prompt and token count
+        # to a copy of the response agent, which only replaces the real one if the response is used
+        return copy.copy(self.response_agent)
+
+    def _retrieve_and_respond(self, user_message: str, message_history: List, agent: Agent, turn_state) -> ChatResponse:
+        self._update_response_prompt(memories=self._get_memories(user_message, topk=5, turn_state=turn_state), agent=agent)
+        return agent.chat_with_history(message_history)
+
+    async def _aretrieve_and_respond(self, user_message: str, message_history: List, agent: Agent, turn_state) -> ChatResponse:
+        memories = await asyncio.to_thread(self._get_memories, user_message, 5, turn_state)
+        await asyncio.to_thread(self._update_response_prompt, memories, agent)
+        return await agent.achat_with_history(message_history)
+
+    def _chat_pipelined(self, user_message: str) -> ChatResponse:
+        # The response is started from a snapshot of the history, so the clarification path can't change what it sees
+        message_history = list(self.conversation_memory.chat_memory)
+        if self.speculative_response:
+            speculative_agent = self._fork_response_agent()
+            response_future = self._submit(self._retrieve_and_respond, user_message, message_history, speculative_agent, self._get_turn_state())
+        else:
+            memories_future = self._submit(self._get_memories, user_message, topk=5)
+
+        preprocessed_message: PreprocessedUserInput = self._preprocess_input(user_message, include_brain_context=False)
+        Logger.verbose(f"Preprocessed message: {preprocessed_message}")
+
+        if preprocessed_message.needs_clarification:
+            if self.speculative_response:
+                Logger.verbose("Discarding the speculative response, the preprocessor asked for clarification")
+                response_future.cancel()  # Only stops it if it has not started; otherwise it finishes on its own agent
+            return self._ask_for_clarification()
+
+        if preprocessed_message.has_information:
+            self.brain_memory.add_memory(preprocessed_user_text=preprocessed_message.text)
+
+        if self.speculative_response:
+            response_obj: ChatResponse = self._wait_for(response_future, "the speculative response")
+            self.response_agent = speculative_agent
+        else:
+            self._update_response_prompt(memories=self._wait_for(memories_future, "memory retrieval"))
+            response_obj = self.response_agent.chat_with_history(message_history)
+
+        self._record_response(response_obj)
+        return response_obj
+
+    async def _achat_pipelined(self, user_message: str) -> ChatResponse:
+        message_history = list(self.conversation_memory.chat_memory)
+        if self.speculative_response:
+            speculative_agent = self._fork_response_agent()
+            pending_task = asyncio.ensure_future(self._aretrieve_and_respond(user_message, message_history, speculative_agent, self._get_turn_state()))
+        else:
+            pending_task = asyncio.ensure_future(asyncio.to_thread(self._get_memories, user_message, topk=5))
+
+        try:
+            preprocessed_message: PreprocessedUserInput = await self._apreprocess_input(user_message, include_brain_context=False)
+            Logger.verbose(f"Preprocessed message: {preprocessed_message}")
+
+            if preprocessed_message.needs_clarification:
+                return self._ask_for_clarification()
+
+            if preprocessed_message.has_information:
+                await asyncio.to_thread(self.brain_memory.add_memory, preprocessed_user_text=preprocessed_message.text)
+
+            if self.speculative_response:
+                response_obj: ChatResponse = await pending_task
+                self.response_agent = speculative_agent
+            else:
+                await asyncio.to_thread(self._update_response_prompt, await pending_task)
+                response_obj = await self.response_agent.achat_with_history(message_history)
+        finally:
+            # Cancels the speculative response (or retrieval) when it is not needed
+            pending_task.cancel()
+
+        self._record_response(response_obj)
+        return response_obj
+
     # ---------- Private API - State Management ----------
 
     def _save_state(self) -> None:
@@ -156,8 +393,16 @@ class NPC2:
             conversation_memory=self.conversation_memory.get_state(),
             # system_context removed from NPCState
             user_prompt_wrapper=self.user_prompt_wrapper,
+            # Without the episodic memory on, keep the loaded episodes rather than dropping them
+            episodes=self.episodic_memory.episodes if self.episodic_memory is not None else self._saved_episodes,
+            first_live_episode=self.episodic_memory.first_live_turn if self.episodic_memory is not None else self._saved_first_live_episode,
         )
+        if self.save_journal is not None and self.save_journal.append_changes(current_state):
+            Logger.log(f"Session changes journaled to {self.save_journal.journal_path}", Level.DEBUG)
+            return
         io_utils.save_to_yaml_file(current_state, save_path)
+        if self.save_journal is not None:
+            self.save_journal.reset(current_state)
         Logger.log(f"Session saved successfully to {save_path}", Level.INFO)
         # Note that the vdb collection does not need to be saved.
 
@@ -165,8 +410,11 @@ class NPC2:
         try:
             # Load the conversation memory and other metadata for the NPC
             prior: NPCState = io_utils.load_yaml_into_dataclass(self.save_paths.npc_save_state(self.npc_name), NPCState)
+            prior = replay_journal(prior, self.save_paths.npc_save_state(self.npc_name))
             self.conversation_memory = ConversationMemory.from_state(prior.conversation_memory, self.summarization_prompt)
             self.user_prompt_wrapper = prior.user_prompt_wrapper
+            self._saved_episodes = prior.episodes
+            self._saved_first_live_episode = prior.first_live_episode
         except FileNotFoundError as e:
             Logger.log(f"NPC state file not found: {e}", Level.ERROR)
             Logger.log("Starting a new game.", Level.INFO)
@@ -176,6 +424,10 @@ class NPC2:
         # Create a fresh conversation memory
         self.conversation_memory = ConversationMemory.from_new(self.summarization_prompt)
         self.brain_memory.clear_all_memories()
+        self._saved_episodes = []
+        self._saved_first_live_episode = 0
+        if self.episodic_memory is not None:
+            self.episodic_memory.clear()
         # Load prior knowledge from template if it exists
         if self.template.prior_knowledge is not None and len(self.template.prior_knowledge) > 0:
             for knowledge_item in self.template.prior_knowledge:
@@ -183,6 +435,46 @@ class NPC2:
 
 
     # ---------- Public API / Protocol ----------
+    def enable_context_packing(self, token_budget: Optional[int] = None) -> None:
+        """
+        Fit each LLM request into a prompt token budget (see ContextPacker.py). The system prompt and the latest
+        message are always sent; the summary, the memories (best first) and the most recent turns share the rest, in that order.
+
+        Args:
+            token_budget: Max prompt tokens per request. None uses the per-model default from LLM_PROMPT_TOKEN_BUDGETS
+        """
+        self.context_packer = ContextPacker(token_budget)
+        self.response_agent.context_packer = self.context_packer
+        self.preprocessor_agent.context_packer = self.context_packer
+
+    def enable_episodic_memory(self, topk: int = 3) -> None:
+        """
+        Index every completed exchange and add the topk most relevant past ones (that are no longer in the
+        conversation memory) to the response's dynamic context, verbatim. Episodes are embedded through the brain
+        collection's embedding cache and saved with the NPC's state.
+        """
+        self.episodic_memory = EpisodicMemory(self.brain_memory.collection.get_embeddings, self._saved_episodes, self._saved_first_live_episode)
+        self.episodic_memory.link_live_window(self.conversation_memory.chat_memory)
+        self.episodic_recall_topk = topk
+
+    def enable_journaled_saves(self, compact_every: int = 50) -> None:
+        """
+        Append only what changed since the last save to a journal next to the save file, instead of rewriting the
+        whole file each turn (see state_journal.py). Every compact_every saves the full file is rewritten and the
+        journal starts over. Loading always replays the journal, so it's never lost when this is off.
+        """
+        self.save_journal = StateJournal(self.save_paths.npc_save_state(self.npc_name), compact_every)
+
+    def enable_local_preprocessor(self, shadow: bool = False, **classifier_kwargs) -> None:
+        """
+        Skip the preprocessor LLM call for trivial messages (see local_preprocessor.py). Message embeddings go through
+        the brain collection's embedding cache, so retrieval reuses them. With shadow on, the LLM still runs and
+        local_preprocessor.get_stats() reports how often the fast path would have been wrong.
+        """
+        examples = self._load_global_config("local_preprocess_examples.yaml")["local_preprocess_examples"]
+        self.local_preprocessor = LocalPreprocessClassifier(self.brain_memory.collection.get_embedding, examples, **classifier_kwargs)
+        self.shadow_local_preprocessor = shadow
+
     def maintain(self) -> None:
         """Perform periodic maintenance (e.g., summarization) and persist state."""
         self.conversation_memory.maintain()
@@ -232,34 +524,132 @@ class NPC2:
                 )
                 self.conversation_memory.chat_memory.append(chat_message)
 
-    def chat(self, user_message: Optional[str]) -> ChatResponse:
-        """Primary chat API: preprocess, update brain, build prompt, respond, persist. Returns ChatResponse."""
+    def chat(self, user_message: Optional[str], timeout_s: Optional[float] = None) -> ChatResponse:
+        """
+        Primary chat API: preprocess, update brain, build prompt, respond, persist. Returns ChatResponse.
+        All LLM calls of the turn share one deadline of timeout_s (default chat_timeout_s) and raise
+        DeadlineExceeded when it runs out; the user message stays in the conversation history.
+        With parallel_pipeline on, retrieval, preprocessing and (optionally) the response overlap.
+        """
+        with deadline.deadline(timeout_s if timeout_s is not None else self.chat_timeout_s):
+            return self._chat(user_message)
+
+    def _chat(self, user_message: Optional[str]) -> ChatResponse:
         if user_message is None:
             user_message = ""
+        self._start_turn()
         # Add user message to conversation history
         self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
+        if self.parallel_pipeline:
+            return self._chat_pipelined(user_message)
 
         # Preprocess using brain context
         preprocessed_message: PreprocessedUserInput = self._preprocess_input(user_message)
         Logger.verbose(f"Preprocessed message: {preprocessed_message}")
 
         if preprocessed_message.needs_clarification:
-            clarification = (
-                "I need clarification on one or more of the pronouns you used. Please rephrase your message."
-            )
-            self.conversation_memory.append_chat(clarification, role=Role.assistant, cot=None, off_switch=False)
-            return ChatResponse(hidden_thought_process=None, response=clarification, off_switch=False)
+            return self._ask_for_clarification()
 
         # Update brain memory if there's information
         if preprocessed_message.has_information:
             self.brain_memory.add_memory(preprocessed_user_text=preprocessed_message.text)
 
-        # Build system prompt (includes convo summary and brain context)
-        self.response_agent.update_system_prompt(self._build_system_prompt())
+        # Build system prompt and dynamic context (convo summary and brain context)
+        deadline.check("building the response prompt")
+        self._update_response_prompt()
 
         # Call response agent with full conversation history
         response_obj: ChatResponse = self.response_agent.chat_with_history(self.conversation_memory.chat_memory)
 
+        self._record_response(response_obj)
+        return response_obj
+
+    async def achat(self, user_message: Optional[str], timeout_s: Optional[float] = None) -> ChatResponse:
+        """Async version of chat. LLM calls are awaited; brain memory access runs in worker threads."""
+        with deadline.deadline(timeout_s if timeout_s is not None else self.chat_timeout_s):
+            return await self._achat(user_message)
+
+    async def _achat(self, user_message: Optional[str]) -> ChatResponse:
+        if user_message is None:
+            user_message = ""
+        self._start_turn()
+        self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
+        if self.parallel_pipeline:
+            return await self._achat_pipelined(user_message)
+
+        preprocessed_message: PreprocessedUserInput = await self._apreprocess_input(user_message)
+        Logger.verbose(f"Preprocessed message: {preprocessed_message}")
+
+        if preprocessed_message.needs_clarification:
+            return self._ask_for_clarification()
+
+        if preprocessed_message.has_information:
+            await asyncio.to_thread(self.brain_memory.add_memory, preprocessed_user_text=preprocessed_message.text)
+
+        await asyncio.to_thread(self._update_response_prompt)
+
+        response_obj: ChatResponse = await self.response_agent.achat_with_history(self.conversation_memory.chat_memory)
+
+        self._record_response(response_obj)
+        return response_obj
+
+    def chat_stream(self, user_message: Optional[str]) -> ResponseStream[ChatResponse]:
+        """
+        Streaming version of chat. Preprocessing, brain updates and prompt building happen up front;
+        the response text is then yielded as it is generated and recorded once the stream is exhausted.
+        """
+        if user_message is None:
+            user_message = ""
+        self._start_turn()
+        self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
+
+        preprocessed_message: PreprocessedUserInput = self._preprocess_input(user_message)
+        Logger.verbose(f"Preprocessed message: {preprocessed_message}")
+
+        if preprocessed_message.needs_clarification:
+            clarification = self._ask_for_clarification()
+            return ResponseStream.completed(clarification, clarification.response)
+
+        if preprocessed_message.has_information:
+            self.brain_memory.add_memory(preprocessed_user_text=preprocessed_message.text)
+
+        self._update_response_prompt()
+
+        stream = self.response_agent.stream_chat_with_history(self.conversation_memory.chat_memory)
+        stream.add_done_callback(self._record_response)
+        return stream
+
+    async def achat_stream(self, user_message: Optional[str]) -> AsyncResponseStream[ChatResponse]:
+        """Async version of chat_stream. Iterate the returned stream with async for."""
+        if user_message is None:
+            user_message = ""
+        self._start_turn()
+        self.conversation_memory.append_chat(user_message, role=Role.user, off_switch=False)
+
+        preprocessed_message: PreprocessedUserInput = await self._apreprocess_input(user_message)
+        Logger.verbose(f"Preprocessed message: {preprocessed_message}")
+
+        if preprocessed_message.needs_clarification:
+            clarification = self._ask_for_clarification()
+            return AsyncResponseStream.completed(clarification, clarification.response)
+
+        if preprocessed_message.has_information:
+            await asyncio.to_thread(self.brain_memory.add_memory, preprocessed_user_text=preprocessed_message.text)
+
+        await asyncio.to_thread(self._update_response_prompt)
+
+        stream = self.response_agent.astream_chat_with_history(self.conversation_memory.chat_memory)
+        stream.add_done_callback(self._record_response)
+        return stream
+
+    def _ask_for_clarification(self) -> ChatResponse:
+        clarification = (
+            "I need clarification on one or more of the pronouns you used. Please rephrase your message."
+        )
+        self.conversation_memory.append_chat(clarification, role=Role.assistant, cot=None, off_switch=False)
+        return ChatResponse(hidden_thought_process=None, response=clarification, off_switch=False)
+
+    def _record_response(self, response_obj: ChatResponse) -> None:
         # Append response to conversation
         assistant_text = response_obj.response
         self.conversation_memory.append_chat(
@@ -268,5 +658,6 @@ class NPC2:
             off_switch=response_obj.off_switch,
             cot=response_obj.hidden_thought_process,
         )
-
-        return response_obj
+        chat_memory = self.conversation_memory.chat_memory
+        if self.episodic_memory is not None and len(chat_memory) >= 2 and chat_memory[-2].role == Role.user:
+            self.episodic_memory.add_exchange(chat_memory[-2:])
@@ -3,11 +3,24 @@ from typing import List, Protocol, Optional, Dict
 from src.core.Constants import Role
 from src.core.schemas.CollectionSchemas import Entity
 from src.core.ResponseTypes import ChatResponse
+from src.core.ResponseStream import AsyncResponseStream, ResponseStream
 
 
 class NPCProtocol(Protocol):
     def chat(self, user_message: Optional[str]) -> ChatResponse:
         ...
+
+    async def achat(self, user_message: Optional[str]) -> ChatResponse:
+        """Async version of chat, so many NPC turns can be in flight on one event loop"""
+        ...
+
+    def chat_stream(self, user_message: Optional[str]) -> ResponseStream[ChatResponse]:
+        """Streaming version of chat: iterate to get the spoken text as it is generated; stream.response holds the ChatResponse once exhausted"""
+        ...
+
+    async def achat_stream(self, user_message: Optional[str]) -> AsyncResponseStream[ChatResponse]:
+        """Async version of chat_stream; iterate the returned stream with async for"""
+        ...
     
     def maintain(self) -> None:
         ...
@@ -1,17 +1,30 @@
+import asyncio
 import os
+import random
 import sys
-from typing import Dict, List, Type, TypeVar, Tuple
+import time
+from dataclasses import is_dataclass, replace
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Type, TypeVar, Tuple, Union
 
+import httpx
 import openai
 from dotenv import load_dotenv
-from openai import OpenAI
 import ollama
 
-from src.utils import Logger, llm_utils
+from src.utils import Logger, client_registry, deadline, json_repair, llm_utils
 from src.utils.Logger import Level
-from src.core.Constants import embedding_models, Llm, Platform
+from src.core.Constants import embedding_models, json_mode_models, Llm, LLM_RATE_LIMITS, Platform
 from src.utils.token_counter import count_tokens_for_messages, count_tokens_for_text
 from src.core.TokenTracking import TokenCount
+from src.core.ResponseStream import AsyncResponseStream, ResponseStream
+from src.utils.llm_response_cache import LlmResponseCache
+from src.utils.llm_transcript import LatencyModel, LlmTranscript, TranscriptMode
+from src.utils.deadline import DeadlineExceeded
+from src.utils.hedging import Hedging, LatencyTracker
+from src.utils.json_repair import JsonRepairStats
+from src.utils.rate_limiter import RateLimit, RateLimiter
+from src.utils.single_flight import SingleFlight
 
 filename = os.path.splitext(os.path.basename(__file__))[0]
 if __name__ == "__main__" or __name__ == filename: # If the script is being run directly
@@ -25,24 +38,100 @@ class ChatBot:
 
     default_chat_model: Llm = Llm.gpt_4o_mini
     llm_formatting_retries = 3
+    native_json_mode = True  # Ask the provider for JSON output when the response type is a dataclass and the model supports it
+    json_repair_stats = JsonRepairStats()  # LLM re-calls saved by local JSON repair
+    response_cache: Optional[LlmResponseCache] = None  # Opt-in, see enable_response_cache
+    transcript: Optional[LlmTranscript] = None  # Opt-in record/replay backend, see set_transcript
+    rate_limiter: Optional[RateLimiter] = None  # Opt-in process-wide RPM/TPM throttling, see enable_rate_limiter
+    rate_limit_retries = 5  # Re-tries after a 429, each after the provider's Retry-After
+    single_flight = SingleFlight()  # Concurrent identical requests share one provider call, see set_request_coalescing
+    transient_error_retries = 3  # Re-tries after connection errors, timeouts and 5xx responses
+    backoff_base_s = 0.5  # Backoff before re-try n is uniform in [0, min(backoff_max_s, backoff_base_s * 2^n)]
+    backoff_max_s = 20.0
+    hedging: Optional[Hedging] = None  # Opt-in hedged requests, see enable_hedging
+    latencies = LatencyTracker(min_samples=5)  # Per-model provider latencies, used by latency-based model policies
 
-    # Load the OpenAI API key from the .env file and initialize the OpenAI client
+    # Load the OpenAI API key from the .env file. Clients are pooled and shared process-wide, see client_registry
     init_dotenv()
     api_key = os.getenv("OPENAI_API_KEY")
     openai.api_key = api_key  # For backward compatibility
-    chatGptClient = OpenAI(api_key=api_key)
+    # Re-tries are handled here (deadline-aware backoff), so the SDK's own re-tries are turned off
+    chatGptClient = client_registry.get_openai_client().with_options(max_retries=0)
+    ollamaClient = client_registry.get_ollama_client()
+    # Async clients are bound to an event loop, so by default each call uses the running loop's pooled client
+    chatGptAsyncClient: Optional[openai.AsyncOpenAI] = None
+    ollamaAsyncClient: Optional[ollama.AsyncClient] = None
+
+    def _get_openai_async_client() -> openai.AsyncOpenAI:
+        if ChatBot.chatGptAsyncClient is not None:
+            return ChatBot.chatGptAsyncClient
+        return client_registry.get_async_openai_client().with_options(max_retries=0)
+
+    def _get_ollama_async_client() -> ollama.AsyncClient:
+        if ChatBot.ollamaAsyncClient is not None:
+            return ChatBot.ollamaAsyncClient
+        return client_registry.get_ollama_async_client()
 
     def set_chat_model(model: Llm):
         ChatBot.default_chat_model = model
 
+    def enable_response_cache(cache_file: Optional[Path] = None, max_entries: int = 10_000, ttl_seconds: Optional[float] = None) -> LlmResponseCache:
+        """Serve identical (model, messages, response_type) requests from an on-disk cache instead of the API."""
+        ChatBot.response_cache = LlmResponseCache(cache_file=cache_file, max_entries=max_entries, ttl_seconds=ttl_seconds)
+        return ChatBot.response_cache
+
+    def disable_response_cache() -> None:
+        if ChatBot.response_cache is not None:
+            ChatBot.response_cache.close()
+        ChatBot.response_cache = None
+
+    def set_transcript(transcript_file: Path, mode: TranscriptMode, latency_model: Optional[LatencyModel] = None) -> LlmTranscript:
+        """Record every LLM exchange to a transcript, or replay a recorded transcript with no network access."""
+        ChatBot.transcript = LlmTranscript(transcript_file, mode, latency_model=latency_model)
+        return ChatBot.transcript
+
+    def clear_transcript() -> None:
+        ChatBot.transcript = None
+
+    def enable_rate_limiter(limits: Optional[Dict[Llm, RateLimit]] = None, burst_seconds: float = 10.0) -> RateLimiter:
+        """
+        Throttle every LLM call in the process to per-model requests/tokens per minute budgets.
+        Defaults come from Constants.LLM_RATE_LIMITS; limits overrides them per model.
+        """
+        merged_limits = {model: RateLimit(**limit) for model, limit in LLM_RATE_LIMITS.items()}
+        merged_limits.update(limits or {})
+        ChatBot.rate_limiter = RateLimiter(merged_limits, burst_seconds=burst_seconds)
+        return ChatBot.rate_limiter
+
+    def disable_rate_limiter() -> None:
+        ChatBot.rate_limiter = None
+
+    def enable_hedging(percentile: float = 0.95, min_samples: int = 20) -> Hedging:
+        """
+        Fire a second identical request when a call runs past the model's recent latency percentile
+        and take whichever finishes first. Hedged duplicates are billed but not counted in TokenCounts.
+        """
+        ChatBot.hedging = Hedging(percentile=percentile, min_samples=min_samples)
+        return ChatBot.hedging
+
+    def disable_hedging() -> None:
+        ChatBot.hedging = None
+
+    def set_request_coalescing(enabled: bool) -> None:
+        """
+        Turn single-flight coalescing of concurrent identical requests on or off.
+        Turn it off when identical prompts running in parallel should each get their own sample.
+        """
+        ChatBot.single_flight.enabled = enabled
+
     def get_platform_of_model(model: Llm):
         for platform, models in embedding_models.items():
             if model in models:
                 return platform
         return None
 
-    # Function to call the OpenAI API
-    def _call_llm_internal(chatGptMessages, chat_model: Llm = None) -> Tuple[str, TokenCount]:
+    # Function to call the LLM backend (real provider, or the record/replay transcript)
+    def _call_llm_internal(chatGptMessages, chat_model: Llm = None, json_mode: bool = False) -> Tuple[str, TokenCount]:
         """
         Call the LLM and return both the response and token count.
         
@@ -51,35 +140,144 @@ class ChatBot:
         """
         if chat_model is None:
             chat_model = ChatBot.default_chat_model
+        transcript = ChatBot.transcript
+        if transcript is not None and transcript.mode == TranscriptMode.replay:
+            return transcript.replay(chat_model, chatGptMessages)
+
+        start_time = time.monotonic()
+        (response, token_count), shared = ChatBot.single_flight.do(
+            ChatBot._get_request_key(chatGptMessages, chat_model, json_mode),
+            lambda: ChatBot._call_platform_rate_limited(chatGptMessages, chat_model, json_mode),
+        )
+        if shared:
+            # Another caller paid for this call; its transcript entry is recorded by that caller
+            return response, replace(token_count, cached=True)
+        ChatBot.latencies.record(chat_model, time.monotonic() - start_time)
+        if transcript is not None and transcript.mode == TranscriptMode.record:
+            transcript.record(chat_model, chatGptMessages, response, token_count, time.monotonic() - start_time)
+        return response, token_count
+
+    def _get_request_key(chatGptMessages, chat_model: Llm, json_mode: bool) -> str:
+        return llm_utils.get_request_hash(chat_model, chatGptMessages, "json_mode" if json_mode else "")
+
+    # Rate limited wrappers around the provider calls. Each request is admitted by the model's limiter
+    # (input tokens estimated up front, output tokens debited afterwards) and re-tried after a 429
+    def _call_platform_rate_limited(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Tuple[str, TokenCount]:
+        limiter = ChatBot.rate_limiter.for_model(chat_model) if ChatBot.rate_limiter is not None else None
+        if limiter is None:
+            return ChatBot._call_platform_with_retries(chatGptMessages, chat_model, json_mode)
+        estimated_tokens = count_tokens_for_messages(chatGptMessages, chat_model)
+        for attempt in range(ChatBot.rate_limit_retries + 1):
+            limiter.acquire(estimated_tokens)
+            try:
+                response, token_count = ChatBot._call_platform_with_retries(chatGptMessages, chat_model, json_mode)
+            except openai.RateLimitError as e:
+                if attempt == ChatBot.rate_limit_retries:
+                    raise
+                ChatBot._pause_for_rate_limit(limiter, e, attempt)
+                continue
+            limiter.record_usage(token_count.input_tokens + token_count.output_tokens - estimated_tokens)
+            return response, token_count
+
+    async def _call_platform_rate_limited_async(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Tuple[str, TokenCount]:
+        limiter = ChatBot.rate_limiter.for_model(chat_model) if ChatBot.rate_limiter is not None else None
+        if limiter is None:
+            return await ChatBot._call_platform_with_retries_async(chatGptMessages, chat_model, json_mode)
+        estimated_tokens = count_tokens_for_messages(chatGptMessages, chat_model)
+        for attempt in range(ChatBot.rate_limit_retries + 1):
+            await limiter.acquire_async(estimated_tokens)
+            try:
+                response, token_count = await ChatBot._call_platform_with_retries_async(chatGptMessages, chat_model, json_mode)
+            except openai.RateLimitError as e:
+                if attempt == ChatBot.rate_limit_retries:
+                    raise
+                ChatBot._pause_for_rate_limit(limiter, e, attempt)
+                continue
+            limiter.record_usage(token_count.input_tokens + token_count.output_tokens - estimated_tokens)
+            return response, token_count
+
+    def _pause_for_rate_limit(limiter, error: openai.RateLimitError, attempt: int) -> None:
+        retry_after_s = ChatBot._get_retry_after(error, attempt)
+        Logger.log(f"Rate limited by the LLM provider, pausing for {retry_after_s:.1f}s: {error}", Level.WARNING)
+        limiter.pause(retry_after_s)
+
+    def _get_retry_after(error: openai.RateLimitError, attempt: int) -> float:
+        """Seconds to wait after a 429: the Retry-After(-ms) header if present, exponential backoff otherwise."""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000.0
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass  # e.g. an HTTP date; fall back to backoff
+        return min(60.0, 2.0 ** attempt)
+
+    # Re-tries with jittered exponential backoff on transient errors, within the current deadline (see deadline.py),
+    # optionally hedging each attempt. 429s are handled by the rate limiter above when it is enabled
+    def _call_platform_with_retries(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Tuple[str, TokenCount]:
+        for attempt in range(ChatBot.transient_error_retries + 1):
+            deadline.check(f"calling {chat_model.value}")
+            try:
+                if ChatBot.hedging is not None:
+                    return ChatBot.hedging.call(chat_model, lambda: ChatBot._call_platform(chatGptMessages, chat_model, json_mode))
+                return ChatBot._call_platform(chatGptMessages, chat_model, json_mode)
+            except Exception as e:
+                if attempt == ChatBot.transient_error_retries or not ChatBot._is_transient_error(e):
+                    raise
+                time.sleep(ChatBot._get_backoff_delay(e, attempt, chat_model))
+
+    async def _call_platform_with_retries_async(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Tuple[str, TokenCount]:
+        for attempt in range(ChatBot.transient_error_retries + 1):
+            deadline.check(f"calling {chat_model.value}")
+            try:
+                if ChatBot.hedging is not None:
+                    call = ChatBot.hedging.call_async(chat_model, lambda: ChatBot._call_platform_async(chatGptMessages, chat_model, json_mode))
+                else:
+                    call = ChatBot._call_platform_async(chatGptMessages, chat_model, json_mode)
+                return await deadline.wait_for(call, f"calling {chat_model.value}")
+            except Exception as e:
+                if attempt == ChatBot.transient_error_retries or not ChatBot._is_transient_error(e):
+                    raise
+                await asyncio.sleep(ChatBot._get_backoff_delay(e, attempt, chat_model))
+
+    def _is_transient_error(error: Exception) -> bool:
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if isinstance(error, openai.RateLimitError):
+            return ChatBot.rate_limiter is None
+        if isinstance(error, (openai.APIConnectionError, openai.InternalServerError, httpx.TransportError)):
+            return True  # openai.APITimeoutError is an APIConnectionError
+        return isinstance(error, ollama.ResponseError) and error.status_code >= 500
+
+    def _get_backoff_delay(error: Exception, attempt: int, chat_model: Llm) -> float:
+        """Full-jitter exponential backoff (at least the Retry-After for 429s), refused if it would outlast the deadline."""
+        delay_s = random.uniform(0, min(ChatBot.backoff_max_s, ChatBot.backoff_base_s * 2 ** attempt))
+        if isinstance(error, openai.RateLimitError):
+            delay_s = max(delay_s, ChatBot._get_retry_after(error, attempt))
+        remaining_s = deadline.remaining_s()
+        if remaining_s is not None and delay_s >= remaining_s:
+            raise DeadlineExceeded(f"Deadline exceeded: {remaining_s:.1f}s left, {chat_model.value} call failed with {error}") from error
+        Logger.log(f"Transient error from {chat_model.value} ({error}), re-trying in {delay_s:.1f}s", Level.WARNING)
+        return delay_s
+
+    # Function to call the OpenAI/ollama API
+    def _call_platform(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Tuple[str, TokenCount]:
         platform = ChatBot.get_platform_of_model(chat_model)
         
-        # Count input tokens
-        input_tokens = count_tokens_for_messages(chatGptMessages, chat_model)
-        
         if platform == Platform.open_ai:
             completion = ChatBot.chatGptClient.chat.completions.create(
                 model=chat_model.value,
-                messages=chatGptMessages
+                messages=chatGptMessages,
+                **ChatBot._get_openai_json_mode_kwargs(json_mode),
+                **ChatBot._get_openai_timeout_kwargs()
             )
             response = completion.choices[0].message.content
-            
-            # Count output tokens
-            output_tokens = count_tokens_for_text(response, chat_model)
-            
-            # Create token count object
-            token_count = TokenCount.create(chat_model, input_tokens, output_tokens)
-            
-            return response, token_count
+            return response, ChatBot._get_openai_token_count(completion, chatGptMessages, response, chat_model)
         elif platform == Platform.ollama:
-            response = ollama.chat(messages = chatGptMessages, model=chat_model)
-            
-            # Count output tokens for ollama
-            output_tokens = count_tokens_for_text(response, chat_model)
-            
-            # Create token count object (ollama has no cost)
-            token_count = TokenCount.create(chat_model, input_tokens, output_tokens)
-            
-            return response, token_count
+            completion = ChatBot.ollamaClient.chat(messages = chatGptMessages, model=chat_model.value, **ChatBot._get_ollama_json_mode_kwargs(json_mode))
+            response = completion["message"]["content"]
+            return response, ChatBot._get_ollama_token_count(completion, chatGptMessages, response, chat_model)
         else:
             raise Exception(f"ChatGPT model {chat_model} not present in Constants.embedding_models mapping")
 
@@ -129,32 +327,196 @@ class ChatBot:
             print("DEBUG INFO: " + str(message_history))
         return response
 
-    def call_llm(message_history_for_llm: List[Dict[str, str]], response_type: Type[T] = None, chat_model: Llm = None) -> Tuple[T, TokenCount]:        
+    # Async counterpart of _call_llm_internal, backed by the async OpenAI/ollama clients
+    async def _call_llm_internal_async(chatGptMessages, chat_model: Llm = None, json_mode: bool = False) -> Tuple[str, TokenCount]:
+        """
+        Call the LLM without blocking the event loop and return both the response and token count.
+
+        Returns:
+            Tuple of (response_text, TokenCount object)
+        """
+        if chat_model is None:
+            chat_model = ChatBot.default_chat_model
+        transcript = ChatBot.transcript
+        if transcript is not None and transcript.mode == TranscriptMode.replay:
+            response, token_count = transcript.lookup(chat_model, chatGptMessages)
+            delay = transcript.get_replay_delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return response, token_count
+
+        start_time = time.monotonic()
+        (response, token_count), shared = await ChatBot.single_flight.do_async(
+            ChatBot._get_request_key(chatGptMessages, chat_model, json_mode),
+            lambda: ChatBot._call_platform_rate_limited_async(chatGptMessages, chat_model, json_mode),
+        )
+        if shared:
+            return response, replace(token_count, cached=True)
+        ChatBot.latencies.record(chat_model, time.monotonic() - start_time)
+        if transcript is not None and transcript.mode == TranscriptMode.record:
+            transcript.record(chat_model, chatGptMessages, response, token_count, time.monotonic() - start_time)
+        return response, token_count
+
+    async def _call_platform_async(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Tuple[str, TokenCount]:
+        platform = ChatBot.get_platform_of_model(chat_model)
+
+        if platform == Platform.open_ai:
+            completion = await ChatBot._get_openai_async_client().chat.completions.create(
+                model=chat_model.value,
+                messages=chatGptMessages,
+                **ChatBot._get_openai_json_mode_kwargs(json_mode),
+                **ChatBot._get_openai_timeout_kwargs()
+            )
+            response = completion.choices[0].message.content
+            return response, ChatBot._get_openai_token_count(completion, chatGptMessages, response, chat_model)
+        elif platform == Platform.ollama:
+            completion = await ChatBot._get_ollama_async_client().chat(messages=chatGptMessages, model=chat_model.value, **ChatBot._get_ollama_json_mode_kwargs(json_mode))
+            response = completion["message"]["content"]
+            return response, ChatBot._get_ollama_token_count(completion, chatGptMessages, response, chat_model)
+        else:
+            raise Exception(f"ChatGPT model {chat_model} not present in Constants.embedding_models mapping")
+
+    def _get_cached_response(message_history_for_llm: List[Dict[str, str]], response_type: Type[T], chat_model: Llm) -> Optional[Tuple[T, TokenCount]]:
+        """Returns the parsed cached response, or None if caching is off, the entry is missing, or it no longer parses."""
+        if ChatBot.response_cache is None:
+            return None
+        cache_key = LlmResponseCache.make_key(chat_model, message_history_for_llm, response_type)
+        cached = ChatBot.response_cache.get(cache_key)
+        if cached is None:
+            return None
+        response_raw, token_count = cached
+        if response_type is None:
+            return response_raw, token_count
+        try:
+            return ChatBot._parse_llm_response(response_raw, response_type), token_count
+        except Exception as e:
+            Logger.log(f"Cached LLM response no longer parses as {response_type}: {e}. Calling the LLM instead.", Level.WARNING)
+            return None
+
+    def _cache_response(message_history_for_llm: List[Dict[str, str]], response_type: Type[T], chat_model: Llm, response_raw: str, token_count: TokenCount) -> None:
+        """Only responses that parsed successfully are cached, so formatting retries always hit the LLM."""
+        if ChatBot.response_cache is None:
+            return
+        cache_key = LlmResponseCache.make_key(chat_model, message_history_for_llm, response_type)
+        ChatBot.response_cache.put(cache_key, response_raw, token_count)
+
+    def _repair_llm_response(response_raw: str, response_type: Type[T], token_count: TokenCount) -> Optional[Tuple[T, str]]:
+        """
+        Repair a malformed response locally (see json_repair). Returns (parsed_response, repaired_raw),
+        or None if the response type is not JSON or the response is beyond repair.
+        """
+        if response_raw is None or not json_repair.can_repair(response_type):
+            return None
+        try:
+            repaired = json_repair.repair_llm_response(response_raw, response_type)
+        except Exception as e:
+            Logger.log(f"Local JSON repair failed: {e}", Level.DEBUG)
+            ChatBot.json_repair_stats.record_failure()
+            return None
+        ChatBot.json_repair_stats.record_repair(token_count)
+        Logger.log("Repaired malformed LLM response locally, skipping a re-call", Level.VERBOSE)
+        return repaired
+
+    def _use_json_mode(response_type: Type[T], chat_model: Llm) -> bool:
+        """Native JSON mode only fits a single JSON object, so it is used for dataclass response types only."""
+        return ChatBot.native_json_mode and chat_model in json_mode_models and is_dataclass(response_type)
+
+    def _get_openai_json_mode_kwargs(json_mode: bool) -> Dict:
+        return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    # Token counts come from the provider's reported usage; we only tokenize locally when it is missing
+    def _get_openai_token_count(completion, chatGptMessages, response: str, chat_model: Llm) -> TokenCount:
+        usage = getattr(completion, "usage", None)
+        input_tokens = getattr(usage, "prompt_tokens", None)
+        output_tokens = getattr(usage, "completion_tokens", None)
+        return ChatBot._create_token_count(chatGptMessages, response, chat_model, input_tokens, output_tokens, ChatBot._get_cached_input_tokens(completion))
+
+    def _get_ollama_token_count(completion, chatGptMessages, response: str, chat_model: Llm) -> TokenCount:
+        input_tokens = completion.get("prompt_eval_count") if hasattr(completion, "get") else None
+        output_tokens = completion.get("eval_count") if hasattr(completion, "get") else None
+        return ChatBot._create_token_count(chatGptMessages, response, chat_model, input_tokens, output_tokens)
+
+    def _create_token_count(chatGptMessages, response: str, chat_model: Llm, input_tokens, output_tokens, cached_input_tokens: int = 0) -> TokenCount:
+        if not isinstance(input_tokens, int):
+            input_tokens = count_tokens_for_messages(chatGptMessages, chat_model)
+        if not isinstance(output_tokens, int):
+            output_tokens = count_tokens_for_text(response, chat_model)
+        return TokenCount.create(chat_model, input_tokens, output_tokens, cached_input_tokens)
+
+    def _get_cached_input_tokens(completion) -> int:
+        """Prompt tokens the provider served from its prompt cache (OpenAI usage.prompt_tokens_details.cached_tokens)"""
+        details = getattr(getattr(completion, "usage", None), "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        return cached_tokens if isinstance(cached_tokens, int) else 0
+
+    def _get_openai_timeout_kwargs() -> Dict:
+        """Caps the request at the time left on the current deadline. ollama has no per-request timeout; its calls are bounded by the deadline checks instead."""
+        remaining_s = deadline.remaining_s()
+        if remaining_s is None:
+            return {}
+        if remaining_s == 0:
+            raise DeadlineExceeded("Deadline exceeded before calling the LLM")
+        return {"timeout": remaining_s}
+
+    def _get_ollama_json_mode_kwargs(json_mode: bool) -> Dict:
+        return {"format": "json"} if json_mode else {}
+
+    def _parse_llm_response(response_raw: str, response_type: Type[T]) -> T:
+        """Parse a raw LLM response into response_type, raising if the response is empty or malformed."""
+        Logger.log(f"Raw response from LLM: {response_raw}", Level.DEBUG)
+        if response_raw.strip() == "":
+            raise ValueError("Response is empty")
+        # Extract the object from the response
+        return llm_utils.extract_obj_from_llm_response(response_raw, response_type)
+
+    def call_llm(message_history_for_llm: List[Dict[str, str]], response_type: Type[T] = None, chat_model: Llm = None, fallback_model: Llm = None) -> Tuple[T, TokenCount]:        
         """
         Call LLM with optional structured response type.
+        If fallback_model is given, re-tries after a response that cannot be parsed go to that model instead,
+        and its responses are cached under it (so a rerun that escalates again is served from the cache).
         
         Returns:
             Tuple of (response, TokenCount)
         """
-        response_raw, token_count = ChatBot._call_llm_internal(message_history_for_llm, chat_model)
-        
+        if chat_model is None:
+            chat_model = ChatBot.default_chat_model
+        cached_response = ChatBot._get_cached_response(message_history_for_llm, response_type, chat_model)
+        if cached_response is not None:
+            return cached_response
+
+        json_mode = ChatBot._use_json_mode(response_type, chat_model)
+        response_raw, token_count = ChatBot._call_llm_internal(message_history_for_llm, chat_model, json_mode)
+        # Responses are cached under the model that produced them, which after a retry may be the fallback model
+        answering_model = chat_model
+
         if response_type is None:
+            ChatBot._cache_response(message_history_for_llm, response_type, chat_model, response_raw, token_count)
             return response_raw, token_count
         else:
             exception = None
             for _ in range(ChatBot.llm_formatting_retries):
                 try:
-                    Logger.log(f"Raw response from LLM: {response_raw}", Level.DEBUG)
-                    if response_raw.strip() == "":
-                        raise ValueError("Response is empty")
-                    # Extract the object from the response
-                    parsed_response = llm_utils.extract_obj_from_llm_response(response_raw, response_type)
+                    parsed_response = ChatBot._parse_llm_response(response_raw, response_type)
+                    ChatBot._cache_response(message_history_for_llm, response_type, answering_model, response_raw, token_count)
                     return parsed_response, token_count
                 except Exception as e:
                     exception = e
-                    Logger.log(f"Error extracting object from LLM response: {e}. Retrying...", Level.WARNING)
+                    # Try a local repair before paying for another round trip
+                    repaired = ChatBot._repair_llm_response(response_raw, response_type, token_count)
+                    if repaired is not None:
+                        parsed_response, repaired_raw = repaired
+                        ChatBot._cache_response(message_history_for_llm, response_type, answering_model, repaired_raw, token_count)
+                        return parsed_response, token_count
+                    retry_model = fallback_model if fallback_model is not None else chat_model
+                    if retry_model != answering_model:
+                        # An earlier run may already have escalated this request
+                        cached_response = ChatBot._get_cached_response(message_history_for_llm, response_type, retry_model)
+                        if cached_response is not None:
+                            return cached_response
+                    Logger.log(f"Error extracting object from LLM response: {e}. Retrying with {retry_model.value}...", Level.WARNING)
                     # Re-call the LLM for retry
-                    response_raw, token_count = ChatBot._call_llm_internal(message_history_for_llm, chat_model)
+                    response_raw, token_count = ChatBot._call_llm_internal(message_history_for_llm, retry_model, ChatBot._use_json_mode(response_type, retry_model))
+                    answering_model = retry_model
                     continue
             
             if response_raw is None:
@@ -163,6 +525,342 @@ class ChatBot:
                 Logger.log(f"The raw response from the LLM was {response_raw}", Level.ERROR)
                 raise Exception(f"Failed to extract object from LLM response after {ChatBot.llm_formatting_retries} tries. Last exception: {exception}")
 
+    async def call_llm_async(message_history_for_llm: List[Dict[str, str]], response_type: Type[T] = None, chat_model: Llm = None, fallback_model: Llm = None) -> Tuple[T, TokenCount]:
+        """
+        Async version of call_llm. Many calls can be in flight on a single event loop.
+
+        Returns:
+            Tuple of (response, TokenCount)
+        """
+        if chat_model is None:
+            chat_model = ChatBot.default_chat_model
+        cached_response = ChatBot._get_cached_response(message_history_for_llm, response_type, chat_model)
+        if cached_response is not None:
+            return cached_response
+
+        json_mode = ChatBot._use_json_mode(response_type, chat_model)
+        response_raw, token_count = await ChatBot._call_llm_internal_async(message_history_for_llm, chat_model, json_mode)
+        # Responses are cached under the model that produced them, which after a retry may be the fallback model
+        answering_model = chat_model
+
+        if response_type is None:
+            ChatBot._cache_response(message_history_for_llm, response_type, chat_model, response_raw, token_count)
+            return response_raw, token_count
+        else:
+            exception = None
+            for _ in range(ChatBot.llm_formatting_retries):
+                try:
+                    parsed_response = ChatBot._parse_llm_response(response_raw, response_type)
+                    ChatBot._cache_response(message_history_for_llm, response_type, answering_model, response_raw, token_count)
+                    return parsed_response, token_count
+                except Exception as e:
+                    exception = e
+                    # Try a local repair before paying for another round trip
+                    repaired = ChatBot._repair_llm_response(response_raw, response_type, token_count)
+                    if repaired is not None:
+                        parsed_response, repaired_raw = repaired
+                        ChatBot._cache_response(message_history_for_llm, response_type, answering_model, repaired_raw, token_count)
+                        return parsed_response, token_count
+                    retry_model = fallback_model if fallback_model is not None else chat_model
+                    if retry_model != answering_model:
+                        # An earlier run may already have escalated this request
+                        cached_response = ChatBot._get_cached_response(message_history_for_llm, response_type, retry_model)
+                        if cached_response is not None:
+                            return cached_response
+                    Logger.log(f"Error extracting object from LLM response: {e}. Retrying with {retry_model.value}...", Level.WARNING)
+                    # Re-call the LLM for retry
+                    response_raw, token_count = await ChatBot._call_llm_internal_async(message_history_for_llm, retry_model, ChatBot._use_json_mode(response_type, retry_model))
+                    answering_model = retry_model
+                    continue
+
+            if response_raw is None:
+                raise Exception(f"Failed to call LLM. Last exception: {exception}")
+            else:
+                Logger.log(f"The raw response from the LLM was {response_raw}", Level.ERROR)
+                raise Exception(f"Failed to extract object from LLM response after {ChatBot.llm_formatting_retries} tries. Last exception: {exception}")
+
+    # ---------- Streaming ----------
+    def stream_llm(message_history_for_llm: List[Dict[str, str]], response_type: Type[T] = None, chat_model: Llm = None, field_name: str = "response") -> ResponseStream[T]:
+        """
+        Streaming version of call_llm. Without a response type the raw text is yielded as it arrives.
+        With one, only the text of its field_name field is yielded, and the parsed object is available
+        as stream.response once the stream is exhausted.
+
+        If the streamed output does not parse, falls back to call_llm (with its formatting retries).
+        Text that was already yielded is kept as the field value, so the caller never has to take back spoken words.
+        """
+        if chat_model is None:
+            chat_model = ChatBot.default_chat_model
+        return ResponseStream(lambda stream: ChatBot._produce_stream(stream, message_history_for_llm, response_type, chat_model, field_name))
+
+    def astream_llm(message_history_for_llm: List[Dict[str, str]], response_type: Type[T] = None, chat_model: Llm = None, field_name: str = "response") -> AsyncResponseStream[T]:
+        """Async version of stream_llm."""
+        if chat_model is None:
+            chat_model = ChatBot.default_chat_model
+        return AsyncResponseStream(lambda stream: ChatBot._produce_stream_async(stream, message_history_for_llm, response_type, chat_model, field_name))
+
+    def _produce_stream(stream: ResponseStream, message_history_for_llm: List[Dict[str, str]], response_type: Type[T], chat_model: Llm, field_name: str) -> Iterator[str]:
+        cached_response = ChatBot._get_cached_response(message_history_for_llm, response_type, chat_model)
+        if cached_response is not None:
+            response, token_count = cached_response
+            text = ChatBot._get_streamed_text(response, response_type, field_name)
+            if text:
+                yield text
+            stream.set_result(response, token_count)
+            return
+
+        extractor = llm_utils.StreamingFieldExtractor(field_name) if response_type is not None else None
+        raw_parts, emitted_parts = [], []
+        token_count = None
+        json_mode = ChatBot._use_json_mode(response_type, chat_model)
+        for item in ChatBot._stream_llm_internal(message_history_for_llm, chat_model, json_mode):
+            if isinstance(item, TokenCount):
+                token_count = item
+                continue
+            raw_parts.append(item)
+            text = extractor.feed(item) if extractor is not None else item
+            if text:
+                emitted_parts.append(text)
+                yield text
+
+        response = ChatBot._parse_streamed_response(message_history_for_llm, response_type, chat_model, "".join(raw_parts), token_count)
+        if response is None:
+            fallback_response, fallback_token_count = ChatBot.call_llm(message_history_for_llm, response_type, chat_model)
+            response, token_count, text = ChatBot._merge_stream_fallback(fallback_response, fallback_token_count, token_count, "".join(emitted_parts), field_name)
+            if text:
+                yield text
+        stream.set_result(response, token_count)
+
+    async def _produce_stream_async(stream: AsyncResponseStream, message_history_for_llm: List[Dict[str, str]], response_type: Type[T], chat_model: Llm, field_name: str) -> AsyncIterator[str]:
+        cached_response = ChatBot._get_cached_response(message_history_for_llm, response_type, chat_model)
+        if cached_response is not None:
+            response, token_count = cached_response
+            text = ChatBot._get_streamed_text(response, response_type, field_name)
+            if text:
+                yield text
+            stream.set_result(response, token_count)
+            return
+
+        extractor = llm_utils.StreamingFieldExtractor(field_name) if response_type is not None else None
+        raw_parts, emitted_parts = [], []
+        token_count = None
+        json_mode = ChatBot._use_json_mode(response_type, chat_model)
+        async for item in ChatBot._stream_llm_internal_async(message_history_for_llm, chat_model, json_mode):
+            if isinstance(item, TokenCount):
+                token_count = item
+                continue
+            raw_parts.append(item)
+            text = extractor.feed(item) if extractor is not None else item
+            if text:
+                emitted_parts.append(text)
+                yield text
+
+        response = ChatBot._parse_streamed_response(message_history_for_llm, response_type, chat_model, "".join(raw_parts), token_count)
+        if response is None:
+            fallback_response, fallback_token_count = await ChatBot.call_llm_async(message_history_for_llm, response_type, chat_model)
+            response, token_count, text = ChatBot._merge_stream_fallback(fallback_response, fallback_token_count, token_count, "".join(emitted_parts), field_name)
+            if text:
+                yield text
+        stream.set_result(response, token_count)
+
+    def _get_streamed_text(response, response_type: Type[T], field_name: str) -> str:
+        if response_type is None:
+            return response
+        return getattr(response, field_name, None) or ""
+
+    def _parse_streamed_response(message_history_for_llm: List[Dict[str, str]], response_type: Type[T], chat_model: Llm, response_raw: str, token_count: TokenCount) -> Optional[T]:
+        """Parse (and cache) a completed stream. Returns None if the output is malformed."""
+        if response_type is None:
+            ChatBot._cache_response(message_history_for_llm, response_type, chat_model, response_raw, token_count)
+            return response_raw
+        try:
+            parsed_response = ChatBot._parse_llm_response(response_raw, response_type)
+        except Exception as e:
+            repaired = ChatBot._repair_llm_response(response_raw, response_type, token_count)
+            if repaired is not None:
+                parsed_response, repaired_raw = repaired
+                ChatBot._cache_response(message_history_for_llm, response_type, chat_model, repaired_raw, token_count)
+                return parsed_response
+            Logger.log(f"Error extracting object from streamed LLM response: {e}. Falling back to a non-streaming call.", Level.WARNING)
+            Logger.log(f"The raw streamed response from the LLM was {response_raw}", Level.DEBUG)
+            return None
+        ChatBot._cache_response(message_history_for_llm, response_type, chat_model, response_raw, token_count)
+        return parsed_response
+
+    def _merge_stream_fallback(fallback_response: T, fallback_token_count: TokenCount, streamed_token_count: TokenCount, emitted_text: str, field_name: str) -> Tuple[T, TokenCount, str]:
+        """
+        Combine a fallback call with the failed stream. Returns (response, total TokenCount, text still to yield).
+        Already-emitted text wins over the fallback's text, since the user has seen or heard it.
+        """
+        token_count = TokenCount.create(
+            fallback_token_count.model,
+            streamed_token_count.input_tokens + fallback_token_count.input_tokens,
+            streamed_token_count.output_tokens + fallback_token_count.output_tokens,
+            streamed_token_count.cached_input_tokens + fallback_token_count.cached_input_tokens,
+        )
+        if emitted_text:
+            setattr(fallback_response, field_name, emitted_text)
+            return fallback_response, token_count, ""
+        return fallback_response, token_count, getattr(fallback_response, field_name, None) or ""
+
+    # Streaming counterpart of _call_llm_internal. Yields text deltas, then the TokenCount as the final item
+    def _stream_llm_internal(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Iterator[Union[str, TokenCount]]:
+        transcript = ChatBot.transcript
+        if transcript is not None and transcript.mode == TranscriptMode.replay:
+            response, token_count = transcript.replay(chat_model, chatGptMessages)
+            yield response
+            yield token_count
+            return
+
+        start_time = time.monotonic()
+        response_parts, token_count = [], None
+        for item in ChatBot._stream_platform_rate_limited(chatGptMessages, chat_model, json_mode):
+            if isinstance(item, TokenCount):
+                token_count = item
+                continue
+            response_parts.append(item)
+            yield item
+        response = "".join(response_parts)
+        if transcript is not None and transcript.mode == TranscriptMode.record:
+            transcript.record(chat_model, chatGptMessages, response, token_count, time.monotonic() - start_time)
+        yield token_count
+
+    async def _stream_llm_internal_async(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> AsyncIterator[Union[str, TokenCount]]:
+        transcript = ChatBot.transcript
+        if transcript is not None and transcript.mode == TranscriptMode.replay:
+            response, token_count = transcript.lookup(chat_model, chatGptMessages)
+            delay = transcript.get_replay_delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield response
+            yield token_count
+            return
+
+        start_time = time.monotonic()
+        response_parts, token_count = [], None
+        async for item in ChatBot._stream_platform_rate_limited_async(chatGptMessages, chat_model, json_mode):
+            if isinstance(item, TokenCount):
+                token_count = item
+                continue
+            response_parts.append(item)
+            yield item
+        response = "".join(response_parts)
+        if transcript is not None and transcript.mode == TranscriptMode.record:
+            transcript.record(chat_model, chatGptMessages, response, token_count, time.monotonic() - start_time)
+        yield token_count
+
+    def _stream_platform_rate_limited(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Iterator[Union[str, TokenCount]]:
+        limiter = ChatBot.rate_limiter.for_model(chat_model) if ChatBot.rate_limiter is not None else None
+        if limiter is None:
+            yield from ChatBot._stream_platform(chatGptMessages, chat_model, json_mode)
+            return
+        estimated_tokens = count_tokens_for_messages(chatGptMessages, chat_model)
+        for attempt in range(ChatBot.rate_limit_retries + 1):
+            limiter.acquire(estimated_tokens)
+            response_parts, token_count = [], None
+            try:
+                for item in ChatBot._stream_platform(chatGptMessages, chat_model, json_mode):
+                    if isinstance(item, TokenCount):
+                        token_count = item
+                    else:
+                        response_parts.append(item)
+                    yield item
+            except openai.RateLimitError as e:
+                # Only re-try if nothing was streamed yet, otherwise the caller would see duplicated text
+                if response_parts or attempt == ChatBot.rate_limit_retries:
+                    raise
+                ChatBot._pause_for_rate_limit(limiter, e, attempt)
+                continue
+            limiter.record_usage(token_count.input_tokens + token_count.output_tokens - estimated_tokens)
+            return
+
+    async def _stream_platform_rate_limited_async(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> AsyncIterator[Union[str, TokenCount]]:
+        limiter = ChatBot.rate_limiter.for_model(chat_model) if ChatBot.rate_limiter is not None else None
+        if limiter is None:
+            async for delta in ChatBot._stream_platform_async(chatGptMessages, chat_model, json_mode):
+                yield delta
+            return
+        estimated_tokens = count_tokens_for_messages(chatGptMessages, chat_model)
+        for attempt in range(ChatBot.rate_limit_retries + 1):
+            await limiter.acquire_async(estimated_tokens)
+            response_parts, token_count = [], None
+            try:
+                async for item in ChatBot._stream_platform_async(chatGptMessages, chat_model, json_mode):
+                    if isinstance(item, TokenCount):
+                        token_count = item
+                    else:
+                        response_parts.append(item)
+                    yield item
+            except openai.RateLimitError as e:
+                if response_parts or attempt == ChatBot.rate_limit_retries:
+                    raise
+                ChatBot._pause_for_rate_limit(limiter, e, attempt)
+                continue
+            limiter.record_usage(token_count.input_tokens + token_count.output_tokens - estimated_tokens)
+            return
+
+    # Yield the text deltas, then the TokenCount from the provider's usage (counted locally only if it reports none)
+    def _stream_platform(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> Iterator[Union[str, TokenCount]]:
+        platform = ChatBot.get_platform_of_model(chat_model)
+        if platform == Platform.open_ai:
+            completion_stream = ChatBot.chatGptClient.chat.completions.create(
+                model=chat_model.value,
+                messages=chatGptMessages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **ChatBot._get_openai_json_mode_kwargs(json_mode),
+                **ChatBot._get_openai_timeout_kwargs()
+            )
+            response_parts, usage_chunk = [], None
+            for chunk in completion_stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                if chunk.choices and chunk.choices[0].delta.content:
+                    response_parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            yield ChatBot._get_openai_token_count(usage_chunk, chatGptMessages, "".join(response_parts), chat_model)
+        elif platform == Platform.ollama:
+            response_parts, last_chunk = [], None
+            for chunk in ChatBot.ollamaClient.chat(messages=chatGptMessages, model=chat_model.value, stream=True, **ChatBot._get_ollama_json_mode_kwargs(json_mode)):
+                last_chunk = chunk
+                if chunk["message"]["content"]:
+                    response_parts.append(chunk["message"]["content"])
+                    yield chunk["message"]["content"]
+            # The final chunk carries the token counts
+            yield ChatBot._get_ollama_token_count(last_chunk, chatGptMessages, "".join(response_parts), chat_model)
+        else:
+            raise Exception(f"ChatGPT model {chat_model} not present in Constants.embedding_models mapping")
+
+    async def _stream_platform_async(chatGptMessages, chat_model: Llm, json_mode: bool = False) -> AsyncIterator[Union[str, TokenCount]]:
+        platform = ChatBot.get_platform_of_model(chat_model)
+        if platform == Platform.open_ai:
+            completion_stream = await ChatBot._get_openai_async_client().chat.completions.create(
+                model=chat_model.value,
+                messages=chatGptMessages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **ChatBot._get_openai_json_mode_kwargs(json_mode),
+                **ChatBot._get_openai_timeout_kwargs()
+            )
+            response_parts, usage_chunk = [], None
+            async for chunk in completion_stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                if chunk.choices and chunk.choices[0].delta.content:
+                    response_parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            yield ChatBot._get_openai_token_count(usage_chunk, chatGptMessages, "".join(response_parts), chat_model)
+        elif platform == Platform.ollama:
+            response_parts, last_chunk = [], None
+            async for chunk in await ChatBot._get_ollama_async_client().chat(messages=chatGptMessages, model=chat_model.value, stream=True, **ChatBot._get_ollama_json_mode_kwargs(json_mode)):
+                last_chunk = chunk
+                if chunk["message"]["content"]:
+                    response_parts.append(chunk["message"]["content"])
+                    yield chunk["message"]["content"]
+            yield ChatBot._get_ollama_token_count(last_chunk, chatGptMessages, "".join(response_parts), chat_model)
+        else:
+            raise Exception(f"ChatGPT model {chat_model} not present in Constants.embedding_models mapping")
+
 def get_default_rules():
     return [
         "You are a helpful assistant.",
@@ -7,12 +7,15 @@ from qdrant_client import QdrantClient, models
 from qdrant_client.models import Filter
 
 from src.core.schemas.CollectionSchemas import Entity
-from src.utils import Logger, VectorUtils
+from src.utils import Logger, VectorUtils, client_registry
 from src.utils.qdrant_filter import parse_filter_string
 from src.utils.embedding_cache import EmbeddingCache
+from src.utils.single_flight import SingleFlight
 
 
 _QDRANT_CLIENT: QdrantClient | None = None
+# Shared by all collections so concurrent embeddings of the same text (e.g. the same search_text) share one API call
+EMBEDDING_SINGLE_FLIGHT = SingleFlight()
 
 
 def _get_env_host_port() -> tuple[str, int]:
@@ -29,11 +32,12 @@ def _get_client() -> QdrantClient:
     if _QDRANT_CLIENT is None:
         host, port = _get_env_host_port()
         Logger.verbose(f"Connecting to Qdrant at {host}:{port}")
-        _QDRANT_CLIENT = QdrantClient(host=host, port=port)
+        _QDRANT_CLIENT = client_registry.get_qdrant_client(host, port)
         try:
             _QDRANT_CLIENT.get_collections()
         except Exception as exc:
             _QDRANT_CLIENT = None
+            client_registry.discard_qdrant_client(host, port)
             raise Exception(f"Failed to connect to Qdrant at {host}:{port}: {exc}. Is the Qdrant container running?")
     return _QDRANT_CLIENT
 
@@ -83,30 +87,46 @@ class QdrantCollection:
         except Exception as exc:
             raise Exception(f"Failed to drop collection {self.name}: {exc}")
 
+    def get_embedding(self, text: str) -> List[float]:
+        """Embedding of text with this collection's model, through its embedding cache"""
+        return self._get_embedding(text)
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings of texts through the embedding cache. Cache misses are embedded in one batched call."""
+        embeddings = {text: self.embedding_cache.get(text) for text in texts}
+        missing = [text for text, embedding in embeddings.items() if not embedding]
+        if len(missing) == 1:
+            embeddings[missing[0]] = self._get_embedding(missing[0])
+        elif missing:
+            for text, embedding in zip(missing, VectorUtils.get_embeddings(missing, model=self.embed_model)):
+                self.embedding_cache.add(text, embedding)
+                embeddings[text] = embedding
+        return [embeddings[text] for text in texts]
+
     def _get_embedding(self, text: str) -> List[float]:
         cached = self.embedding_cache.get(text)
         if cached:
             return cached
         if cached is None:
-            embedding = VectorUtils.get_embedding(text, model=self.embed_model)
+            embedding, _ = EMBEDDING_SINGLE_FLIGHT.do(
+                (self.embed_model, text),
+                lambda: VectorUtils.get_embedding(text, model=self.embed_model),
+            )
             self.embedding_cache.add(text, embedding)
             return embedding
 
     # Data IO
-    def insert_dataclasses(self, records: List[Entity]) -> None:
+    def insert_dataclasses(self, records: List[Entity], wait: bool = True) -> None:
+        """Embed (batched, with caching per record.key) and upsert records. wait=False returns before the points are indexed."""
         if not records:
             return
-        # Build embeddings with caching per record.key
-        embedding_map: dict[Any, List[float]] = {}
         for record in records:
-            record_id = record.id
-            if record_id is None:
+            if record.id is None:
                 raise ValueError(f"Record {record} id field is empty. Needed for embedding.")
-            text_to_embed = record.key
-            if text_to_embed is None:
+            if record.key is None:
                 raise ValueError(f"Record {record} key field is empty. Needed for embedding.")
-            embedding = self._get_embedding(text_to_embed)
-            embedding_map[record_id] = embedding
+        embeddings = self.get_embeddings([record.key for record in records])
+        embedding_map: dict[Any, List[float]] = {record.id: embedding for record, embedding in zip(records, embeddings)}
 
         points: List[models.PointStruct] = []
         for record in records:
@@ -127,7 +147,7 @@ class QdrantCollection:
 
         client = _get_client()
         Logger.verbose(f"Inserting {len(points)} records into collection {self.name}")
-        client.upsert(collection_name=self.name, points=points, wait=True)
+        client.upsert(collection_name=self.name, points=points, wait=wait)
         Logger.verbose(f"Done inserting {len(points)} records into collection {self.name}")
 
     def export_entities(self, limit: int = 1000) -> List[Entity]:
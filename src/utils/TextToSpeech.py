@@ -4,7 +4,8 @@ from os import environ
 
 import openai
 # from dotenv import load_dotenv
-from openai import OpenAI
+
+from src.utils import client_registry
 
 filename = os.path.splitext(os.path.basename(__file__))[0]
 if __name__ == "__main__" or __name__ == filename: # If the script is being run directly
@@ -15,7 +16,7 @@ else: # If the script is being imported
 # load_dotenv()
 init_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI()
+client = client_registry.get_openai_client()
 
 import simpleaudio as sa
 
@@ -3,21 +3,19 @@ import psutil
 from pymilvus import connections
 from pymilvus import FieldSchema, CollectionSchema, DataType, Collection, utility
 import openai
-from openai import OpenAI
-import ollama
 from typing import Any, Final, List, Optional, Tuple, Type, get_origin, get_args, Union, TypeVar
 from dataclasses import fields as dc_fields, is_dataclass
 from pathlib import Path
 import numpy as np
 
-from src.utils import Logger
+from src.utils import Logger, client_registry
 from src.utils.Utilities import load_dotenv
 
 # Load the OpenAI API key from the .env file
 # print("Loading OpenAI API key")
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
-openAIClient = OpenAI()
+openAIClient = client_registry.get_openai_client()
 
 # Platforms:
 _openai_ = "openai"
@@ -65,12 +63,22 @@ def get_embedding(text, model=text_embedding_3_small, dimensions=None):
             embedding = openAIClient.embeddings.create(input = [text], model=model).data[0].embedding
         return embedding
     elif get_platform_of_model(model) == _ollama_:
-        embedding = ollama.embeddings(prompt=text,model=model)["embedding"]
+        embedding = client_registry.get_ollama_client().embeddings(prompt=text,model=model)["embedding"]
         return embedding
     else:
         list_of_models = [model for models in embedding_models.values() for model in models]
         raise Exception(f"Model {model} not found. Available models: {list_of_models}")
 
+def get_embeddings(texts, model=text_embedding_3_small, dimensions=None):
+    """Embeddings for several texts, in one API call where the platform supports it"""
+    if not texts:
+        return []
+    if get_platform_of_model(model) == _openai_:
+        kwargs = {"dimensions": dimensions} if dimensions else {}
+        data = openAIClient.embeddings.create(input=list(texts), model=model, **kwargs).data
+        return [item.embedding for item in sorted(data, key=lambda item: item.index)]
+    return [get_embedding(text, model=model, dimensions=dimensions) for text in texts]
+
 def cosine_similarity(embedding1, embedding2):
     # Convert lists to numpy arrays
     embedding1 = np.array(embedding1)
@@ -0,0 +1,174 @@
+"""
+Process-wide registry of pooled HTTP clients for OpenAI, ollama and Qdrant.
+
+Clients are created lazily on first use and shared by chat, embeddings, TTS and vector search,
+so parallel eval runs reuse warm keep-alive connections instead of opening (and TLS-handshaking)
+new ones, and the pool is sized for our concurrency instead of each library's default.
+
+Async clients hold connections bound to the event loop they were opened on, so they are shared per
+running loop instead: each asyncio.run() (e.g. in a test, or an eval thread with its own loop) gets
+its own, which is dropped along with the loop.
+"""
+import asyncio
+import os
+import weakref
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Optional
+
+import httpx
+import ollama
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from qdrant_client import QdrantClient
+
+from src.utils import Logger
+from src.utils.Utilities import init_dotenv
+
+
+@dataclass
+class HttpPoolSettings:
+    """Connection pool settings shared by all clients. Override from the environment or with configure()."""
+    max_connections: int = 128  # Sized for tests x npcs x eval cases x conversations running in parallel
+    max_keepalive_connections: int = 64
+    keepalive_expiry_s: float = 60.0
+    connect_timeout_s: float = 10.0
+    read_timeout_s: float = 120.0
+    http2: bool = False  # Requires the h2 package
+
+    @staticmethod
+    def from_env() -> 'HttpPoolSettings':
+        defaults = HttpPoolSettings()
+        return HttpPoolSettings(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", defaults.max_connections)),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", defaults.max_keepalive_connections)),
+            keepalive_expiry_s=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", defaults.keepalive_expiry_s)),
+            connect_timeout_s=float(os.getenv("HTTP_CONNECT_TIMEOUT_S", defaults.connect_timeout_s)),
+            read_timeout_s=float(os.getenv("HTTP_READ_TIMEOUT_S", defaults.read_timeout_s)),
+            http2=os.getenv("HTTP_HTTP2", "false").lower() in ("1", "true", "yes"),
+        )
+
+    def get_limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry_s,
+        )
+
+    def get_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout_s, connect=self.connect_timeout_s)
+
+
+_settings: Optional[HttpPoolSettings] = None
+_clients: Dict[str, object] = {}
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, object]]' = weakref.WeakKeyDictionary()
+_lock = Lock()
+
+
+def configure(settings: HttpPoolSettings) -> None:
+    """
+    Set the pool settings. Call this before any client is created (i.e. before importing ChatBot),
+    or use the HTTP_* environment variables, since modules hold on to the clients they were given.
+    """
+    global _settings
+    with _lock:
+        if _clients:
+            Logger.warning("HTTP clients were already created; only clients created from now on use the new pool settings")
+        _settings = settings
+        _clients.clear()
+        _async_clients.clear()
+
+
+def get_settings() -> HttpPoolSettings:
+    global _settings
+    if _settings is None:
+        _settings = HttpPoolSettings.from_env()
+    return _settings
+
+
+def get_openai_client() -> OpenAI:
+    return _get_or_create("openai", _create_openai_client)
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """The client for the running event loop. Call from a coroutine."""
+    return _get_or_create_for_loop("openai_async", _create_async_openai_client)
+
+
+def get_ollama_client() -> ollama.Client:
+    return _get_or_create("ollama", lambda settings: ollama.Client(timeout=settings.get_timeout(), limits=settings.get_limits()))
+
+
+def get_ollama_async_client() -> ollama.AsyncClient:
+    """The client for the running event loop. Call from a coroutine."""
+    return _get_or_create_for_loop("ollama_async", lambda settings: ollama.AsyncClient(timeout=settings.get_timeout(), limits=settings.get_limits()))
+
+
+def get_qdrant_client(host: str, port: int) -> QdrantClient:
+    """Unlike the other clients this one is not verified here; QdrantCollection checks the connection."""
+    return _get_or_create(
+        f"qdrant:{host}:{port}",
+        lambda settings: QdrantClient(
+            host=host,
+            port=port,
+            timeout=int(settings.read_timeout_s),
+            limits=settings.get_limits(),
+            http2=settings.http2,
+        ),
+    )
+
+
+def discard_qdrant_client(host: str, port: int) -> None:
+    """Forget a Qdrant client that failed to connect, so the next call builds a fresh one."""
+    with _lock:
+        client = _clients.pop(f"qdrant:{host}:{port}", None)
+    if client is not None:
+        client.close()
+
+
+def reset() -> None:
+    """Forget all clients so the next call builds fresh ones. Existing references stay usable."""
+    with _lock:
+        _clients.clear()
+        _async_clients.clear()
+
+
+# ---------- Helpers ----------
+def _get_or_create(name: str, factory):
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        if name not in _clients:
+            settings = get_settings()
+            Logger.debug(f"Creating pooled {name} client (max {settings.max_connections} connections, http2={settings.http2})")
+            _clients[name] = factory(settings)
+        return _clients[name]
+
+
+def _get_or_create_for_loop(name: str, factory):
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        if name not in clients:
+            settings = get_settings()
+            Logger.debug(f"Creating pooled {name} client for event loop {id(loop)} (max {settings.max_connections} connections, http2={settings.http2})")
+            clients[name] = factory(settings)
+        return clients[name]
+
+
+def _create_openai_client(settings: HttpPoolSettings) -> OpenAI:
+    init_dotenv()
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=settings.get_timeout(),
+        http_client=DefaultHttpxClient(limits=settings.get_limits(), http2=settings.http2),
+    )
+
+
+def _create_async_openai_client(settings: HttpPoolSettings) -> AsyncOpenAI:
+    init_dotenv()
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=settings.get_timeout(),
+        http_client=DefaultAsyncHttpxClient(limits=settings.get_limits(), http2=settings.http2),
+    )
@@ -0,0 +1,89 @@
+"""
+Request deadlines that propagate through the call stack.
+
+A deadline is set once at the top of a request (e.g. an NPC turn) and every LLM call below it
+reads the remaining budget from a context variable, so preprocessing, retrieval and the response
+share one budget instead of each getting its own timeout. Nested deadlines can only shorten the
+budget, never extend it. Context variables follow asyncio tasks and asyncio.to_thread; for other
+thread pools, submit with contextvars.copy_context().run.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@dataclass(frozen=True)
+class Deadline:
+    expires_at: float  # time.monotonic() timestamp
+
+    @staticmethod
+    def after(timeout_s: float) -> 'Deadline':
+        return Deadline(time.monotonic() + timeout_s)
+
+    def remaining_s(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(timeout_s: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Run the block under a deadline timeout_s from now, or the enclosing deadline if that is sooner.
+    A timeout_s of None keeps the enclosing deadline (if any) unchanged.
+    """
+    current = _current_deadline.get()
+    if timeout_s is None:
+        yield current
+        return
+    new_deadline = Deadline.after(timeout_s)
+    if current is not None and current.expires_at < new_deadline.expires_at:
+        new_deadline = current
+    token = _current_deadline.set(new_deadline)
+    try:
+        yield new_deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def get_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def remaining_s() -> Optional[float]:
+    """Seconds left on the current deadline, or None if there is no deadline."""
+    current = _current_deadline.get()
+    return current.remaining_s() if current is not None else None
+
+
+def check(operation: str = "request") -> None:
+    """Raise DeadlineExceeded if the current deadline has passed."""
+    current = _current_deadline.get()
+    if current is not None and current.expired():
+        raise DeadlineExceeded(f"Deadline exceeded before {operation}")
+
+
+async def wait_for(awaitable: Awaitable[T], operation: str = "request") -> T:
+    """Await under the current deadline, cancelling the awaitable if it runs out."""
+    timeout_s = remaining_s()
+    if timeout_s is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout_s)
+    except asyncio.TimeoutError as e:
+        if isinstance(e, DeadlineExceeded):
+            raise
+        raise DeadlineExceeded(f"Deadline exceeded during {operation}") from e
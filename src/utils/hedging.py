@@ -0,0 +1,165 @@
+"""
+Hedged requests: if a call has not finished after the model's recent p95 latency, fire a second
+identical call and take whichever finishes first. This cuts tail latency at the cost of paying for
+the duplicate on the (by construction ~5%) slowest calls.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Optional, TypeVar
+
+from src.utils import Logger, deadline
+from src.utils.deadline import DeadlineExceeded
+
+T = TypeVar('T')
+
+
+class LatencyTracker:
+    """Rolling window of call latencies per key (e.g. model)."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[Hashable, Deque[float]] = {}
+
+    def record(self, key: Hashable, latency_s: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(latency_s)
+
+    def percentile(self, key: Hashable, q: float) -> Optional[float]:
+        """The q-th quantile (0-1) of recent latencies, or None until min_samples calls have been seen."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Hedging:
+    def __init__(self, percentile: float = 0.95, min_samples: int = 20, window: int = 200):
+        self.percentile = percentile
+        self.latencies = LatencyTracker(window=window, min_samples=min_samples)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.hedged_calls = 0
+        self.hedge_wins = 0
+
+    def get_hedge_delay(self, key: Hashable) -> Optional[float]:
+        return self.latencies.percentile(key, self.percentile)
+
+    def call(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Run fn, and if it hasn't finished after the p95 delay, a second copy; return whichever succeeds first.
+        Until there are enough latency samples fn runs on the calling thread. After that each attempt runs on a
+        thread of its own (with the caller's context, so deadlines carry over) rather than in a bounded pool, so
+        hedging never caps how many calls run at once. A sync call can't be cancelled: the losing attempt runs to
+        completion in the background.
+        """
+        self._record_call()
+        hedge_delay = self.get_hedge_delay(key)
+        if hedge_delay is None:
+            return self._timed(key, fn)
+        primary = self._start(key, fn)
+        done, _ = wait([primary], timeout=self._cap_to_deadline(hedge_delay))
+        if done:
+            return primary.result()
+        deadline.check(f"hedging {key}")
+
+        Logger.debug(f"Hedging {key} after {hedge_delay:.2f}s")
+        hedge = self._start(key, fn)
+        self._record_hedge()
+        pending = [primary, hedge]
+        while pending:
+            done, not_done = wait(pending, timeout=deadline.remaining_s(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Deadline exceeded waiting for hedged call to {key}")
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._record_hedge_win()
+                    return future.result()
+            pending = list(not_done)
+        return primary.result()  # Both failed: raise the primary's error
+
+    async def call_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async version of call. The losing call is cancelled."""
+        self._record_call()
+        hedge_delay = self.get_hedge_delay(key)
+        primary = asyncio.ensure_future(self._timed_async(key, fn))
+        if hedge_delay is None:
+            return await primary
+        done, _ = await asyncio.wait([primary], timeout=self._cap_to_deadline(hedge_delay))
+        if done:
+            return primary.result()
+        if deadline.remaining_s() == 0:
+            primary.cancel()
+            raise DeadlineExceeded(f"Deadline exceeded before hedging {key}")
+
+        Logger.debug(f"Hedging {key} after {hedge_delay:.2f}s")
+        hedge = asyncio.ensure_future(self._timed_async(key, fn))
+        self._record_hedge()
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._record_hedge_win()
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {"calls": self.calls, "hedged_calls": self.hedged_calls, "hedge_wins": self.hedge_wins}
+
+    # ---------- Helpers ----------
+    def _start(self, key: Hashable, fn: Callable[[], T]) -> Future:
+        """Run fn on a new daemon thread in a copy of the caller's context"""
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        context = contextvars.copy_context()
+
+        def run() -> None:
+            try:
+                future.set_result(context.run(self._timed, key, fn))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="hedged_call", daemon=True).start()
+        return future
+
+    def _timed(self, key: Hashable, fn: Callable[[], T]) -> T:
+        start = time.monotonic()
+        result = fn()
+        self.latencies.record(key, time.monotonic() - start)
+        return result
+
+    async def _timed_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        result = await fn()
+        self.latencies.record(key, time.monotonic() - start)
+        return result
+
+    def _cap_to_deadline(self, delay_s: float) -> float:
+        remaining = deadline.remaining_s()
+        return delay_s if remaining is None else min(delay_s, remaining)
+
+    def _record_call(self) -> None:
+        with self._stats_lock:
+            self.calls += 1
+
+    def _record_hedge(self) -> None:
+        with self._stats_lock:
+            self.hedged_calls += 1
+
+    def _record_hedge_win(self) -> None:
+        with self._stats_lock:
+            self.hedge_wins += 1
@@ -1,3 +1,4 @@
+import os
 from typing import Any
 from typing import Type, TypeVar
 from pathlib import Path
@@ -29,8 +30,10 @@ def save_to_yaml_file(data: Any, file_path: Path) -> None:
     """Save a dataclass to a YAML file, casting Enums to their names."""
     data_dict = parsing_utils.obj_to_dict(data)
 
-    # Write the dictionary to the YAML file
-    with open(file_path, 'w') as file:
+    # Write the dictionary to a temp file and swap it in, so a crash mid-write never leaves a partial file
+    file_path = Path(file_path)
+    tmp_path = file_path.with_name(file_path.name + '.tmp')
+    with open(tmp_path, 'w') as file:
         yaml.dump(
             data_dict, 
             file, 
@@ -38,6 +41,9 @@ def save_to_yaml_file(data: Any, file_path: Path) -> None:
             default_flow_style=False, 
             sort_keys=False, 
             indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, file_path)
 
 # File must be a list of objects
 def append_to_yaml_file(data: Any, file_path: Path) -> None:
@@ -0,0 +1,206 @@
+"""
+Local repair of malformed JSON from LLM responses, so a formatting slip does not cost a full LLM round trip.
+
+Handles the usual failure modes:
+- Markdown code fences and chatter around the object
+- Trailing commas before } or ]
+- Unescaped double quotes and raw newlines inside string values
+- Unterminated strings and unclosed braces/brackets (e.g. a truncated response)
+- Python literals (True/False/None) instead of JSON ones
+- "true"/"false" strings for bool fields and numeric strings for int/float fields
+- Missing fields that are Optional or have a default (dataclass default or metadata["default"])
+"""
+import json
+import re
+from dataclasses import MISSING, dataclass, fields, is_dataclass
+from threading import Lock
+from typing import Any, Dict, List, Tuple, Type, TypeVar, get_args, get_origin
+
+from src.core.TokenTracking import TokenCount
+from src.utils import parsing_utils
+
+T = TypeVar('T')
+
+_code_fence_pattern = re.compile(r"```(?:json|JSON)?\s*(.*?)\s*```", re.DOTALL)
+_python_literals = {"True": "true", "False": "false", "None": "null"}
+_json_literal_prefixes = ("true", "false", "null")
+
+
+@dataclass
+class JsonRepairStats:
+    """Counts LLM re-calls avoided by local repair, with the tokens and cost a re-call would have taken."""
+    repairs: int = 0
+    failed_repairs: int = 0
+    tokens_saved: int = 0
+    cost_saved: float = 0.0
+
+    def __post_init__(self):
+        self._lock = Lock()
+
+    def record_repair(self, token_count: TokenCount) -> None:
+        with self._lock:
+            self.repairs += 1
+            self.tokens_saved += token_count.input_tokens + token_count.output_tokens
+            self.cost_saved += token_count.cost
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failed_repairs += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.repairs = 0
+            self.failed_repairs = 0
+            self.tokens_saved = 0
+            self.cost_saved = 0.0
+
+
+def can_repair(response_type: Type[T]) -> bool:
+    """Repair only applies to JSON response types (dataclasses, or lists of them)."""
+    if get_origin(response_type) is list:
+        return can_repair(get_args(response_type)[0])
+    return is_dataclass(response_type)
+
+
+def strip_code_fences(text: str) -> str:
+    match = _code_fence_pattern.search(text)
+    return match.group(1) if match else text
+
+
+def repair_json_str(text: str) -> str:
+    """Best-effort rewrite of almost-JSON into JSON. The result still has to be validated with json.loads."""
+    text = strip_code_fences(text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object or array found in response")
+    text = text[min(starts):]
+
+    out: List[str] = []
+    closers: List[str] = []
+    in_string = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch == '"':
+                if _is_closing_quote(text, i + 1):
+                    in_string = False
+                    out.append(ch)
+                else:
+                    out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if closers:
+                closers.pop()
+            out.append(ch)
+            if not closers:
+                break  # Ignore anything after the top-level value
+        elif ch.isalpha():
+            word = re.match(r"[A-Za-z_]+", text[i:]).group(0)
+            out.append(_python_literals.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # Close whatever a truncated response left open
+    if in_string:
+        out.append('"')
+    while closers:
+        _drop_trailing_comma(out)
+        if "".join(out).rstrip().endswith(":"):
+            out.append("null")
+        out.append(closers.pop())
+    return "".join(out)
+
+
+def coerce_to_type(value: Any, response_type: Type[T]) -> Any:
+    """Coerce a parsed JSON value towards response_type: stringly-typed bools/numbers and missing defaultable fields."""
+    origin = get_origin(response_type)
+    if origin is list and isinstance(value, list):
+        item_type = get_args(response_type)[0]
+        return [coerce_to_type(item, item_type) for item in value]
+    if parsing_utils._is_optional_type(response_type):
+        return None if value is None else coerce_to_type(value, parsing_utils._unwrap_optional(response_type))
+    if is_dataclass(response_type) and isinstance(value, dict):
+        return _coerce_dataclass_dict(value, response_type)
+    if response_type is bool and isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    if response_type is int and isinstance(value, str) and re.fullmatch(r"-?\d+", value.strip()):
+        return int(value.strip())
+    if response_type is float and isinstance(value, (int, str)) and not isinstance(value, bool):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def repair_llm_response(response_raw: str, response_type: Type[T]) -> Tuple[T, str]:
+    """
+    Repair a malformed LLM response and parse it into response_type.
+
+    Returns:
+        Tuple of (parsed object, repaired JSON string), raising if the response is beyond repair
+    """
+    json_value = json.loads(repair_json_str(response_raw))
+    json_value = coerce_to_type(json_value, response_type)
+    response_obj = parsing_utils.extract_obj_from_dict(json_value, response_type)
+    return response_obj, json.dumps(parsing_utils.obj_to_dict(response_obj), ensure_ascii=False)
+
+
+# ---------- Helpers ----------
+def _coerce_dataclass_dict(value: Dict[str, Any], response_type: Type[T]) -> Dict[str, Any]:
+    coerced = dict(value)
+    for f in fields(response_type):
+        if f.name in coerced:
+            coerced[f.name] = coerce_to_type(coerced[f.name], f.type)
+        elif "default" in f.metadata:
+            coerced[f.name] = f.metadata["default"]
+        elif f.default is MISSING and f.default_factory is MISSING and parsing_utils._is_optional_type(f.type):
+            coerced[f.name] = None
+    return coerced
+
+
+def _is_closing_quote(text: str, index: int) -> bool:
+    """Decide whether a quote inside a string ends it, by looking at what follows."""
+    rest = text[index:].lstrip()
+    if not rest or rest[0] in ":}]":
+        return True
+    if rest[0] != ",":
+        return False
+    after_comma = rest[1:].lstrip()
+    return (
+        not after_comma
+        or after_comma[0] in '"{[}]-'
+        or after_comma[0].isdigit()
+        or after_comma.startswith(_json_literal_prefixes)
+    )
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    for i in range(len(out) - 1, -1, -1):
+        if out[i].isspace():
+            continue
+        if out[i] == ",":
+            del out[i]
+        return
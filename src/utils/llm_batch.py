@@ -0,0 +1,230 @@
+"""
+Offline batch submission of chat completion requests, for latency-insensitive work like evaluations.
+
+Requests are written to a JSONL file in the OpenAI Batch API input format, submitted to a backend,
+polled until done, and the results are mapped back by custom_id. Two backends are provided:
+- OpenAIBatchBackend: the OpenAI Batch API (discounted pricing, results within the completion window)
+- LocalFileBatchBackend: a stand-in that answers each line through ChatBot.call_llm and writes an
+  output file in the same format, for tests and for providers without a batch API
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional, Protocol
+
+from src.core.Constants import Llm
+from src.core.TokenTracking import TokenCount
+from src.utils import Logger, client_registry
+from src.utils.Logger import Level
+
+chat_completions_endpoint = "/v1/chat/completions"
+batch_price_multiplier = 0.5  # OpenAI bills batch requests at half the synchronous price
+
+
+class BatchStatus(Enum):
+    in_progress = "in_progress"
+    completed = "completed"
+    failed = "failed"
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    model: Llm
+    messages: List[Dict[str, str]]
+
+    def to_jsonl_line(self) -> str:
+        return json.dumps({
+            "custom_id": self.custom_id,
+            "method": "POST",
+            "url": chat_completions_endpoint,
+            "body": {"model": self.model.value, "messages": self.messages},
+        }, ensure_ascii=False)
+
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    response: Optional[str]  # None if the request failed
+    token_count: Optional[TokenCount]
+    error: Optional[str] = None
+
+
+class BatchBackend(Protocol):
+    poll_interval_s: float
+
+    def submit(self, requests_file: Path) -> str:
+        """Submit a JSONL requests file and return the batch id."""
+        ...
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        ...
+
+    def fetch_results(self, batch_id: str) -> List[BatchResult]:
+        ...
+
+
+class OpenAIBatchBackend:
+    """Submits the JSONL file to the OpenAI Batch API."""
+
+    def __init__(self, completion_window: str = "24h", poll_interval_s: float = 30.0):
+        self.completion_window = completion_window
+        self.poll_interval_s = poll_interval_s
+
+    def submit(self, requests_file: Path) -> str:
+        client = client_registry.get_openai_client()
+        with open(requests_file, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=chat_completions_endpoint,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        batch = client_registry.get_openai_client().batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return BatchStatus.completed
+        if batch.status in ("failed", "expired", "cancelled"):
+            Logger.log(f"Batch {batch_id} ended with status {batch.status}: {batch.errors}", Level.ERROR)
+            return BatchStatus.failed
+        return BatchStatus.in_progress
+
+    def fetch_results(self, batch_id: str) -> List[BatchResult]:
+        client = client_registry.get_openai_client()
+        batch = client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(client.files.content(file_id).text.splitlines())
+        return parse_batch_output(lines, price_multiplier=batch_price_multiplier)
+
+
+class LocalFileBatchBackend:
+    """
+    Processes the JSONL file locally (one ChatBot.call_llm per line, on a single background thread)
+    and writes an output file in the OpenAI batch output format next to it.
+    """
+
+    def __init__(self, poll_interval_s: float = 0.5):
+        self.poll_interval_s = poll_interval_s
+        self._output_files: Dict[str, Path] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._failures: Dict[str, Exception] = {}
+
+    def submit(self, requests_file: Path) -> str:
+        batch_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        output_file = requests_file.with_name(f"{requests_file.stem}_output.jsonl")
+        self._output_files[batch_id] = output_file
+        thread = threading.Thread(target=self._process, args=(batch_id, requests_file, output_file), daemon=True)
+        self._threads[batch_id] = thread
+        thread.start()
+        return batch_id
+
+    def poll(self, batch_id: str) -> BatchStatus:
+        if self._threads[batch_id].is_alive():
+            return BatchStatus.in_progress
+        return BatchStatus.failed if batch_id in self._failures else BatchStatus.completed
+
+    def fetch_results(self, batch_id: str) -> List[BatchResult]:
+        with open(self._output_files[batch_id], "r", encoding="utf-8") as f:
+            return parse_batch_output(f.read().splitlines())
+
+    def _process(self, batch_id: str, requests_file: Path, output_file: Path) -> None:
+        from src.utils.ChatBot import ChatBot  # Deferred, ChatBot is only needed once a batch runs
+        try:
+            with open(requests_file, "r", encoding="utf-8") as f_in, open(output_file, "w", encoding="utf-8") as f_out:
+                for line in f_in:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    body = request["body"]
+                    try:
+                        response, token_count = ChatBot.call_llm(body["messages"], None, Llm(body["model"]))
+                        output = {
+                            "custom_id": request["custom_id"],
+                            "response": {"status_code": 200, "body": {
+                                "model": body["model"],
+                                "choices": [{"index": 0, "message": {"role": "assistant", "content": response}}],
+                                "usage": {"prompt_tokens": token_count.input_tokens, "completion_tokens": token_count.output_tokens},
+                            }},
+                            "error": None,
+                        }
+                    except Exception as e:
+                        output = {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+                    f_out.write(json.dumps(output, ensure_ascii=False) + "\n")
+        except Exception as e:
+            Logger.log(f"Local batch {batch_id} failed: {e}", Level.ERROR)
+            self._failures[batch_id] = e
+
+
+def parse_batch_output(lines: List[str], price_multiplier: float = 1.0) -> List[BatchResult]:
+    """Parse OpenAI batch output lines (successes and errors) into BatchResults, scaling costs by price_multiplier."""
+    results = []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record["custom_id"]
+        response = record.get("response")
+        if record.get("error") or response is None or response.get("status_code") != 200:
+            error = record.get("error") or (response or {}).get("body", {}).get("error")
+            results.append(BatchResult(custom_id=custom_id, response=None, token_count=None, error=str(error)))
+            continue
+        body = response["body"]
+        usage = body.get("usage", {})
+        try:
+            model = _match_model(body["model"])
+        except ValueError as e:
+            # Fail only this line, so the caller can re-run it instead of losing the whole batch
+            results.append(BatchResult(custom_id=custom_id, response=None, token_count=None, error=str(e)))
+            continue
+        token_count = TokenCount.create(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        token_count.cost *= price_multiplier
+        results.append(BatchResult(custom_id=custom_id, response=body["choices"][0]["message"]["content"], token_count=token_count))
+    return results
+
+
+def run_batch(requests: List[BatchRequest], backend: BatchBackend, work_dir: Path, poll_interval_s: Optional[float] = None, timeout_s: Optional[float] = None) -> Dict[str, BatchResult]:
+    """
+    Write the requests to a JSONL file in work_dir, submit them, wait for completion and return results by custom_id.
+    Requests that are missing from the output (or the whole batch, if it failed) come back as errors.
+    poll_interval_s defaults to the backend's own interval.
+    """
+    if poll_interval_s is None:
+        poll_interval_s = backend.poll_interval_s
+    os.makedirs(work_dir, exist_ok=True)
+    requests_file = Path(work_dir) / f"batch_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.jsonl"
+    with open(requests_file, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(request.to_jsonl_line() + "\n")
+
+    batch_id = backend.submit(requests_file)
+    Logger.log(f"Submitted batch {batch_id} with {len(requests)} requests ({requests_file})", Level.VERBOSE)
+    start = time.monotonic()
+    status = backend.poll(batch_id)
+    while status == BatchStatus.in_progress:
+        if timeout_s is not None and time.monotonic() - start > timeout_s:
+            raise TimeoutError(f"Batch {batch_id} did not complete within {timeout_s}s")
+        time.sleep(poll_interval_s)
+        status = backend.poll(batch_id)
+
+    results = {} if status == BatchStatus.failed else {r.custom_id: r for r in backend.fetch_results(batch_id)}
+    for request in requests:
+        if request.custom_id not in results:
+            results[request.custom_id] = BatchResult(custom_id=request.custom_id, response=None, token_count=None, error=f"No result in batch {batch_id}")
+    return results
+
+
+def _match_model(model_name: str) -> Llm:
+    """The API reports dated snapshots (e.g. gpt-4o-mini-2024-07-18); map them back to our model enum."""
+    for model in sorted(Llm, key=lambda m: len(m.value), reverse=True):
+        if model_name.startswith(model.value):
+            return model
+    raise ValueError(f"Unknown model in batch output: {model_name}")
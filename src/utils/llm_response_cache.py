@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+
+from src.core.Constants import Llm
+from src.core.TokenTracking import TokenCount
+from src.utils import llm_utils
+
+
+class LlmResponseCache:
+    """
+    SQLite-backed, content-addressed cache of raw LLM responses.
+
+    - Keyed by a hash of model + normalized messages + response type (see llm_utils.get_request_hash).
+    - Stores the raw response text together with the TokenCount of the original call (including its cached input tokens).
+    - Size-bounded: once max_entries is exceeded, the least recently used entries are evicted.
+    - Optional TTL: entries older than ttl_seconds are treated as misses and removed.
+    - Tracks hit/miss/eviction counters for the lifetime of the instance.
+    - Safe to share across threads (single connection guarded by a lock).
+    """
+
+    def __init__(self, cache_file: Optional[Path] = None, max_entries: int = 10_000, ttl_seconds: Optional[float] = None) -> None:
+        # Default location in storage directory, next to the embedding cache
+        default_path = Path(__file__).resolve().parent.parent.parent / "storage" / "llm_response_cache.sqlite"
+        self._cache_file = cache_file or default_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = RLock()
+        os.makedirs(self._cache_file.parent, exist_ok=True)
+        self._conn = sqlite3.connect(str(self._cache_file), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    input_tokens INTEGER NOT NULL,
+                    output_tokens INTEGER NOT NULL,
+                    cached_input_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            # Cache files from before cached_input_tokens was stored
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+            if "cached_input_tokens" not in columns:
+                self._conn.execute("ALTER TABLE responses ADD COLUMN cached_input_tokens INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+
+    @staticmethod
+    def make_key(model: Llm, messages: List[Dict[str, str]], response_type: Optional[type] = None) -> str:
+        """Content address for a request. The response type is part of the key since it changes how the output is parsed."""
+        type_name = "" if response_type is None else f"{response_type.__module__}.{response_type.__qualname__}"
+        return llm_utils.get_request_hash(model, messages, type_name)
+
+    def get(self, key: str) -> Optional[Tuple[str, TokenCount]]:
+        """Returns (raw_response, TokenCount marked as cached) or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT model, response, input_tokens, output_tokens, cached_input_tokens, cost, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            model_value, response, input_tokens, output_tokens, cached_input_tokens, cost, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        token_count = TokenCount(
+            model=Llm(model_value), input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, cached=True, cached_input_tokens=cached_input_tokens
+        )
+        return response, token_count
+
+    def put(self, key: str, response: str, token_count: TokenCount) -> None:
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, input_tokens, output_tokens, cached_input_tokens, cost, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, token_count.model.value, response, token_count.input_tokens, token_count.output_tokens, token_count.cached_input_tokens, token_count.cost, now, now),
+                )
+                self._evict_if_needed()
+
+    def _evict_if_needed(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    def get_stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters plus the current number of entries."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,155 @@
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from enum import Enum
+from pathlib import Path
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+
+from src.core.Constants import Llm
+from src.core.TokenTracking import TokenCount
+from src.utils import Logger, llm_utils
+
+
+class TranscriptMode(Enum):
+    record = "record"  # Call the real provider and append every request/response pair to the transcript
+    replay = "replay"  # Never touch the network; answer from the transcript by request hash
+
+
+class TranscriptMissError(Exception):
+    """Raised in replay mode when a request was never recorded."""
+    pass
+
+
+@dataclass
+class TranscriptEntry:
+    request_hash: str
+    model: str
+    messages: List[Dict[str, str]]
+    response: str
+    input_tokens: int
+    output_tokens: int
+    latency_s: float
+    cached_input_tokens: int = 0
+
+
+class LatencyModel:
+    """
+    Synthetic latency applied to replayed responses, so harness throughput and NPC turn latency
+    can be measured offline. Either a fixed delay, or delays sampled from all recorded timings.
+    """
+
+    def __init__(self, fixed_s: Optional[float] = None, sample_recorded: bool = False, seed: Optional[int] = None):
+        if fixed_s is not None and sample_recorded:
+            raise ValueError("Use either a fixed latency or sampled recorded latencies, not both")
+        self.fixed_s = fixed_s
+        self.sample_recorded = sample_recorded
+        self._random = random.Random(seed)
+        self._lock = RLock()
+
+    @classmethod
+    def fixed(cls, seconds: float) -> 'LatencyModel':
+        return cls(fixed_s=seconds)
+
+    @classmethod
+    def sampled(cls, seed: Optional[int] = None) -> 'LatencyModel':
+        return cls(sample_recorded=True, seed=seed)
+
+    def get_delay(self, recorded_latencies: List[float]) -> float:
+        if self.fixed_s is not None:
+            return self.fixed_s
+        if self.sample_recorded and recorded_latencies:
+            with self._lock:
+                return self._random.choice(recorded_latencies)
+        return 0.0
+
+
+class LlmTranscript:
+    """
+    JSONL transcript of LLM request/response pairs, used as a local stand-in for the LLM provider.
+
+    - In record mode, ChatBot calls the provider as usual and appends each exchange (with its latency).
+    - In replay mode, requests are answered from the transcript by request hash. If the same request was
+      recorded several times, the recorded responses are replayed in order (cycling), keeping runs deterministic.
+    - An optional LatencyModel adds synthetic delay to replayed responses.
+    """
+
+    def __init__(self, transcript_file: Path, mode: TranscriptMode, latency_model: Optional[LatencyModel] = None):
+        self.transcript_file = Path(transcript_file)
+        self.mode = mode
+        self.latency_model = latency_model
+        self._lock = RLock()
+        self._entries_by_hash: Dict[str, List[TranscriptEntry]] = {}
+        self._replay_positions: Dict[str, int] = {}
+        self._recorded_latencies: List[float] = []
+
+        if self.mode == TranscriptMode.replay:
+            if not self.transcript_file.exists():
+                raise FileNotFoundError(f"Transcript {self.transcript_file} does not exist")
+            self._load()
+        else:
+            os.makedirs(self.transcript_file.parent, exist_ok=True)
+
+    @staticmethod
+    def get_request_hash(model: Llm, messages: List[Dict[str, str]]) -> str:
+        return llm_utils.get_request_hash(model, messages)
+
+    def _load(self) -> None:
+        with open(self.transcript_file, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = TranscriptEntry(**json.loads(line))
+                except (json.JSONDecodeError, TypeError) as e:
+                    Logger.warning(f"Skipping malformed transcript line {line_number} in {self.transcript_file}: {e}")
+                    continue
+                self._entries_by_hash.setdefault(entry.request_hash, []).append(entry)
+                self._recorded_latencies.append(entry.latency_s)
+        Logger.verbose(f"Loaded {len(self._recorded_latencies)} transcript entries from {self.transcript_file}")
+
+    def record(self, model: Llm, messages: List[Dict[str, str]], response: str, token_count: TokenCount, latency_s: float) -> None:
+        entry = TranscriptEntry(
+            request_hash=self.get_request_hash(model, messages),
+            model=model.value,
+            messages=messages,
+            response=response,
+            input_tokens=token_count.input_tokens,
+            output_tokens=token_count.output_tokens,
+            latency_s=latency_s,
+            cached_input_tokens=token_count.cached_input_tokens,
+        )
+        line = json.dumps(asdict(entry), ensure_ascii=False)
+        with self._lock:
+            with open(self.transcript_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._entries_by_hash.setdefault(entry.request_hash, []).append(entry)
+            self._recorded_latencies.append(latency_s)
+
+    def lookup(self, model: Llm, messages: List[Dict[str, str]]) -> Tuple[str, TokenCount]:
+        """Returns the next recorded (response, TokenCount) for this request without applying any delay."""
+        request_hash = self.get_request_hash(model, messages)
+        with self._lock:
+            entries = self._entries_by_hash.get(request_hash)
+            if not entries:
+                raise TranscriptMissError(f"No recorded response for request {request_hash[:12]} (model {model.value}) in {self.transcript_file}")
+            position = self._replay_positions.get(request_hash, 0)
+            self._replay_positions[request_hash] = position + 1
+            entry = entries[position % len(entries)]
+        token_count = TokenCount.create(model, entry.input_tokens, entry.output_tokens, entry.cached_input_tokens)
+        return entry.response, token_count
+
+    def get_replay_delay(self) -> float:
+        if self.latency_model is None:
+            return 0.0
+        return self.latency_model.get_delay(self._recorded_latencies)
+
+    def replay(self, model: Llm, messages: List[Dict[str, str]]) -> Tuple[str, TokenCount]:
+        """Blocking replay, including any synthetic latency."""
+        response = self.lookup(model, messages)
+        delay = self.get_replay_delay()
+        if delay > 0:
+            time.sleep(delay)
+        return response
@@ -1,6 +1,10 @@
-from typing import Dict, List, Type, TypeVar
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple, Type, TypeVar
 
 from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Llm, Role
+from src.core.HistoryPolicy import CotHistoryPolicy
 from src.utils import Utilities, parsing_utils
 
 T = TypeVar('T')
@@ -40,18 +44,154 @@ def extract_obj_from_llm_response(response_raw: str, response_type: Type[T]) ->
     response_obj = parsing_utils.extract_obj_from_json_str(response_raw, response_type, trim=True)
     return response_obj
 
-def convert_message_history_to_llm_format(message_history: List[ChatMessage], include_hidden_details: bool = True) -> List[Dict[str, str]]:
+def convert_message_history_to_llm_format(message_history: List[ChatMessage], include_hidden_details: bool = True, cot_policy: Optional[CotHistoryPolicy] = None) -> List[Dict[str, str]]:
+    """
+    Args:
+        cot_policy: Which past hidden thought processes to replay in full (all of them if None)
+    """
+    return convert_message_history_with_cot_policy(message_history, include_hidden_details, cot_policy)[0]
+
+def convert_message_history_with_cot_policy(message_history: List[ChatMessage], include_hidden_details: bool = True, cot_policy: Optional[CotHistoryPolicy] = None) -> Tuple[List[Dict[str, str]], List[Tuple[str, str]]]:
+    """
+    Like convert_message_history_to_llm_format, but also returns the (full CoT, replayed CoT) of every message
+    whose CoT the policy cut or dropped, so callers can tell what the policy saved without rendering twice.
+    """
     message_history_dict_list = []
+    rewritten_cots = []
+    assistant_messages_after = sum(1 for message in message_history if message.role == Role.assistant)
     for message in message_history:
         role = message.role
+        if role == Role.assistant:
+            assistant_messages_after -= 1
+        cot = None
         if include_hidden_details and message.cot is not None:
+            cot = cot_policy.render_cot(message.cot, assistant_messages_after) if cot_policy is not None else message.cot
+            if cot != message.cot:
+                rewritten_cots.append((message.cot, cot))
+        message_history_dict_list.append(render_message(message, cot))
+    return message_history_dict_list, rewritten_cots
+
+def render_message(message: ChatMessage, cot: Optional[str]) -> Dict[str, str]:
+    """
+    The message in LLM format, with cot as its hidden thought process (None for just the content).
+    The rendered content is memoized on the message when it differs from the message's own content.
+    """
+    content = message.get_rendered(cot)
+    if content is None:
+        if cot is not None:
             # Format the content as a json string of the ChatResponse class (TODO make it agnostic to the class)
             content = "{"
-            content += f'\t"hidden_thought_process": "{message.cot}", '
+            content += f'\t"hidden_thought_process": "{cot}", '
             content += f'\t"response": "{message.content}", '
             content += f'\t"off_switch": {str(message.off_switch).lower()}'
             content += "}"
         else:
             content = message.content # User responses will fall here
-        message_history_dict_list.append({"role": role.name, "content": Utilities.decode(content)})
-    return message_history_dict_list
\ No newline at end of file
+        if not content.isascii():
+            content = Utilities.decode(content)
+        if content is not message.content:
+            message.set_rendered(cot, content)
+    return {"role": message.role.name, "content": content}
+
+def _normalize_messages_for_hashing(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Only role and content matter to the LLM; line endings and surrounding whitespace are not significant."""
+    normalized = []
+    for message in messages:
+        content = message.get("content") or ""
+        normalized.append({"role": str(message.get("role")), "content": content.replace("\r\n", "\n").strip()})
+    return normalized
+
+def get_request_hash(model: Llm, messages: List[Dict[str, str]], *extra: str) -> str:
+    """Stable content hash of an LLM request (model + normalized messages + any extra discriminators)."""
+    payload = {
+        "model": model.value,
+        "messages": _normalize_messages_for_hashing(messages),
+        "extra": list(extra),
+    }
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+class StreamingFieldExtractor:
+    """
+    Incrementally extracts the text of one top-level string field (e.g. "response") from a JSON object
+    that arrives in chunks, such as a streamed ChatResponse. Anything outside the object (e.g. ```json fences)
+    and all other fields are ignored. Call feed() with each chunk; it returns the newly decoded field text.
+    """
+    _simple_escapes = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field_name: str = "response"):
+        self.field_name = field_name
+        self.field_complete = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode_digits = None  # Collects the 4 hex digits of a \uXXXX escape
+        self._pending_high_surrogate = None
+        self._expecting_key = False
+        self._string_is_key = False
+        self._key_chars: List[str] = []
+        self._last_key = None
+        self._emitting = False
+
+    def feed(self, chunk: str) -> str:
+        out: List[str] = []
+        for ch in chunk:
+            if self._in_string:
+                self._consume_string_char(ch, out)
+            elif ch == '"':
+                self._in_string = True
+                self._string_is_key = self._depth == 1 and self._expecting_key
+                self._key_chars = []
+                self._emitting = (not self._string_is_key) and self._depth == 1 and self._last_key == self.field_name and not self.field_complete
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expecting_key = ch == "{"
+            elif ch in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and ch == ":":
+                self._expecting_key = False
+            elif self._depth == 1 and ch == ",":
+                self._expecting_key = True
+        return "".join(out)
+
+    def _consume_string_char(self, ch: str, out: List[str]) -> None:
+        if self._unicode_digits is not None:
+            self._unicode_digits += ch
+            if len(self._unicode_digits) == 4:
+                code_point = int(self._unicode_digits, 16)
+                self._unicode_digits = None
+                self._append_string_char(self._combine_surrogates(code_point), out)
+        elif self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode_digits = ""
+            else:
+                self._append_string_char(self._simple_escapes.get(ch, ch), out)
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._in_string = False
+            if self._string_is_key:
+                self._last_key = "".join(self._key_chars)
+            elif self._emitting:
+                self._emitting = False
+                self.field_complete = True
+        else:
+            self._append_string_char(ch, out)
+
+    def _combine_surrogates(self, code_point: int) -> str:
+        if 0xD800 <= code_point <= 0xDBFF:
+            self._pending_high_surrogate = code_point
+            return ""
+        if 0xDC00 <= code_point <= 0xDFFF and self._pending_high_surrogate is not None:
+            high = self._pending_high_surrogate
+            self._pending_high_surrogate = None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code_point - 0xDC00))
+        return chr(code_point)
+
+    def _append_string_char(self, text: str, out: List[str]) -> None:
+        if self._string_is_key:
+            self._key_chars.append(text)
+        elif self._emitting:
+            out.append(text)
@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition
+from typing import Deque, Dict, Optional
+
+from src.core.Constants import Llm
+from src.utils import deadline
+from src.utils.deadline import DeadlineExceeded
+
+
+@dataclass
+class RateLimit:
+    """Per-model budget. None means that dimension is unlimited."""
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at rate_per_minute / 60 per second.
+    The balance may go negative when actual usage exceeds the reservation, which delays later callers.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float):
+        self.refill_per_second = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.refill_per_second * burst_seconds)
+        self.tokens = self.capacity
+        self._last_refill = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.refill_per_second)
+        self._last_refill = now
+
+    def get_wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken. Requests larger than the bucket wait for a full bucket."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.refill_per_second
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+
+class ModelRateLimiter:
+    """
+    Request and token buckets for one model, shared by all threads and event loops in the process.
+
+    Callers are served strictly in arrival order (FIFO tickets), so a large request is not starved
+    by a stream of small ones. A 429 pauses the whole queue for the provider's Retry-After.
+    Waiting callers give up with DeadlineExceeded rather than outlive their deadline (see deadline.py).
+    """
+
+    def __init__(self, rate_limit: RateLimit, burst_seconds: float = 10.0):
+        self.rate_limit = rate_limit
+        self._request_bucket = TokenBucket(rate_limit.requests_per_minute, burst_seconds) if rate_limit.requests_per_minute else None
+        self._token_bucket = TokenBucket(rate_limit.tokens_per_minute, burst_seconds) if rate_limit.tokens_per_minute else None
+        self._condition = Condition()
+        self._queue: Deque[int] = deque()
+        self._tickets = itertools.count()
+        self._paused_until = 0.0
+
+        self.total_wait_s = 0.0
+        self.throttled_requests = 0
+        self.rate_limit_errors = 0
+
+    def acquire(self, estimated_tokens: int) -> None:
+        """Block until this caller's turn comes up and both budgets allow the request."""
+        start = time.monotonic()
+        with self._condition:
+            ticket = self._enqueue()
+            try:
+                while True:
+                    wait = self._try_reserve(ticket, estimated_tokens)
+                    if wait == 0.0:
+                        break
+                    self._condition.wait(timeout=self._cap_to_deadline(ticket, wait))
+            finally:
+                self._dequeue(ticket)
+        self._record_wait(time.monotonic() - start)
+
+    async def acquire_async(self, estimated_tokens: int, poll_interval_s: float = 0.05) -> None:
+        """Async version of acquire; waits with asyncio.sleep so the event loop keeps running."""
+        start = time.monotonic()
+        with self._condition:
+            ticket = self._enqueue()
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_reserve(ticket, estimated_tokens)
+                    if wait != 0.0:
+                        wait = self._cap_to_deadline(ticket, wait)
+                if wait == 0.0:
+                    break
+                await asyncio.sleep(min(wait, poll_interval_s))
+        finally:
+            with self._condition:
+                self._dequeue(ticket)
+        self._record_wait(time.monotonic() - start)
+
+    def record_usage(self, extra_tokens: int) -> None:
+        """Debit tokens that were not known when the request was admitted (e.g. the output tokens)."""
+        if self._token_bucket is None or extra_tokens == 0:
+            return
+        with self._condition:
+            self._token_bucket.take(extra_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every queued caller for the given time, e.g. after a 429 with Retry-After."""
+        with self._condition:
+            self.rate_limit_errors += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                "throttled_requests": self.throttled_requests,
+                "total_wait_s": self.total_wait_s,
+                "rate_limit_errors": self.rate_limit_errors,
+                "queued": len(self._queue),
+            }
+
+    # ---------- Helpers (call with the condition held) ----------
+    def _enqueue(self) -> int:
+        ticket = next(self._tickets)
+        self._queue.append(ticket)
+        return ticket
+
+    def _dequeue(self, ticket: int) -> None:
+        try:
+            self._queue.remove(ticket)
+        except ValueError:
+            pass
+        self._condition.notify_all()
+
+    def _try_reserve(self, ticket: int, estimated_tokens: int) -> float:
+        """Returns 0.0 if the request was admitted, otherwise how long to wait before trying again."""
+        now = time.monotonic()
+        if self._paused_until > now:
+            return self._paused_until - now
+        if self._queue[0] != ticket:
+            return 1.0  # Woken by notify_all when the head of the queue changes
+        wait = 0.0
+        if self._request_bucket is not None:
+            wait = max(wait, self._request_bucket.get_wait_time(1, now))
+        if self._token_bucket is not None:
+            wait = max(wait, self._token_bucket.get_wait_time(estimated_tokens, now))
+        if wait > 0.0:
+            return wait
+        if self._request_bucket is not None:
+            self._request_bucket.take(1)
+        if self._token_bucket is not None:
+            self._token_bucket.take(estimated_tokens)
+        return 0.0
+
+    def _cap_to_deadline(self, ticket: int, wait: float) -> float:
+        """
+        How long to wait given the caller's deadline. Raises DeadlineExceeded once it has run out, or right away
+        if the caller is next in line (or the queue is paused) and the wait is known to outlast it.
+        """
+        remaining = deadline.remaining_s()
+        if remaining is None:
+            return wait
+        wait_is_known = self._queue[0] == ticket or self._paused_until > time.monotonic()
+        if remaining == 0 or (wait_is_known and wait > remaining):
+            raise DeadlineExceeded(f"Deadline exceeded waiting {wait:.1f}s for the rate limit ({remaining:.1f}s left)")
+        return min(wait, remaining)
+
+    def _record_wait(self, waited_s: float) -> None:
+        if waited_s > 0.001:
+            with self._condition:
+                self.throttled_requests += 1
+                self.total_wait_s += waited_s
+
+
+class RateLimiter:
+    """Registry of per-model limiters. Models without a configured limit are not throttled."""
+
+    def __init__(self, limits: Dict[Llm, RateLimit], burst_seconds: float = 10.0):
+        self._limiters: Dict[Llm, ModelRateLimiter] = {
+            model: ModelRateLimiter(rate_limit, burst_seconds) for model, rate_limit in limits.items()
+        }
+
+    def for_model(self, model: Llm) -> Optional[ModelRateLimiter]:
+        return self._limiters.get(model)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        return {model.value: limiter.get_stats() for model, limiter in self._limiters.items()}
@@ -0,0 +1,113 @@
+import asyncio
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from src.utils import deadline
+from src.utils.deadline import DeadlineExceeded
+
+T = TypeVar('T')
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result: Any = None
+        self.exception: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls. The first caller for a key (the leader) runs the function;
+    callers that arrive with the same key while it is in flight wait and receive the leader's result
+    (or exception) instead of issuing their own call. Nothing is cached once the call finishes.
+
+    Waiters wait under their own deadline (see deadline.py), not the leader's. If the leader runs out of its
+    deadline, its DeadlineExceeded is not passed on: one of the waiters re-tries as the new leader.
+
+    Set enabled to False when every caller needs its own sample (e.g. for response diversity).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.leader_calls = 0
+        self.coalesced_calls = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Returns:
+            Tuple of (result, shared) where shared is True if the result came from another caller's call
+        """
+        if not self.enabled:
+            return fn(), False
+
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None:
+                    self.coalesced_calls += 1
+                    leader = False
+                else:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.leader_calls += 1
+                    leader = True
+            if leader:
+                break
+
+            if not call.done.wait(deadline.remaining_s()):
+                raise DeadlineExceeded("Deadline exceeded waiting for a coalesced request")
+            if isinstance(call.exception, DeadlineExceeded):
+                # The leader ran out of its own deadline, not ours: re-try
+                continue
+            if call.exception is not None:
+                raise call.exception
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Async version of do. Calls are coalesced per event loop."""
+        if not self.enabled:
+            return await fn(), False
+
+        loop_key = (id(asyncio.get_running_loop()), key)
+        while True:
+            with self._lock:
+                future = self._async_calls.get(loop_key)
+                shared = future is not None and not future.done()
+                if shared:
+                    self.coalesced_calls += 1
+                else:
+                    # The task runs in the leader's context, so under the leader's deadline
+                    future = asyncio.ensure_future(fn())
+                    self._async_calls[loop_key] = future
+                    future.add_done_callback(lambda _, future=future: self._forget_async_call(loop_key, future))
+                    self.leader_calls += 1
+            try:
+                # Shield so a cancelled (or timed out) caller does not cancel the call the others are waiting on
+                return await deadline.wait_for(asyncio.shield(future), "coalesced request"), shared
+            except DeadlineExceeded:
+                if not shared or not future.done() or future.cancelled() or not isinstance(future.exception(), DeadlineExceeded):
+                    raise
+                # The leader ran out of its own deadline, not ours: re-try
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leader_calls": self.leader_calls, "coalesced_calls": self.coalesced_calls}
+
+    def _forget_async_call(self, loop_key: Tuple[int, Hashable], future: asyncio.Future) -> None:
+        with self._lock:
+            if self._async_calls.get(loop_key) is future:
+                del self._async_calls[loop_key]
@@ -0,0 +1,169 @@
+"""
+Append-only journal for saved state.
+
+Rewriting a whole save file after every turn costs O(history). A StateJournal instead appends one JSON
+line per save with only what changed since the previous save: the items appended to (or dropped from the
+front of) each list, and the new value of anything else that changed. Every compact_every saves the caller
+writes a full snapshot instead, and the journal starts over on top of it.
+
+The journal's first line names the snapshot it applies to (by content hash), so a crash between writing a
+snapshot and starting its journal can't replay old changes onto the new snapshot. A truncated last line
+(a crash mid-append) is skipped on replay, losing only that save.
+"""
+import hashlib
+import json
+import os
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, TypeVar, get_args, get_type_hints
+
+from src.utils import Logger
+from src.utils.Logger import Level
+from src.utils.parsing_utils import _unwrap_optional, convert_to_dataclass, obj_to_dict
+
+T = TypeVar('T')
+
+
+def get_journal_path(snapshot_path: Path) -> Path:
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(snapshot_path.stem + ".journal.jsonl")
+
+
+def replay_journal(state: T, snapshot_path: Path) -> T:
+    """Apply the journal of snapshot_path (if there is one for this snapshot) to state, loaded from the snapshot. Edits state in place."""
+    journal_path = get_journal_path(snapshot_path)
+    if not journal_path.exists():
+        return state
+    with open(journal_path, "r") as f:
+        lines = f.read().splitlines()
+    try:
+        header = json.loads(lines[0]) if lines else {}
+    except json.JSONDecodeError:
+        header = {}
+    if header.get("snapshot_sha256") != _hash_file(snapshot_path):
+        Logger.log(f"Ignoring {journal_path}, it belongs to another snapshot", Level.WARNING)
+        return state
+
+    num_replayed = 0
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            # Only the last line can be cut short by a crash; anything after a bad line can't be trusted either
+            Logger.log(f"Ignoring a truncated entry in {journal_path} and everything after it", Level.WARNING)
+            break
+        for change in entry["changes"]:
+            _apply_change(state, change)
+        num_replayed += 1
+    Logger.log(f"Replayed {num_replayed} journaled saves from {journal_path}", Level.DEBUG)
+    return state
+
+
+class StateJournal:
+    def __init__(self, snapshot_path: Path, compact_every: int = 50):
+        """
+        Args:
+            snapshot_path: The full save the journal builds on
+            compact_every: Journaled saves before the next save is a full snapshot again
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = get_journal_path(snapshot_path)
+        self.compact_every = compact_every
+        # What the last save looked like, by field path: lists by identity, everything else serialized
+        self._baseline: Optional[Dict[Tuple[str, ...], Tuple]] = None
+        self._num_entries = 0
+
+    def append_changes(self, state: Any) -> bool:
+        """
+        Append what changed since the last save to the journal.
+        Returns False if a full snapshot is due instead: write it, then call reset.
+        """
+        if self._baseline is None or self._num_entries >= self.compact_every:
+            return False
+        changes: List[Dict[str, Any]] = []
+        baseline: Dict[Tuple[str, ...], Tuple] = {}
+        self._walk(state, (), changes, baseline)
+        if changes:
+            with open(self.journal_path, "a") as f:
+                f.write(json.dumps({"changes": changes}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._num_entries += 1
+        self._baseline = baseline
+        return True
+
+    def reset(self, state: Any) -> None:
+        """Start a new, empty journal on top of a snapshot of state that was just written to snapshot_path"""
+        temp_path = self.journal_path.with_name(self.journal_path.name + ".tmp")
+        with open(temp_path, "w") as f:
+            f.write(json.dumps({"snapshot_sha256": _hash_file(self.snapshot_path)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+        baseline: Dict[Tuple[str, ...], Tuple] = {}
+        self._walk(state, (), None, baseline)
+        self._baseline = baseline
+        self._num_entries = 0
+
+    # ---------- Helpers ----------
+    def _walk(self, value: Any, path: Tuple[str, ...], changes: Optional[List[Dict[str, Any]]], baseline: Dict[Tuple[str, ...], Tuple]) -> None:
+        """Record value's baseline and (unless changes is None) its changes since the last save"""
+        if _is_container(value):
+            for f in fields(value):
+                self._walk(getattr(value, f.name), path + (f.name,), changes, baseline)
+        elif isinstance(value, list):
+            baseline[path] = ("list", value, len(value), value[-1] if value else None)
+            if changes is not None:
+                self._diff_list(value, path, changes)
+        else:
+            serialized = json.dumps(obj_to_dict(value), sort_keys=True, ensure_ascii=False)
+            baseline[path] = ("value", serialized)
+            if changes is not None and self._baseline.get(path) != ("value", serialized):
+                changes.append({"path": list(path), "set": obj_to_dict(value)})
+
+    def _diff_list(self, value: list, path: Tuple[str, ...], changes: List[Dict[str, Any]]) -> None:
+        previous = self._baseline.get(path)
+        drop, num_kept = None, 0
+        if previous is not None and previous[0] == "list":
+            _, previous_list, previous_len, previous_last = previous
+            if previous_list is value and len(value) >= previous_len and (previous_len == 0 or value[previous_len - 1] is previous_last):
+                # Appended in place
+                drop, num_kept = 0, previous_len
+            elif previous_list is not value and value:
+                # Replaced by a copy that drops items from the front (e.g. trimmed after summarization)
+                start = next((i for i in range(previous_len) if previous_list[i] is value[0]), None)
+                if start is not None and previous_len - start <= len(value) and all(previous_list[start + i] is value[i] for i in range(previous_len - start)):
+                    drop, num_kept = start, previous_len - start
+        if drop is None:
+            changes.append({"path": list(path), "set": obj_to_dict(value)})
+        elif drop > 0 or num_kept < len(value):
+            changes.append({"path": list(path), "drop": drop, "append": [obj_to_dict(item) for item in value[num_kept:]]})
+
+
+def _is_container(value: Any) -> bool:
+    """Dataclasses holding lists are diffed field by field; any other value is compared (and saved) whole"""
+    return is_dataclass(value) and not isinstance(value, type) and any(
+        isinstance(getattr(value, f.name), list) or _is_container(getattr(value, f.name)) for f in fields(value)
+    )
+
+
+def _apply_change(state: Any, change: Dict[str, Any]) -> None:
+    *parent_path, name = change["path"]
+    parent = state
+    for attribute in parent_path:
+        parent = getattr(parent, attribute)
+    field_type = get_type_hints(type(parent))[name]
+    if "set" in change:
+        setattr(parent, name, convert_to_dataclass(change["set"], field_type))
+        return
+    (item_type,) = get_args(_unwrap_optional(field_type))
+    appended = [convert_to_dataclass(item, item_type) for item in change["append"]]
+    setattr(parent, name, getattr(parent, name)[change["drop"]:] + appended)
+
+
+def _hash_file(path: Path) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
@@ -2,7 +2,8 @@
 Token counting utility using tiktoken for accurate token counts.
 """
 import tiktoken
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Tuple
 from src.core.Constants import Llm
 
 
@@ -18,6 +19,16 @@ MODEL_TO_ENCODING = {
     Llm.llama3: "cl100k_base",  # Fallback encoding for non-OpenAI models
 }
 
+# Token counting logic based on OpenAI's token counting guide
+# Every message follows <|start|>{role/name}\n{content}<|end|>\n
+TOKENS_PER_MESSAGE = 3  # message overhead
+TOKENS_PER_NAME = 1  # if there's a name field
+TOKENS_PER_REPLY = 3  # every reply is primed with <|start|>assistant<|message|>
+
+# Conversations re-send the same messages every turn, so per-message counts are cached by content
+# and only new messages get encoded. Free text (responses, dynamic context) is mostly one-off, so it isn't cached
+MESSAGE_TOKEN_CACHE_SIZE = 8192
+
 
 def count_tokens_for_messages(messages: List[Dict[str, str]], model: Llm) -> int:
     """
@@ -30,33 +41,19 @@ def count_tokens_for_messages(messages: List[Dict[str, str]], model: Llm) -> int
     Returns:
         Total number of tokens in the messages
     """
-    # Get the encoding for this model
-    encoding_name = MODEL_TO_ENCODING.get(model, "cl100k_base")
-    
-    try:
-        encoding = tiktoken.get_encoding(encoding_name)
-    except Exception:
-        # Fallback to cl100k_base if encoding not found
-        encoding = tiktoken.get_encoding("cl100k_base")
-    
-    # Token counting logic based on OpenAI's token counting guide
-    # Every message follows <|start|>{role/name}\n{content}<|end|>\n
-    tokens_per_message = 3  # message overhead
-    tokens_per_name = 1  # if there's a name field
-    
     num_tokens = 0
     for message in messages:
-        num_tokens += tokens_per_message
-        for key, value in message.items():
-            num_tokens += len(encoding.encode(str(value)))
-            if key == "name":
-                num_tokens += tokens_per_name
-    
-    num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
-    
+        num_tokens += count_tokens_for_message(message, model)
+    num_tokens += TOKENS_PER_REPLY
     return num_tokens
 
 
+def count_tokens_for_message(message: Dict[str, str], model: Llm) -> int:
+    """Tokens for one message including its overhead, excluding the reply priming. Cached by content."""
+    encoding_name = MODEL_TO_ENCODING.get(model, "cl100k_base")
+    return _count_tokens_for_message(encoding_name, tuple((key, str(value)) for key, value in message.items()))
+
+
 def count_tokens_for_text(text: str, model: Llm) -> int:
     """
     Count the number of tokens in a text string for a specific model.
@@ -68,14 +65,25 @@ def count_tokens_for_text(text: str, model: Llm) -> int:
     Returns:
         Number of tokens in the text
     """
-    # Get the encoding for this model
-    encoding_name = MODEL_TO_ENCODING.get(model, "cl100k_base")
-    
+    return len(_get_encoding(MODEL_TO_ENCODING.get(model, "cl100k_base")).encode(text))
+
+
+@lru_cache(maxsize=MESSAGE_TOKEN_CACHE_SIZE)
+def _count_tokens_for_message(encoding_name: str, message_items: Tuple[Tuple[str, str], ...]) -> int:
+    encoding = _get_encoding(encoding_name)
+    num_tokens = TOKENS_PER_MESSAGE
+    for key, value in message_items:
+        num_tokens += len(encoding.encode(value))
+        if key == "name":
+            num_tokens += TOKENS_PER_NAME
+    return num_tokens
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str) -> tiktoken.Encoding:
     try:
-        encoding = tiktoken.get_encoding(encoding_name)
+        return tiktoken.get_encoding(encoding_name)
     except Exception:
         # Fallback to cl100k_base if encoding not found
-        encoding = tiktoken.get_encoding("cl100k_base")
-    
-    return len(encoding.encode(text))
+        return tiktoken.get_encoding("cl100k_base")
 
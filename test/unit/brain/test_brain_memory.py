@@ -0,0 +1,77 @@
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.brain.brain_memory import BrainMemory
+from src.core.schemas.CollectionSchemas import Entity
+
+EMBEDDINGS = {"I have a dog": [1.0, 0.0], "I like tea": [0.0, 1.0], "my pets": [0.9, 0.1], "a stored memory": [0.5, 0.5]}
+
+
+@pytest.fixture
+def collection():
+    with patch('src.brain.brain_memory.QdrantCollection') as MockQCol:
+        instance = Mock()
+        instance.search_text.return_value = []
+        instance.get_embedding.side_effect = lambda text: EMBEDDINGS[text]
+        instance.get_embeddings.side_effect = lambda texts: [EMBEDDINGS[text] for text in texts]
+        MockQCol.return_value = instance
+        yield instance
+
+
+def test_add_memory_does_not_block_on_the_upsert(collection):
+    release = threading.Event()
+    collection.insert_dataclasses.side_effect = lambda batch: release.wait(timeout=2)
+    brain = BrainMemory("test_collection")
+
+    brain.add_memory("I have a dog")
+    # Returned while the write is still blocked; the queued memory is already searchable
+    assert [entity.content for entity in brain.get_memories("my pets", topk=5)] == ["I have a dog"]
+
+    release.set()
+    brain.maintain()
+    assert brain.get_memories("my pets", topk=5) == []
+
+
+def test_queued_memories_are_written_in_one_batch(collection):
+    brain = BrainMemory("test_collection")
+    brain._flush_scheduled = True  # Keep the background flush out of the way, so both writes are queued
+    brain.add_memory("I have a dog")
+    brain.add_memory("I like tea")
+    brain.flush()
+
+    collection.insert_dataclasses.assert_called_once()
+    assert [entity.content for entity in collection.insert_dataclasses.call_args.args[0]] == ["I have a dog", "I like tea"]
+
+
+def test_queued_memories_merge_with_search_hits_by_score(collection):
+    stored = Entity(key="a stored memory", content="a stored memory", tags=["memories"], id=1)
+    collection.search_text.return_value = [(stored, 0.8)]
+    brain = BrainMemory("test_collection")
+    brain._flush_scheduled = True
+    brain.add_memory("I have a dog")
+    brain.add_memory("I like tea")
+
+    memories = brain.get_memories("my pets", topk=2)
+    assert [entity.content for entity in memories] == ["I have a dog", "a stored memory"]
+
+
+def test_failed_writes_stay_queued(collection):
+    collection.insert_dataclasses.side_effect = [Exception("Qdrant is down"), None]
+    brain = BrainMemory("test_collection")
+    brain._flush_scheduled = True
+    brain.add_memory("I have a dog")
+
+    with pytest.raises(Exception):
+        brain.flush()
+    brain.flush()
+    assert collection.insert_dataclasses.call_count == 2
+    assert brain._pending == {}
@@ -0,0 +1,118 @@
+import sys
+import threading
+from pathlib import Path
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.brain.episodic_memory import EpisodicMemory, Episode
+from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Role
+
+TOPICS = ["dog", "tea", "rain"]
+
+
+def _embed(text):
+    return [1.0 if topic in text else 0.0 for topic in TOPICS]
+
+
+def _exchange(user_text, response_text):
+    return [
+        ChatMessage(role=Role.user, content=user_text, cot=None, off_switch=False),
+        ChatMessage(role=Role.assistant, content=response_text, cot=None, off_switch=False),
+    ]
+
+
+class EmbedSpy:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [_embed(text) for text in texts]
+
+
+def test_recalls_the_most_relevant_exchanges_oldest_first():
+    memory = EpisodicMemory(EmbedSpy())
+    memory.add_exchange(_exchange("My dog is called Rex", "What a good name for a dog"))
+    memory.add_exchange(_exchange("I drink green tea", "Tea is lovely"))
+    memory.add_exchange(_exchange("It looks like rain", "Take an umbrella"))
+    memory.add_exchange(_exchange("Rex the dog ran off in the rain", "Oh no!"))
+
+    episodes = memory.search("what was my dog called?", topk=2)
+
+    assert [episode.turn for episode in episodes] == [0, 3]
+    assert episodes[0].to_text() == "user: My dog is called Rex\nassistant: What a good name for a dog"
+
+
+def test_exchanges_still_in_the_live_window_are_skipped():
+    memory = EpisodicMemory(EmbedSpy())
+    trimmed = _exchange("My dog is called Rex", "ok")
+    live = _exchange("Do you like my dog?", "ok")
+    memory.add_exchange(trimmed)
+    memory.add_exchange(live)
+    # A clarification exchange in the live window that was never recorded as an episode
+    live_window = _exchange("Does he like it?", "Who do you mean?") + live
+
+    first_live_turn = memory.track_live_window(live_window)
+
+    assert first_live_turn == 1
+    # The trimmed exchange is recalled even though its reply has the same text as a live one
+    assert [episode.turn for episode in memory.search("dog", topk=2, exclude_from_turn=first_live_turn)] == [0]
+
+
+def test_loaded_episodes_are_linked_to_the_loaded_live_window():
+    memory = EpisodicMemory(EmbedSpy(), [
+        Episode(turn=0, messages=_exchange("My dog is called Rex", "ok")),
+        Episode(turn=1, messages=_exchange("Do you like my dog?", "ok")),
+    ], first_live_turn=1)
+    # Loaded separately from the episodes, so equal but not the same objects
+    live_window = _exchange("Do you like my dog?", "ok")
+
+    memory.link_live_window(live_window)
+
+    assert memory.episodes[1].messages[0] is live_window[0]
+    assert memory.track_live_window(live_window) == 1
+    live_window.clear()  # As if summarized away
+    assert memory.track_live_window(live_window) == 2
+
+
+def test_exchanges_are_embedded_once_in_a_batch_at_search_time():
+    embed = EmbedSpy()
+    memory = EpisodicMemory(embed)
+    memory.add_exchange(_exchange("My dog is called Rex", "Nice"))
+    memory.add_exchange(_exchange("I drink green tea", "Lovely"))
+    assert embed.calls == []
+
+    memory.search("dog", topk=1)
+    memory.add_exchange(_exchange("It looks like rain", "Umbrella time"))
+    memory.search("rain", topk=1)
+
+    # Two episodes in one batch, then the query, then only the new episode, then the query
+    assert [len(call) for call in embed.calls] == [2, 1, 1, 1]
+
+
+def test_recording_an_exchange_does_not_wait_for_embedding():
+    embedding_started = threading.Event()
+    release = threading.Event()
+
+    def slow_embed(texts):
+        embedding_started.set()
+        release.wait(5)
+        return [_embed(text) for text in texts]
+
+    memory = EpisodicMemory(slow_embed)
+    memory.add_exchange(_exchange("My dog is called Rex", "Nice"))
+    search = threading.Thread(target=memory.search, args=("dog",))
+    search.start()
+    assert embedding_started.wait(2)
+
+    recorded = threading.Thread(target=memory.add_exchange, args=(_exchange("I drink green tea", "Lovely"),))
+    recorded.start()
+    recorded.join(1)
+    assert not recorded.is_alive()
+    release.set()
+    search.join()
+    assert [episode.turn for episode in memory.search("tea", topk=1)] == [1]
@@ -0,0 +1,154 @@
+"""
+Unit tests for batch evaluation: the JSONL batch round trip, output parsing, and mapping results back into reports
+"""
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.conversation_eval.core.ConversationParsingBot import ConversationParsingBot
+from src.conversation_eval.core.EvalClasses import Proposition, Term
+from src.conversation_eval.core.ParallelEvalRunner import ParallelEvalRunner
+from src.core.Constants import Llm, PassFail
+from src.core.ResponseTypes import EvaluationResponse
+from src.utils import llm_batch
+from src.utils.ChatBot import ChatBot
+from src.utils.llm_batch import BatchRequest, LocalFileBatchBackend, parse_batch_output
+
+PASSING_EVALUATION = json.dumps({
+    "antecedent_explanation": "The user asks",
+    "antecedent_times": [1],
+    "consequent_explanation": "The assistant answers",
+    "consequent_times": [2],
+})
+
+CONVERSATION = ["1. User: Hello?", "2. Pat: Hi there!"]
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _proposition(consequent="The assistant answers"):
+    return Proposition(antecedent=Term(value="The user asks"), consequent=Term(value=consequent))
+
+
+def _output_line(custom_id, content, model="gpt-4o-mini-2024-07-18"):
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": {
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 1000, "completion_tokens": 100},
+        }},
+        "error": None,
+    })
+
+
+def test_local_backend_round_trip(tmp_path):
+    requests = [
+        BatchRequest(custom_id=f"req{i}", model=Llm.gpt_4o_mini, messages=[{"role": "user", "content": f"Question {i}"}])
+        for i in range(3)
+    ]
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=lambda **kwargs: _completion(f"Answer to {kwargs['messages'][-1]['content']}"))
+        results = llm_batch.run_batch(requests, LocalFileBatchBackend(poll_interval_s=0.01), tmp_path)
+
+    assert {custom_id: result.response for custom_id, result in results.items()} == {f"req{i}": f"Answer to Question {i}" for i in range(3)}
+    assert all(result.token_count.model == Llm.gpt_4o_mini for result in results.values())
+    requests_file = next(tmp_path.glob("batch_*[0-9a-f].jsonl"))
+    assert [json.loads(line)["custom_id"] for line in requests_file.read_text().splitlines()] == ["req0", "req1", "req2"]
+
+
+def test_parse_batch_output_handles_errors_and_discount():
+    lines = [
+        _output_line("ok", "fine"),
+        json.dumps({"custom_id": "failed", "response": None, "error": {"code": "server_error", "message": "boom"}}),
+        json.dumps({"custom_id": "rejected", "response": {"status_code": 400, "body": {"error": {"message": "bad request"}}}, "error": None}),
+    ]
+    full_price = parse_batch_output(lines[:1])[0].token_count.cost
+    results = {result.custom_id: result for result in parse_batch_output(lines, price_multiplier=0.5)}
+
+    assert results["ok"].response == "fine"
+    assert results["ok"].token_count.model == Llm.gpt_4o_mini
+    assert results["ok"].token_count.cost == pytest.approx(full_price * 0.5)
+    assert results["failed"].response is None and "boom" in results["failed"].error
+    assert results["rejected"].response is None and "bad request" in results["rejected"].error
+
+
+def test_unknown_model_fails_only_its_own_line():
+    results = {result.custom_id: result for result in parse_batch_output([
+        _output_line("ok", "fine"),
+        _output_line("unknown", "fine", model="some-new-model-2030-01-01"),
+    ])}
+
+    assert results["ok"].response == "fine"
+    assert results["unknown"].response is None and "some-new-model-2030-01-01" in results["unknown"].error
+
+
+def test_missing_and_unparseable_results_fall_back_to_sync_calls(tmp_path):
+    class StubBackend:
+        poll_interval_s = 0.0
+
+        def submit(self, requests_file):
+            return "stub"
+
+        def poll(self, batch_id):
+            return llm_batch.BatchStatus.completed
+
+        def fetch_results(self, batch_id):
+            return parse_batch_output([_output_line("good", PASSING_EVALUATION), _output_line("garbled", "not json at all")])
+
+    evaluation_requests = {key: (CONVERSATION, _proposition()) for key in ("good", "garbled", "missing")}
+    sync_result = (EvaluationResponse("sync", [1], "sync", [2]), Mock())
+    with patch.object(ConversationParsingBot, "evaluate_conversation_timestamps", return_value=sync_result) as sync_call:
+        evaluations = ConversationParsingBot.evaluate_conversation_timestamps_batch(evaluation_requests, StubBackend(), tmp_path)
+
+    assert evaluations["good"][0].consequent_times == [2]
+    assert evaluations["garbled"] is sync_result
+    assert evaluations["missing"] is sync_result
+    assert sync_call.call_count == 2
+
+
+def test_batch_results_map_back_into_reports(tmp_path):
+    ui = Mock()
+    conversation_map = {"Conversation 1": CONVERSATION, "Conversation 2": CONVERSATION}
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=_completion(PASSING_EVALUATION))
+        reports = ParallelEvalRunner._run_evaluations_batch(
+            case_idx=1,
+            total_cases=1,
+            conversation_map=conversation_map,
+            propositions=[_proposition()],
+            ui=ui,
+            test_name="batch_test",
+            npc_type="npc0",
+            convos_per_user_prompt=2,
+            eval_iterations_per_eval=2,
+            convo_length=1,
+            batch_backend=LocalFileBatchBackend(poll_interval_s=0.01),
+            batch_work_dir=tmp_path
+        )
+
+    assert len(reports) == 1
+    assert [ce.conversation_name for ce in reports[0].conversation_evaluations] == ["Conversation 1", "Conversation 2"]
+    for convo_eval in reports[0].conversation_evaluations:
+        assert [ei.result for ei in convo_eval.evaluation_iterations] == [PassFail.PASS, PassFail.PASS]
+        assert len(convo_eval.tokens) == 2
+    assert len(reports[0].tokens) == 4
+    assert ui.update_progress.call_args_list[-1].args[-1] == "saving"
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.core.Agent import Agent
+from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Llm, Role
+from src.core.ContextPacker import ContextPacker, ContextSegment
+from src.utils import token_counter
+
+
+class WordEncoding:
+    """Stands in for tiktoken (whose encodings need a download): one token per word"""
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture(autouse=True)
+def word_encoding(monkeypatch):
+    monkeypatch.setattr(token_counter, "_get_encoding", lambda encoding_name: WordEncoding())
+    token_counter._count_tokens_for_message.cache_clear()
+    yield
+    token_counter._count_tokens_for_message.cache_clear()
+
+
+def _message(role, text):
+    return ChatMessage(role=role, content=text, cot=None, off_switch=False)
+
+
+def _history(turns):
+    history = []
+    for i in range(turns):
+        history += [_message(Role.user, f"question {i}"), _message(Role.assistant, f"answer {i}")]
+    return history + [_message(Role.user, "latest question")]
+
+
+def _segments():
+    return [
+        ContextSegment(name="summary", items=["the player " * 20], header="Prior conversation summary:", truncate=True),
+        ContextSegment(name="memories", items=["best memory", "second memory", "worst memory"], header="Brain context:"),
+    ]
+
+
+def _contents(messages):
+    return [message["content"] for message in messages]
+
+
+def test_everything_is_sent_within_budget():
+    history = _history(3)
+    unpacked = Agent("You are a test agent", None)
+    unpacked.update_dynamic_context(_segments())
+    packed = Agent("You are a test agent", None, context_packer=ContextPacker(token_budget=10_000))
+    packed.update_dynamic_context(_segments())
+
+    assert packed._build_llm_messages(history, Llm.gpt_4o_mini) == unpacked._build_llm_messages(history, Llm.gpt_4o_mini)
+
+
+def test_lower_priority_parts_are_dropped_first():
+    agent = Agent("You are a test agent", None, context_packer=ContextPacker(token_budget=75))
+    agent.update_dynamic_context(_segments())
+    messages = agent._build_llm_messages(_history(10), Llm.gpt_4o_mini)
+
+    # The system prompt and the latest message are always sent, with the dynamic context just before the latest message
+    assert messages[0]["content"].startswith("You are a test agent")
+    assert messages[-1]["content"] == "latest question"
+    dynamic_context = messages[-2]["content"]
+    assert "the player " * 20 in dynamic_context
+    assert "best memory" in dynamic_context and "second memory" not in dynamic_context
+    assert _contents(messages[1:-2]) == []
+    assert token_counter.count_tokens_for_messages(messages, Llm.gpt_4o_mini) <= 75
+
+
+def test_only_the_most_recent_turns_are_kept():
+    agent = Agent("You are a test agent", None, context_packer=ContextPacker(token_budget=32))
+    messages = agent._build_llm_messages(_history(10), Llm.gpt_4o_mini)
+
+    assert _contents(messages[1:]) == ["question 9", "answer 9", "latest question"]
+    assert token_counter.count_tokens_for_messages(messages, Llm.gpt_4o_mini) <= 32
+
+
+def test_long_summary_is_truncated_to_fit():
+    agent = Agent("You are a test agent", None, context_packer=ContextPacker(token_budget=40))
+    agent.update_dynamic_context(_segments())
+    messages = agent._build_llm_messages(_history(2), Llm.gpt_4o_mini)
+
+    assert _contents(messages[1:-2]) == []
+    dynamic_context = messages[-2]["content"]
+    assert dynamic_context.startswith("Prior conversation summary:\nthe player")
+    assert dynamic_context.endswith("...")
+    assert "Brain context:" not in dynamic_context
+    assert token_counter.count_tokens_for_messages(messages, Llm.gpt_4o_mini) <= 40
+
+
+def test_default_budget_depends_on_the_model():
+    packer = ContextPacker()
+    assert packer.get_token_budget(Llm.llama3) < packer.get_token_budget(Llm.gpt_4o_mini)
+    assert ContextPacker(token_budget=500).get_token_budget(Llm.llama3) == 500
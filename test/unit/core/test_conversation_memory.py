@@ -0,0 +1,121 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.core.Constants import Llm, Role
+from src.core.ConversationMemory import ConversationMemory
+from src.core.ResponseTypes import ChatSummary
+from src.utils.ChatBot import ChatBot
+
+SUMMARY = ChatSummary(conversation_overview="overview", hidden_thought_processes="", chronology="", standout_quotes="", most_recent="")
+
+
+@pytest.fixture
+def memory():
+    app_settings = SimpleNamespace(model=Llm.gpt_4o, summarizer_model=None, max_convo_mem_length=4, num_last_messages_to_retain_when_summarizing=2)
+    with patch("src.core.proj_settings.get_settings", return_value=SimpleNamespace(app_settings=app_settings)):
+        memory = ConversationMemory.from_new("Summarize the conversation")
+    for i in range(5):
+        memory.append_chat(f"message {i}", role=Role.user if i % 2 == 0 else Role.assistant)
+    return memory
+
+
+def test_summarization_runs_in_background_and_swaps_in_when_ready(memory):
+    release = threading.Event()
+
+    def summarize(*args, **kwargs):
+        assert release.wait(timeout=2)
+        return SUMMARY, None
+
+    with patch.object(ChatBot, "call_llm", side_effect=summarize):
+        memory.maintain()
+        # The conversation goes on with the old (empty) summary and the full history
+        memory.append_chat("message 5", role=Role.assistant)
+        memory.maintain()  # No second summarization while one is in flight
+        assert memory.conversation_summary is None
+        assert memory.get_chat_memory_length() == 6
+
+        release.set()
+        memory.wait_for_summarization()
+
+    assert memory.conversation_summary == SUMMARY
+    # Only the summarized messages are trimmed: the 2 retained ones and the one added meanwhile stay
+    assert [message.content for message in memory.chat_memory] == ["message 3", "message 4", "message 5"]
+
+
+def test_summary_is_discarded_if_history_was_replaced(memory):
+    with patch.object(ChatBot, "call_llm", return_value=(SUMMARY, None)):
+        memory.maintain()
+        memory.chat_memory = []
+        memory.wait_for_summarization()
+
+    assert memory.conversation_summary is None
+    assert memory.chat_memory == []
+
+
+def test_synchronous_summarization_is_still_available(memory):
+    memory.background_summarization = False
+    with patch.object(ChatBot, "call_llm", return_value=(SUMMARY, None)):
+        memory.maintain()
+
+    assert memory.conversation_summary == SUMMARY
+    assert [message.content for message in memory.chat_memory] == ["message 3", "message 4"]
+
+
+
+def test_each_chunk_is_summarized_once_and_full_levels_are_merged(memory):
+    memory.background_summarization = False
+    memory.summaries_per_level = 2
+    requests = []
+
+    def summarize(messages, *args, **kwargs):
+        requests.append(messages[-1]["content"])
+        return ChatSummary(conversation_overview=f"summary {len(requests)}", hidden_thought_processes="", chronology="", standout_quotes="", most_recent=""), None
+
+    with patch.object(ChatBot, "call_llm", side_effect=summarize):
+        for turn in range(3):
+            memory.maintain()
+            for i in range(3):
+                memory.append_chat(f"turn {turn} message {i}", role=Role.user)
+
+    # Each request only holds the messages being trimmed: no retained messages and no earlier summary
+    assert "message 2" in requests[0] and "message 3" not in requests[0]
+    assert "Previous Conversation Summary" not in requests[1]
+    assert "message 2" not in requests[1] and "turn 0 message 1" not in requests[1]
+    # The second chunk summary filled level 1, so both were merged into one level 2 summary
+    assert "summary 1" in requests[2] and "summary 2" in requests[2]
+    assert [[summary.conversation_overview for summary in level] for level in memory.summary_levels] == [["summary 4"], ["summary 3"]]
+    assert memory.conversation_summary.conversation_overview == "summary 4"
+    # Oldest (coarsest) first
+    summary_string = memory.get_chat_summary_as_string()
+    assert summary_string.index("summary 3") < summary_string.index("summary 4")
+
+
+def test_only_new_messages_are_rendered(memory):
+    from src.utils import llm_utils
+    with patch("src.utils.llm_utils.Utilities.decode", side_effect=lambda text: text.replace("\u00e9", "e")) as decode:
+        memory.append_chat("caf\u00e9", role=Role.assistant)
+        llm_utils.convert_message_history_to_llm_format(memory.chat_memory)
+        # The earlier (ASCII) messages need no decoding, and the new one is decoded once
+        assert decode.call_count == 1
+        llm_utils.convert_message_history_to_llm_format(memory.chat_memory)
+        assert decode.call_count == 1
+        assert memory.get_chat_memory_as_string().endswith("user: message 4\nassistant: cafe\n")
+        assert decode.call_count == 1
+
+
+def test_editing_a_message_clears_its_rendering(memory):
+    from src.utils import llm_utils
+    message = memory.chat_memory[0]
+    assert llm_utils.render_message(message, None)["content"] == "message 0"
+    message.content = "edited"
+    assert llm_utils.render_message(message, None)["content"] == "edited"
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.core.Agent import Agent
+from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Llm, Role
+from src.core.HistoryPolicy import CotHistoryPolicy
+from src.utils import llm_utils, token_counter
+from src.utils.ChatBot import ChatBot
+
+
+class WordEncoding:
+    """Stands in for tiktoken (whose encodings need a download): one token per word"""
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture(autouse=True)
+def word_encoding(monkeypatch):
+    monkeypatch.setattr(token_counter, "_get_encoding", lambda encoding_name: WordEncoding())
+    token_counter._count_tokens_for_message.cache_clear()
+    yield
+    token_counter._count_tokens_for_message.cache_clear()
+
+
+def _history(turns):
+    history = []
+    for i in range(turns):
+        history.append(ChatMessage(role=Role.user, content=f"question {i}", cot=None, off_switch=False))
+        history.append(ChatMessage(role=Role.assistant, content=f"answer {i}", cot=f"Thought {i} in detail. Then some more about it.", off_switch=False))
+    return history
+
+
+def _thoughts(messages):
+    return [message["content"].split('"hidden_thought_process": "')[1].split('"')[0] for message in messages if message["role"] == "assistant"]
+
+
+def test_only_the_last_cots_are_kept_in_full():
+    messages = llm_utils.convert_message_history_to_llm_format(_history(3), cot_policy=CotHistoryPolicy(keep_last_n=1))
+    assert _thoughts(messages) == ["", "", "Thought 2 in detail. Then some more about it."]
+
+    messages = llm_utils.convert_message_history_to_llm_format(_history(3), cot_policy=CotHistoryPolicy(keep_last_n=1, digest_chars=12))
+    assert _thoughts(messages) == ["Thought 0 in...", "Thought 1 in...", "Thought 2 in detail. Then some more about it."]
+
+    messages = llm_utils.convert_message_history_to_llm_format(_history(3), cot_policy=CotHistoryPolicy(keep_last_n=1, digest_chars=100))
+    assert _thoughts(messages)[0] == "Thought 0 in detail."
+
+
+def test_token_savings_are_reported_per_call():
+    agent = Agent("You are a test agent", None, llm_model=Llm.gpt_4o_mini, cot_history_policy=CotHistoryPolicy(keep_last_n=1))
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Hi"))], usage=None)
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=completion)
+        agent.chat_with_history(_history(3))
+
+    # Two dropped thoughts of 9 words each
+    assert agent.last_token_count.cot_tokens_saved == 2 * 9
+    sent_thoughts = _thoughts(client.chat.completions.create.call_args.kwargs["messages"])
+    assert sent_thoughts == ["", "", "Thought 2 in detail. Then some more about it."]
@@ -0,0 +1,88 @@
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.core.Agent import Agent
+from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Llm, Role
+from src.core.ModelPolicy import EscalateOnParseFailure, FixedModel, LowestLatency, ModelPolicy
+from src.core.ResponseTypes import ChatResponse
+from src.utils.ChatBot import ChatBot
+from src.utils.hedging import LatencyTracker
+
+VALID_RESPONSE = json.dumps({"hidden_thought_process": "thinking", "response": "Hello!", "off_switch": False})
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+    monkeypatch.setattr(ChatBot, "latencies", LatencyTracker(min_samples=2))
+
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _message(text="Hi"):
+    return [ChatMessage(role=Role.user, content=text, cot=None, off_switch=False)]
+
+
+def test_escalates_to_strong_model_after_parse_failure():
+    agent = Agent("You are a test agent", ChatResponse, model_policy=EscalateOnParseFailure(Llm.gpt_5_nano, Llm.gpt_4o))
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=[_completion("Sorry, I can't do that."), _completion(VALID_RESPONSE)])
+        response = agent.chat_with_history(_message())
+
+    assert response.response == "Hello!"
+    assert [call.kwargs["model"] for call in client.chat.completions.create.call_args_list] == ["gpt-5-nano", "gpt-4o"]
+    assert agent.last_token_count.model == Llm.gpt_4o
+
+
+def test_agents_use_their_own_models_concurrently():
+    default_model = ChatBot.default_chat_model
+    agents = [Agent("You are a test agent", None, llm_model=model) for model in (Llm.gpt_4o, Llm.gpt_5_nano)] * 4
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=lambda **kwargs: _completion(kwargs["model"]))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda args: args[1].chat_with_history(_message(f"Hi {args[0]}")), enumerate(agents)))
+
+    assert responses == ["gpt-4o", "gpt-5-nano"] * 4
+    assert ChatBot.default_chat_model == default_model
+
+
+def test_fixed_model_without_model_follows_default(monkeypatch):
+    monkeypatch.setattr(ChatBot, "default_chat_model", Llm.gpt_4o)
+    assert FixedModel().select_model() == Llm.gpt_4o
+
+
+def test_lowest_latency_measures_every_candidate_then_picks_fastest():
+    policy = LowestLatency(candidates=[Llm.gpt_4o, Llm.gpt_4o_mini])
+    assert policy.select_model() == Llm.gpt_4o
+
+    for latency in (2.0, 2.5):
+        ChatBot.latencies.record(Llm.gpt_4o, latency)
+    assert policy.select_model() == Llm.gpt_4o_mini
+
+    for latency in (0.5, 0.7):
+        ChatBot.latencies.record(Llm.gpt_4o_mini, latency)
+    assert policy.select_model() == Llm.gpt_4o_mini
+
+
+def test_policies_must_implement_select_model():
+    class NoModel(ModelPolicy):
+        pass
+
+    with pytest.raises(TypeError):
+        NoModel()
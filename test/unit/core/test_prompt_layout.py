@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.core.Agent import Agent
+from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Llm, Role
+from src.core.TokenTracking import TokenCount
+from src.utils.ChatBot import ChatBot
+from src.utils import llm_utils
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 1000)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+
+
+def _message(role, text):
+    return ChatMessage(role=role, content=text, cot=None, off_switch=False)
+
+
+def test_dynamic_context_goes_after_the_stable_prefix():
+    agent = Agent("You are a test agent", None)
+    history = [_message(Role.user, "Hi"), _message(Role.assistant, "Hello"), _message(Role.user, "How are you?")]
+
+    agent.update_dynamic_context("Brain context: memory A")
+    first_turn = agent._build_llm_messages(history)
+    agent.update_dynamic_context("Brain context: memory B")
+    second_turn = agent._build_llm_messages(history + [_message(Role.assistant, "Good"), _message(Role.user, "Great")])
+
+    assert first_turn[-2] == {"role": "system", "content": "Brain context: memory A"}
+    assert second_turn[-2] == {"role": "system", "content": "Brain context: memory B"}
+    # Everything before the dynamic context is byte-identical between turns
+    assert second_turn[:len(first_turn) - 2] == first_turn[:-2]
+
+
+def test_wrapping_the_latest_user_message_leaves_its_rendering_untouched():
+    agent = Agent("You are a test agent", None)
+    agent.user_prompt_wrapper = "Reply to: $USER_MESSAGE$"
+    history = [_message(Role.user, "Hi")]
+
+    assert agent._build_llm_messages(history)[-1]["content"] == "Reply to: Hi"
+    assert agent._build_llm_messages(history)[-1]["content"] == "Reply to: Hi"
+    assert history[0].content == "Hi"
+    assert llm_utils.render_message(history[0], None) == {"role": "user", "content": "Hi"}
+
+
+def test_cached_input_tokens_are_reported_and_discounted():
+    usage = SimpleNamespace(prompt_tokens_details=SimpleNamespace(cached_tokens=800))
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))], usage=usage)
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=completion)
+        _, token_count = ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+
+    assert token_count.cached_input_tokens == 800
+    assert token_count.cost < TokenCount.create(Llm.gpt_4o_mini, 1000, 5).cost
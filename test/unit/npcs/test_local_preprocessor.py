@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.npcs.npc2.local_preprocessor import SMALL_TALK_PATTERN, LocalPreprocessClassifier
+
+EXAMPLES = {"no_information": ["how are you?"], "information": ["my name is Sam"]}
+EMBEDDINGS = {
+    "how are you?": [1.0, 0.0],
+    "my name is Sam": [0.0, 1.0],
+    "how are you doing?": [0.95, 0.1],
+    "my name is Alex": [0.1, 0.95],
+    "what now?": [0.6, 0.6],
+}
+
+
+@pytest.fixture
+def classifier():
+    embedded = []
+
+    def embed(text):
+        embedded.append(text)
+        return EMBEDDINGS[text]
+
+    classifier = LocalPreprocessClassifier(embed, EXAMPLES, similarity_threshold=0.9)
+    classifier.embedded = embedded
+    return classifier
+
+
+def test_rules_decide_without_embeddings(classifier):
+    assert classifier.classify("lol").reason == "small_talk"
+    assert classifier.classify("Ok!").skip_llm
+    assert classifier.classify("did she say that?").reason == "pronouns"
+    assert not classifier.classify("what did he do").skip_llm
+    assert classifier.embedded == []
+
+
+def test_answers_to_a_question_go_to_the_llm(classifier):
+    # "yes" after "Do you have a sister?" is a fact to remember, so bare yes/no answers are never small talk
+    assert not any(SMALL_TALK_PATTERN.match(answer) for answer in ["yes", "yeah", "yep", "no", "nope", "sure"])
+    assert classifier.classify("ok", last_response="Do you have a sister?").reason == "answers_question"
+    assert classifier.classify("ok", last_response="Nice to meet you.").reason == "small_talk"
+    assert classifier.embedded == []
+
+
+def test_only_close_no_information_examples_skip_the_llm(classifier):
+    assert classifier.classify("how are you doing?").reason == "similar_example"
+    assert classifier.classify("my name is Alex").reason == "uncertain"
+    assert classifier.classify("what now?").reason == "uncertain"
+    # Examples are embedded once
+    assert classifier.embedded.count("how are you?") == 1
+    assert classifier.get_stats()["skip_rate"] == pytest.approx(1 / 3)
+
+
+def test_shadow_results_count_disagreements_and_missed_skips(classifier):
+    classifier.record_shadow_result(classifier.classify("ok"), has_information=True, needs_clarification=False)
+    classifier.record_shadow_result(classifier.classify("what now?"), has_information=False, needs_clarification=False)
+    classifier.record_shadow_result(classifier.classify("how are you doing?"), has_information=False, needs_clarification=False)
+
+    stats = classifier.get_stats()
+    assert (stats["shadow_compared"], stats["disagreements"], stats["missed_skips"]) == (3, 1, 1)
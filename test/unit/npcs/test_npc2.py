@@ -1,6 +1,7 @@
 import pytest
 import os
 import tempfile
+import threading
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 from typing import List
@@ -13,11 +14,16 @@ if str(PROJ_ROOT) not in sys.path:
 
 from src.npcs.npc2.npc2 import NPC2, NPCTemplate, PreprocessedUserInput
 from src.core.ResponseTypes import ChatResponse
+from src.core.ContextPacker import render_segments
 from src.core.schemas.CollectionSchemas import Entity
 from src.core.Constants import Role
 from src.utils.embedding_cache import EmbeddingCache
 
 
+def _entities(*contents) -> List[Entity]:
+    return [Entity(key=content, content=content, tags=["memories"]) for content in contents]
+
+
 @pytest.fixture(autouse=True)
 def mock_vector_embeddings(monkeypatch):
     """Avoid real embedding calls; return fixed-size embeddings."""
@@ -25,6 +31,7 @@ def mock_vector_embeddings(monkeypatch):
     def fake_embed(text, model=None, dimensions=None):
         return [0.0] * 1536
     monkeypatch.setattr(VectorUtils, "get_embedding", fake_embed, raising=True)
+    monkeypatch.setattr(VectorUtils, "get_embeddings", lambda texts, model=None, dimensions=None: [fake_embed(text) for text in texts], raising=True)
 
 
 @pytest.fixture
@@ -294,28 +301,30 @@ class TestNPCSystemPrompt:
         npc_instance.conversation_memory.append_chat("Hello", role=Role.user)
         
         # Make get_memories return at least one item so brain context is included
-        with patch.object(npc_instance.brain_memory, 'get_memories', return_value="brain_content"):
+        with patch.object(npc_instance.brain_memory, 'get_memories', return_value=_entities("brain_content")):
             prompt = npc_instance._build_system_prompt()
+            dynamic_context = npc_instance._build_dynamic_context()
         
         assert "You are a helpful test assistant." in prompt
-        assert "Prior conversation summary:" in prompt
-        assert "Brain context:" in prompt
-        assert "brain_content" in prompt
-        # Ensure update_system_prompt later receives the built prompt
-        npc_instance.response_agent.update_system_prompt(prompt)
-        npc_instance.response_agent.update_system_prompt.assert_called_with(prompt)
+        assert "Prior conversation summary:" in dynamic_context
+        assert "Brain context:" in dynamic_context
+        assert "brain_content" in dynamic_context
+        # Per-turn content stays out of the system prompt so it is identical between turns
+        assert "brain_content" not in prompt
+        npc_instance._start_turn()
+        with patch.object(npc_instance.brain_memory, 'get_memories', return_value=_entities("other_content")):
+            assert npc_instance._build_system_prompt() == prompt
     
-    def test_build_system_prompt_without_conversation_summary(self, npc_instance):
-        """Test system prompt without conversation summary"""
-        prompt = npc_instance._build_system_prompt(include_conversation_summary=False)
-        assert "You are a helpful test assistant." in prompt
-        assert "Prior conversation summary:" not in prompt
+    def test_build_dynamic_context_without_conversation_summary(self, npc_instance):
+        """Test dynamic context without conversation summary"""
+        context = npc_instance._build_dynamic_context(include_conversation_summary=False)
+        assert "Prior conversation summary:" not in context
     
-    def test_build_system_prompt_without_brain_context(self, npc_instance):
-        """Test system prompt without brain context"""
-        prompt = npc_instance._build_system_prompt(include_brain_context=False)
-        assert "You are a helpful test assistant." in prompt
-        assert "Brain context:" not in prompt
+    def test_build_dynamic_context_without_brain_context(self, npc_instance):
+        """Test dynamic context without brain context"""
+        context = npc_instance._build_dynamic_context(include_brain_context=False)
+        assert "Prior conversation summary:" in context
+        assert "Brain context:" not in context
 
 
 class TestNPCBrainMemory:
@@ -326,6 +335,7 @@ class TestNPCBrainMemory:
         # Reset call count after initialization
         mock_qdrant.insert_dataclasses.reset_mock()
         npc_instance.brain_memory.add_memory("Test memory content")
+        npc_instance.brain_memory.flush()
         mock_qdrant.insert_dataclasses.assert_called_once()
     
     def test_get_memories(self, npc_instance, mock_qdrant):
@@ -383,12 +393,32 @@ class TestNPCBrainMemory:
         npc_instance.conversation_memory.append_chat("test message", role=Role.user)
         
         # Mock brain memory to return specific memories
-        with patch.object(npc_instance.brain_memory, 'get_memories', return_value="content1\ncontent2"):
-            context = npc_instance._build_system_prompt(include_conversation_summary=False, include_brain_context=True)
+        with patch.object(npc_instance.brain_memory, 'get_memories', return_value=_entities("content1", "content2")):
+            context = npc_instance._build_dynamic_context(include_conversation_summary=False, include_brain_context=True)
             assert "content1" in context
             assert "content2" in context
 
 
+    def test_one_search_per_turn_serves_preprocessor_and_response(self, npc_instance, mock_agent):
+        """The preprocessor's top 3 are sliced from the response's top 5 search"""
+        npc_instance.preprocessor_agent.chat_with_history.return_value = PreprocessedUserInput(
+            text="processed text", has_information=False, ambiguous_pronouns="", needs_clarification=False
+        )
+        npc_instance.response_agent.chat_with_history.return_value = ChatResponse(hidden_thought_process=None, response="AI response", off_switch=False)
+        with patch.object(npc_instance.brain_memory, 'get_memories', return_value=_entities("m1", "m2", "m3", "m4", "m5")) as get_memories:
+            npc_instance.chat("Hello")
+            npc_instance.chat("Hello")
+
+        # One search per turn, even though the same text comes back in the next turn
+        assert get_memories.call_count == 2
+        get_memories.assert_called_with("Hello", topk=5)
+        assert npc_instance.preprocessor_agent.update_dynamic_context.call_args.args[0] == "Context:\nm1\nm2\nm3"
+        assert "m5" in render_segments(npc_instance.response_agent.update_dynamic_context.call_args.args[0])
+        trace = npc_instance.last_turn_trace
+        assert [(retrieval.topk, retrieval.cache_hit) for retrieval in trace.retrievals] == [(3, False), (5, True)]
+        assert trace.get_vector_search_count() == 1
+
+
 class TestNPCBrainMemoryAPI:
     """Test NPC brain memory API methods"""
     
@@ -454,7 +484,7 @@ class TestNPCPreprocessing:
         # Add some chat history
         npc_instance.conversation_memory.append_chat("Hello", role=Role.user)
         
-        result = npc_instance._preprocess_input(npc_instance.conversation_memory.chat_memory)
+        result = npc_instance._preprocess_input("Hello")
         assert result.text == "processed text"
         assert result.has_information is True
         assert result.needs_clarification is False
@@ -558,6 +588,154 @@ class TestNPCChatFunctionality:
         assert len(npc_instance.conversation_memory.chat_memory) == 2  # user + assistant
 
 
+class TestNPCPipelinedChat:
+    """Test the pipelined turn (parallel retrieval, background memory writes, speculative response)"""
+
+    @staticmethod
+    def _preprocessed(has_information=False, needs_clarification=False):
+        return PreprocessedUserInput(text="processed text", has_information=has_information, ambiguous_pronouns="", needs_clarification=needs_clarification)
+
+    def test_retrieval_overlaps_preprocessing_and_memory_is_written_in_background(self, npc_instance):
+        npc_instance.parallel_pipeline = True
+        retrieval_started = threading.Event()
+        write_done = threading.Event()
+
+        def get_memories(text, topk=5, as_str=False):
+            retrieval_started.set()
+            return _entities("brain_content")
+
+        def preprocess(history):
+            # Only returns if retrieval runs at the same time
+            assert retrieval_started.wait(timeout=2)
+            return self._preprocessed(has_information=True)
+
+        npc_instance.preprocessor_agent.chat_with_history.side_effect = preprocess
+        npc_instance.response_agent.chat_with_history.return_value = ChatResponse(hidden_thought_process=None, response="AI response", off_switch=False)
+        with patch.object(npc_instance.brain_memory, 'get_memories', side_effect=get_memories), \
+             patch.object(npc_instance.brain_memory, 'add_memory', side_effect=lambda preprocessed_user_text: write_done.set()) as add_memory:
+            response = npc_instance.chat("Hello")
+            npc_instance.maintain()
+
+        assert response.response == "AI response"
+        assert write_done.is_set()
+        add_memory.assert_called_once_with(preprocessed_user_text="processed text")
+        npc_instance.preprocessor_agent.update_dynamic_context.assert_called_with(None)
+        assert "brain_content" in render_segments(npc_instance.response_agent.update_dynamic_context.call_args.args[0])
+        assert len(npc_instance.conversation_memory.chat_memory) == 2  # user + assistant
+
+    def test_speculative_response_runs_alongside_preprocessing(self, npc_instance):
+        npc_instance.parallel_pipeline = True
+        npc_instance.speculative_response = True
+        response_started = threading.Event()
+
+        def respond(history):
+            response_started.set()
+            return ChatResponse(hidden_thought_process=None, response="speculative response", off_switch=False)
+
+        def preprocess(history):
+            assert response_started.wait(timeout=2)
+            return self._preprocessed()
+
+        npc_instance.preprocessor_agent.chat_with_history.side_effect = preprocess
+        npc_instance.response_agent.chat_with_history.side_effect = respond
+        response = npc_instance.chat("Hello")
+
+        assert response.response == "speculative response"
+        assert npc_instance.conversation_memory.chat_memory[-1].content == "speculative response"
+
+    def test_speculative_response_is_discarded_when_clarification_is_needed(self, npc_instance):
+        npc_instance.parallel_pipeline = True
+        npc_instance.speculative_response = True
+        npc_instance.preprocessor_agent.chat_with_history.return_value = self._preprocessed(needs_clarification=True)
+        npc_instance.response_agent.chat_with_history.return_value = ChatResponse(hidden_thought_process=None, response="speculative response", off_switch=False)
+
+        response = npc_instance.chat("Hello")
+
+        assert "clarification" in response.response.lower()
+        assert [message.content for message in npc_instance.conversation_memory.chat_memory] == ["Hello", response.response]
+
+    def test_discarded_speculative_response_leaves_the_response_agent_alone(self, npc_instance):
+        npc_instance.parallel_pipeline = True
+        npc_instance.speculative_response = True
+        response_started = threading.Event()
+        response_done = threading.Event()
+
+        class FakeAgent:
+            system_prompt = None
+            dynamic_context = None
+
+            def update_system_prompt(self, system_prompt):
+                self.system_prompt = system_prompt
+
+            def update_dynamic_context(self, dynamic_context):
+                self.dynamic_context = dynamic_context
+
+            def chat_with_history(self, history):
+                response_started.set()
+                response_done.set()
+                return ChatResponse(hidden_thought_process=None, response="speculative response", off_switch=False)
+
+        def preprocess(history):
+            # Only asks for clarification once the speculative response is running, so it can't be cancelled
+            assert response_started.wait(timeout=2)
+            return self._preprocessed(needs_clarification=True)
+
+        response_agent = FakeAgent()
+        npc_instance.response_agent = response_agent
+        npc_instance.preprocessor_agent.chat_with_history.side_effect = preprocess
+        npc_instance.chat("Hello")
+        assert response_done.wait(timeout=2)
+
+        assert npc_instance.response_agent is response_agent
+        assert response_agent.system_prompt is None
+        assert response_agent.dynamic_context is None
+
+
+class TestNPCLocalPreprocessor:
+    """Test the local fast path that skips the preprocessor LLM call"""
+
+    def test_trivial_message_skips_preprocessor_llm(self, npc_instance):
+        with patch.object(NPC2, '_load_global_config', return_value={"local_preprocess_examples": {"no_information": []}}):
+            npc_instance.enable_local_preprocessor()
+        npc_instance.response_agent.chat_with_history.return_value = ChatResponse(hidden_thought_process=None, response="AI response", off_switch=False)
+
+        response = npc_instance.chat("lol")
+
+        assert response.response == "AI response"
+        npc_instance.preprocessor_agent.chat_with_history.assert_not_called()
+        assert npc_instance.last_turn_trace.preprocess_source == "local"
+        assert npc_instance.last_turn_trace.local_preprocess_reason == "small_talk"
+
+    def test_reply_to_a_question_goes_to_the_preprocessor_llm(self, npc_instance):
+        with patch.object(NPC2, '_load_global_config', return_value={"local_preprocess_examples": {"no_information": []}}):
+            npc_instance.enable_local_preprocessor()
+        npc_instance.conversation_memory.append_chat("Do you like tea?", role=Role.assistant)
+        npc_instance.preprocessor_agent.chat_with_history.return_value = PreprocessedUserInput(
+            text="The user likes tea", has_information=True, ambiguous_pronouns="", needs_clarification=False
+        )
+        npc_instance.response_agent.chat_with_history.return_value = ChatResponse(hidden_thought_process=None, response="AI response", off_switch=False)
+
+        npc_instance.chat("ok")
+
+        npc_instance.preprocessor_agent.chat_with_history.assert_called_once()
+        assert npc_instance.last_turn_trace.local_preprocess_reason == "answers_question"
+
+    def test_shadow_mode_still_calls_the_llm_and_records_disagreement(self, npc_instance):
+        with patch.object(NPC2, '_load_global_config', return_value={"local_preprocess_examples": {"no_information": []}}):
+            npc_instance.enable_local_preprocessor(shadow=True)
+        npc_instance.preprocessor_agent.chat_with_history.return_value = PreprocessedUserInput(
+            text="The user is ok", has_information=True, ambiguous_pronouns="", needs_clarification=False
+        )
+        npc_instance.response_agent.chat_with_history.return_value = ChatResponse(hidden_thought_process=None, response="AI response", off_switch=False)
+
+        npc_instance.chat("ok")
+
+        npc_instance.preprocessor_agent.chat_with_history.assert_called_once()
+        assert npc_instance.last_turn_trace.preprocess_source == "llm"
+        stats = npc_instance.local_preprocessor.get_stats()
+        assert (stats["skipped"], stats["shadow_compared"], stats["disagreements"]) == (1, 1, 1)
+
+
 class TestNPCSaveFeature:
     """Test NPC save feature with save_enabled flag"""
     
@@ -710,3 +888,44 @@ closing_enabled: true
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+class TestNPCEpisodicMemory:
+    """Test recalling past exchanges once they have left the conversation memory"""
+
+    def test_trimmed_exchanges_are_recalled_verbatim(self, npc_instance, mock_qdrant):
+        mock_qdrant.get_embeddings.side_effect = lambda texts: [[1.0, 0.0] if "dog" in text else [0.0, 1.0] for text in texts]
+        npc_instance.enable_episodic_memory(topk=1)
+        npc_instance.preprocessor_agent.chat_with_history.return_value = PreprocessedUserInput(
+            text="processed text", has_information=False, ambiguous_pronouns="", needs_clarification=False
+        )
+        npc_instance.response_agent.chat_with_history.return_value = ChatResponse(hidden_thought_process=None, response="Noted!", off_switch=False)
+
+        npc_instance.chat("My dog is called Rex")
+        npc_instance.chat("I like green tea")
+        assert [episode.turn for episode in npc_instance.episodic_memory.episodes] == [0, 1]
+        # Still in the conversation memory, so not recalled
+        assert "Relevant past exchanges:" not in render_segments(npc_instance.response_agent.update_dynamic_context.call_args.args[0])
+
+        npc_instance.conversation_memory.chat_memory.clear()  # As if summarized away
+        npc_instance.chat("What is my dog called?")
+
+        dynamic_context = render_segments(npc_instance.response_agent.update_dynamic_context.call_args.args[0])
+        assert "Relevant past exchanges:\nuser: My dog is called Rex\nassistant: Noted!" in dynamic_context
+        assert "green tea" not in dynamic_context
+
+    def test_saved_episodes_survive_a_session_without_episodic_memory(self, npc_instance, mock_io_utils):
+        from src.npcs.npc2.npc2 import NPCState
+        from src.brain.episodic_memory import Episode
+        from src.core.ChatMessage import ChatMessage
+        episode = Episode(turn=0, messages=[ChatMessage(role=Role.user, content="My dog is called Rex", cot=None, off_switch=False)])
+        saves = [NPCState(conversation_memory=Mock(), user_prompt_wrapper="Test wrapper", episodes=[episode])]
+        mock_io_utils.load_yaml_into_dataclass.side_effect = lambda path, data_type: saves[-1]
+        mock_io_utils.save_to_yaml_file.side_effect = lambda state, path: saves.append(state)
+
+        npc_instance._load_state()
+        npc_instance._save_state()
+        npc_instance._load_state()
+
+        assert saves[-1].episodes == [episode]
+        assert npc_instance._saved_episodes == [episode]
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils.ChatBot import ChatBot
+from src.core.Agent import Agent
+from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Llm, Role
+from src.core.ResponseTypes import ChatResponse
+
+
+CHAT_RESPONSE_JSON = '{"hidden_thought_process": "calm", "response": "Hello there", "off_switch": false}'
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    """Avoid tiktoken encoding downloads; count whitespace-separated words instead."""
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: sum(len(m["content"].split()) + 3 for m in messages) + 3)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: len(text.split()))
+
+
+@pytest.fixture
+def mock_async_openai():
+    with patch.object(ChatBot, "chatGptAsyncClient") as client:
+        client.chat.completions.create = AsyncMock(return_value=_completion(CHAT_RESPONSE_JSON))
+        yield client
+
+
+@pytest.fixture
+def mock_openai():
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=_completion(CHAT_RESPONSE_JSON))
+        yield client
+
+
+class TestAsyncCallPath:
+    def test_call_llm_async_parses_response_type(self, mock_async_openai):
+        messages = [{"role": "user", "content": "Hi"}]
+        response, token_count = asyncio.run(ChatBot.call_llm_async(messages, ChatResponse, Llm.gpt_4o_mini))
+
+        assert isinstance(response, ChatResponse)
+        assert response.response == "Hello there"
+        assert token_count.model == Llm.gpt_4o_mini
+        assert token_count.input_tokens > 0
+        mock_async_openai.chat.completions.create.assert_awaited_once()
+
+    def test_call_llm_async_retries_on_malformed_response(self, mock_async_openai):
+        mock_async_openai.chat.completions.create = AsyncMock(side_effect=[
+            _completion("not json at all"),
+            _completion(CHAT_RESPONSE_JSON),
+        ])
+        messages = [{"role": "user", "content": "Hi"}]
+        response, _ = asyncio.run(ChatBot.call_llm_async(messages, ChatResponse, Llm.gpt_4o_mini))
+
+        assert response.response == "Hello there"
+        assert mock_async_openai.chat.completions.create.await_count == 2
+
+    def test_agent_sync_and_async_send_same_messages(self, mock_openai, mock_async_openai):
+        agent = Agent(system_prompt="You are a test assistant.", response_type=ChatResponse)
+        history = [ChatMessage(role=Role.user, content="Hi", cot=None, off_switch=False)]
+
+        sync_response = agent.chat_with_history(history)
+        async_response = asyncio.run(agent.achat_with_history(history))
+
+        assert sync_response == async_response
+        sync_messages = mock_openai.chat.completions.create.call_args.kwargs["messages"]
+        async_messages = mock_async_openai.chat.completions.create.call_args.kwargs["messages"]
+        assert sync_messages == async_messages
+        assert agent.last_token_count is not None
+
+    def test_many_async_calls_share_one_event_loop(self, mock_async_openai):
+        # Distinct messages, since identical concurrent requests are coalesced into one call
+        async def run_all():
+            return await asyncio.gather(*[ChatBot.call_llm_async([{"role": "user", "content": f"Hi {i}"}], ChatResponse, Llm.gpt_4o_mini) for i in range(50)])
+
+        results = asyncio.run(run_all())
+        assert len(results) == 50
+        assert mock_async_openai.chat.completions.create.await_count == 50
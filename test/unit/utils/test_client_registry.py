@@ -0,0 +1,61 @@
+import asyncio
+import sys
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils import client_registry
+from src.utils.client_registry import HttpPoolSettings
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(client_registry, "_settings", None)
+    monkeypatch.setattr(client_registry, "_clients", {})
+    monkeypatch.setattr(client_registry, "_async_clients", weakref.WeakKeyDictionary())
+    yield
+
+
+def test_clients_are_shared_across_threads(fresh_registry):
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        clients = list(executor.map(lambda _: client_registry.get_openai_client(), range(64)))
+    assert all(client is clients[0] for client in clients)
+
+
+def test_pool_settings_come_from_environment(fresh_registry, monkeypatch):
+    monkeypatch.setenv("HTTP_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("HTTP_READ_TIMEOUT_S", "3")
+    client = client_registry.get_openai_client()
+
+    assert client._client._transport._pool._max_connections == 7
+    assert client.timeout.read == 3.0
+
+
+def test_configure_applies_to_clients_created_afterwards(fresh_registry):
+    client_registry.configure(HttpPoolSettings(max_connections=5, max_keepalive_connections=2))
+    first = client_registry.get_ollama_client()
+    assert first._client._transport._pool._max_connections == 5
+
+    client_registry.reset()
+    assert client_registry.get_ollama_client() is not first
+
+
+def test_async_clients_are_shared_per_event_loop(fresh_registry):
+    async def get_clients():
+        return [client_registry.get_async_openai_client() for _ in range(3)] + [client_registry.get_ollama_async_client()]
+
+    first_loop = asyncio.run(get_clients())
+    second_loop = asyncio.run(get_clients())
+
+    assert all(client is first_loop[0] for client in first_loop[:3])
+    # A client opened on a loop that has since closed is never handed to another loop
+    assert second_loop[0] is not first_loop[0]
+    assert second_loop[3] is not first_loop[3]
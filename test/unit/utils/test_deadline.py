@@ -0,0 +1,185 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import httpx
+import openai
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils import deadline
+from src.utils.deadline import DeadlineExceeded
+from src.utils.hedging import Hedging
+from src.utils.ChatBot import ChatBot
+from src.core.Agent import Agent
+from src.core.Constants import Llm
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+    monkeypatch.setattr(ChatBot, "backoff_base_s", 0.01)
+    ChatBot.set_request_coalescing(False)
+    yield
+    ChatBot.set_request_coalescing(True)
+    ChatBot.disable_hedging()
+
+
+def _completion(content="hello"):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+def test_nested_deadlines_only_shorten_the_budget():
+    assert deadline.remaining_s() is None
+    with deadline.deadline(10):
+        with deadline.deadline(60):
+            assert deadline.remaining_s() <= 10
+        with deadline.deadline(1):
+            assert deadline.remaining_s() <= 1
+        with deadline.deadline(None):
+            assert 1 < deadline.remaining_s() <= 10
+    assert deadline.remaining_s() is None
+
+
+def test_transient_errors_are_retried_with_backoff():
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=[_connection_error(), _connection_error(), _completion()])
+        response, _ = ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+
+    assert response == "hello"
+    assert client.chat.completions.create.call_count == 3
+
+
+def test_non_transient_errors_are_not_retried():
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=ValueError("bad request"))
+        with pytest.raises(ValueError):
+            ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+    assert client.chat.completions.create.call_count == 1
+
+
+def test_deadline_caps_request_timeout_and_stops_retries(monkeypatch):
+    monkeypatch.setattr(ChatBot, "backoff_base_s", 5.0)
+    monkeypatch.setattr("src.utils.ChatBot.random.uniform", lambda low, high: high)
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=_connection_error())
+        with deadline.deadline(2.0):
+            with pytest.raises(DeadlineExceeded):
+                ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+
+    # The first backoff (5s) would outlast the 2s budget, so there is no second attempt
+    assert client.chat.completions.create.call_count == 1
+    assert 0 < client.chat.completions.create.call_args.kwargs["timeout"] <= 2.0
+
+
+def test_agent_timeout_applies_to_async_calls():
+    async def slow_create(**kwargs):
+        await asyncio.sleep(1)
+        return _completion()
+
+    agent = Agent(system_prompt="You are a test agent", response_type=None, llm_model=Llm.gpt_4o_mini)
+    with patch.object(ChatBot, "chatGptAsyncClient") as client:
+        client.chat.completions.create = slow_create
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(agent.achat_with_history([], timeout_s=0.1))
+    assert time.monotonic() - start < 0.5
+
+
+def test_slow_calls_are_hedged_after_p95_latency():
+    hedging = Hedging(min_samples=5)
+    for _ in range(5):
+        hedging.latencies.record("model", 0.02)
+
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(1)
+            is_first = len(calls) == 1
+        time.sleep(1.0 if is_first else 0.01)
+        return "first" if is_first else "hedge"
+
+    start = time.monotonic()
+    assert hedging.call("model", fn) == "hedge"
+    assert time.monotonic() - start < 0.5
+    assert hedging.get_stats() == {"calls": 1, "hedged_calls": 1, "hedge_wins": 1}
+
+
+def test_hedged_calls_are_not_capped_by_a_worker_pool():
+    hedging = Hedging(min_samples=1)
+    hedging.latencies.record("model", 5.0)
+    num_calls = 50
+    barrier = threading.Barrier(num_calls, timeout=5)
+
+    def fn():
+        # Only returns once every call is running at the same time
+        barrier.wait()
+        return "done"
+
+    threads = [threading.Thread(target=lambda: hedging.call("model", fn)) for _ in range(num_calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not barrier.broken
+
+
+def test_hedge_is_not_started_when_the_primary_finishes_first():
+    hedging = Hedging(min_samples=5)
+    for _ in range(5):
+        hedging.latencies.record("model", 0.05)
+    calls = []
+    assert hedging.call("model", lambda: calls.append(1) or "done") == "done"
+    time.sleep(0.1)
+    assert len(calls) == 1
+    assert hedging.get_stats() == {"calls": 1, "hedged_calls": 0, "hedge_wins": 0}
+
+
+def test_no_hedging_until_enough_latency_samples():
+    hedging = Hedging(min_samples=5)
+    calls = []
+    assert hedging.call("model", lambda: calls.append(1) or "done") == "done"
+    assert len(calls) == 1
+    assert hedging.get_stats()["hedged_calls"] == 0
+
+
+def test_async_hedge_cancels_the_slower_call():
+    hedging = Hedging(min_samples=1)
+    hedging.latencies.record("model", 0.02)
+    cancelled = []
+    attempts = []
+
+    async def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "first"
+        return "hedge"
+
+    async def run():
+        result = await hedging.call_async("model", fn)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == "hedge"
+    assert cancelled == [1]
@@ -0,0 +1,90 @@
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils import json_repair
+from src.utils.ChatBot import ChatBot
+from src.core.Constants import Llm
+from src.core.ResponseTypes import ChatResponse
+
+
+@dataclass
+class Scored:
+    name: str
+    score: int
+    note: Optional[str]
+    tone: str = field(default="neutral")
+    confident: bool = field(default=False, metadata={"default": True})
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+    ChatBot.json_repair_stats.reset()
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('```json\n{"hidden_thought_process": "x", "response": "hi", "off_switch": false,}\n```', ChatResponse("x", "hi", False)),
+    ('{"hidden_thought_process": "x", "response": "He said "hi" to me", "off_switch": false}', ChatResponse("x", 'He said "hi" to me', False)),
+    ('{"hidden_thought_process": "x", "response": "line1\nline2", "off_switch": "true"}', ChatResponse("x", "line1\nline2", True)),
+    ('{"hidden_thought_process": "x", "response": "cut off", "off_switch": False', ChatResponse("x", "cut off", False)),
+    ('Sure! {"hidden_thought_process": "x", "response": "a", "off_switch": true} Hope that helps {', ChatResponse("x", "a", True)),
+])
+def test_repairs_common_llm_formatting_slips(raw, expected):
+    response, repaired_raw = json_repair.repair_llm_response(raw, ChatResponse)
+    assert response == expected
+    assert json_repair.repair_llm_response(repaired_raw, ChatResponse)[0] == expected
+
+
+def test_fills_missing_fields_and_coerces_strings():
+    response, _ = json_repair.repair_llm_response('{"name": "a", "score": "7"}', Scored)
+    assert response == Scored(name="a", score=7, note=None, tone="neutral", confident=True)
+
+    responses, _ = json_repair.repair_llm_response('[{"name": "a", "score": 1, "note": null},]', List[Scored])
+    assert [r.name for r in responses] == ["a"]
+
+
+def test_missing_required_field_is_not_invented():
+    with pytest.raises(Exception):
+        json_repair.repair_llm_response('{"hidden_thought_process": "x", "response": "trunc', ChatResponse)
+
+
+def test_call_llm_repairs_instead_of_recalling():
+    malformed = '{"hidden_thought_process": "x", "response": "hi", "off_switch": "false",}'
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=_completion(malformed))
+        response, _ = ChatBot.call_llm([{"role": "user", "content": "Hi"}], ChatResponse, Llm.gpt_4o_mini)
+
+    assert response == ChatResponse("x", "hi", False)
+    assert client.chat.completions.create.call_count == 1
+    assert ChatBot.json_repair_stats.repairs == 1
+    assert ChatBot.json_repair_stats.tokens_saved == 15
+
+
+def test_native_json_mode_only_for_dataclass_responses_on_supported_models():
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=_completion('{"hidden_thought_process": "x", "response": "hi", "off_switch": false}'))
+        ChatBot.call_llm([{"role": "user", "content": "Hi"}], ChatResponse, Llm.gpt_4o_mini)
+        assert client.chat.completions.create.call_args.kwargs["response_format"] == {"type": "json_object"}
+
+        ChatBot.call_llm([{"role": "user", "content": "Hi"}], ChatResponse, Llm.o1)
+        assert "response_format" not in client.chat.completions.create.call_args.kwargs
+
+        ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+        assert "response_format" not in client.chat.completions.create.call_args.kwargs
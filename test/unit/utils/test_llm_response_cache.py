@@ -0,0 +1,177 @@
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils.llm_response_cache import LlmResponseCache
+from src.utils.ChatBot import ChatBot
+from src.core.Constants import Llm
+from src.core.ResponseTypes import ChatResponse
+from src.core.TokenTracking import TokenCount, aggregate_token_counts
+
+
+MESSAGES = [{"role": "system", "content": "Be nice."}, {"role": "user", "content": "Hi"}]
+CHAT_RESPONSE_JSON = '{"hidden_thought_process": "calm", "response": "Hello there", "off_switch": false}'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LlmResponseCache(cache_file=tmp_path / "cache.sqlite", max_entries=3)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def chatbot_cache(tmp_path, monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+    cache = ChatBot.enable_response_cache(cache_file=tmp_path / "chatbot_cache.sqlite")
+    yield cache
+    ChatBot.disable_response_cache()
+
+
+def test_key_depends_on_model_messages_and_response_type():
+    key = LlmResponseCache.make_key(Llm.gpt_4o_mini, MESSAGES, ChatResponse)
+    assert key == LlmResponseCache.make_key(Llm.gpt_4o_mini, [dict(m) for m in MESSAGES], ChatResponse)
+    assert key != LlmResponseCache.make_key(Llm.gpt_4o, MESSAGES, ChatResponse)
+    assert key != LlmResponseCache.make_key(Llm.gpt_4o_mini, MESSAGES, None)
+    assert key != LlmResponseCache.make_key(Llm.gpt_4o_mini, MESSAGES[:1], ChatResponse)
+
+
+def test_key_ignores_insignificant_whitespace():
+    padded = [{"role": "system", "content": "Be nice.\r\n"}, {"role": "user", "content": "  Hi"}]
+    assert LlmResponseCache.make_key(Llm.gpt_4o_mini, MESSAGES, None) == LlmResponseCache.make_key(Llm.gpt_4o_mini, padded, None)
+
+
+def test_get_returns_original_token_count_marked_cached(cache):
+    original = TokenCount.create(Llm.gpt_4o_mini, 100, 20, cached_input_tokens=64)
+    cache.put("k", "response text", original)
+
+    response, token_count = cache.get("k")
+    assert response == "response text"
+    assert token_count.input_tokens == 100
+    assert token_count.output_tokens == 20
+    assert token_count.cached_input_tokens == 64
+    assert token_count.cost == original.cost
+    assert token_count.cached is True
+    assert cache.get("missing") is None
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_lru_eviction_keeps_recently_used(cache):
+    token_count = TokenCount.create(Llm.gpt_4o_mini, 1, 1)
+    for key in ["a", "b", "c"]:
+        cache.put(key, key, token_count)
+        time.sleep(0.01)
+    cache.get("a")  # refresh "a" so "b" is the least recently used
+    cache.put("d", "d", token_count)
+
+    assert len(cache) == 3
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = LlmResponseCache(cache_file=tmp_path / "ttl.sqlite", ttl_seconds=0.0)
+    cache.put("k", "v", TokenCount.create(Llm.gpt_4o_mini, 1, 1))
+    time.sleep(0.01)
+    assert cache.get("k") is None
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = tmp_path / "persist.sqlite"
+    first = LlmResponseCache(cache_file=path)
+    first.put("k", "v", TokenCount.create(Llm.gpt_4o_mini, 1, 1))
+    first.close()
+    second = LlmResponseCache(cache_file=path)
+    assert second.get("k")[0] == "v"
+    second.close()
+
+
+def test_cache_files_without_cached_input_tokens_are_upgraded(tmp_path):
+    import sqlite3
+    path = tmp_path / "old.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, input_tokens INTEGER NOT NULL, "
+        "output_tokens INTEGER NOT NULL, cost REAL NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO responses VALUES ('k', ?, 'v', 10, 2, 0.0, ?, ?)", (Llm.gpt_4o_mini.value, time.time(), time.time()))
+    conn.commit()
+    conn.close()
+
+    cache = LlmResponseCache(cache_file=path)
+    assert cache.get("k")[1].cached_input_tokens == 0
+    cache.close()
+
+
+def test_cached_token_counts_do_not_add_cost():
+    live = TokenCount.create(Llm.gpt_4o_mini, 1000, 1000)
+    cached = TokenCount.create(Llm.gpt_4o_mini, 1000, 1000)
+    cached.cached = True
+    assert aggregate_token_counts([live, cached]) == live.cost
+
+
+def test_call_llm_serves_repeat_requests_from_cache(chatbot_cache):
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=CHAT_RESPONSE_JSON))])
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=completion)
+        first, first_tokens = ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+        second, second_tokens = ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+
+    assert client.chat.completions.create.call_count == 1
+    assert first == second
+    assert first_tokens.cached is False
+    assert second_tokens.cached is True
+    assert chatbot_cache.get_stats()["hits"] == 1
+
+
+def test_call_llm_does_not_cache_unparseable_responses(chatbot_cache):
+    bad = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="oops"))])
+    good = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=CHAT_RESPONSE_JSON))])
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=[bad, good])
+        ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+
+    assert len(chatbot_cache) == 1
+    cached_response, _ = chatbot_cache.get(LlmResponseCache.make_key(Llm.gpt_4o_mini, MESSAGES, ChatResponse))
+    assert cached_response == CHAT_RESPONSE_JSON
+
+
+def test_fallback_responses_are_cached_under_the_fallback_model(chatbot_cache):
+    bad = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="oops"))])
+    good = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=CHAT_RESPONSE_JSON))])
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=[bad, good])
+        ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini, fallback_model=Llm.gpt_4o)
+
+    assert client.chat.completions.create.call_args.kwargs["model"] == Llm.gpt_4o.value
+    assert chatbot_cache.get(LlmResponseCache.make_key(Llm.gpt_4o_mini, MESSAGES, ChatResponse)) is None
+    cached_response, _ = chatbot_cache.get(LlmResponseCache.make_key(Llm.gpt_4o, MESSAGES, ChatResponse))
+    assert cached_response == CHAT_RESPONSE_JSON
+
+
+def test_rerun_that_escalates_again_is_served_from_the_fallback_cache_entry(chatbot_cache):
+    bad = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="oops"))])
+    good = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=CHAT_RESPONSE_JSON))])
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=[bad, good, bad])
+        first, _ = ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini, fallback_model=Llm.gpt_4o)
+        second, second_tokens = ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini, fallback_model=Llm.gpt_4o)
+
+    # The rerun still asks the primary model, but not the fallback model again
+    assert client.chat.completions.create.call_count == 3
+    assert second == first
+    assert second_tokens.cached is True
@@ -0,0 +1,107 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils.ChatBot import ChatBot
+from src.utils.llm_transcript import LatencyModel, LlmTranscript, TranscriptMissError, TranscriptMode
+from src.core.Constants import Llm
+from src.core.ResponseTypes import ChatResponse
+from src.core.TokenTracking import TokenCount
+
+
+MESSAGES = [{"role": "system", "content": "Be nice."}, {"role": "user", "content": "Hi"}]
+CHAT_RESPONSE_JSON = '{"hidden_thought_process": "calm", "response": "Hello there", "off_switch": false}'
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+    yield
+    ChatBot.clear_transcript()
+
+
+def _record(path: Path, responses):
+    transcript = LlmTranscript(path, TranscriptMode.record)
+    for response in responses:
+        transcript.record(Llm.gpt_4o_mini, MESSAGES, response, TokenCount.create(Llm.gpt_4o_mini, 10, 5), latency_s=0.02)
+    return transcript
+
+
+def test_record_then_replay_round_trip(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    _record(path, ["first"])
+
+    replay = LlmTranscript(path, TranscriptMode.replay)
+    response, token_count = replay.replay(Llm.gpt_4o_mini, MESSAGES)
+    assert response == "first"
+    assert token_count.input_tokens == 10 and token_count.output_tokens == 5
+
+
+def test_replay_cycles_through_repeated_requests_in_order(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    _record(path, ["first", "second"])
+
+    replay = LlmTranscript(path, TranscriptMode.replay)
+    assert [replay.replay(Llm.gpt_4o_mini, MESSAGES)[0] for _ in range(3)] == ["first", "second", "first"]
+
+
+def test_replay_miss_raises(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    _record(path, ["first"])
+    replay = LlmTranscript(path, TranscriptMode.replay)
+    with pytest.raises(TranscriptMissError):
+        replay.replay(Llm.gpt_4o, MESSAGES)
+
+
+def test_replay_skips_truncated_last_line(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    _record(path, ["first"])
+    with open(path, "a") as f:
+        f.write('{"request_hash": "abc", "mod')
+    replay = LlmTranscript(path, TranscriptMode.replay)
+    assert replay.replay(Llm.gpt_4o_mini, MESSAGES)[0] == "first"
+
+
+def test_latency_models(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    _record(path, ["first"])
+
+    assert LlmTranscript(path, TranscriptMode.replay).get_replay_delay() == 0.0
+    assert LlmTranscript(path, TranscriptMode.replay, LatencyModel.fixed(0.5)).get_replay_delay() == 0.5
+    assert LlmTranscript(path, TranscriptMode.replay, LatencyModel.sampled(seed=1)).get_replay_delay() == pytest.approx(0.02)
+
+    replay = LlmTranscript(path, TranscriptMode.replay, LatencyModel.fixed(0.05))
+    start = time.monotonic()
+    replay.replay(Llm.gpt_4o_mini, MESSAGES)
+    assert time.monotonic() - start >= 0.05
+
+
+def test_chatbot_records_then_replays_without_network(tmp_path):
+    path = tmp_path / "transcript.jsonl"
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=CHAT_RESPONSE_JSON))])
+
+    ChatBot.set_transcript(path, TranscriptMode.record)
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=completion)
+        recorded, _ = ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+
+    ChatBot.set_transcript(path, TranscriptMode.replay)
+    with patch.object(ChatBot, "chatGptClient") as client, patch.object(ChatBot, "chatGptAsyncClient") as async_client:
+        replayed, _ = ChatBot.call_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+        replayed_async, _ = asyncio.run(ChatBot.call_llm_async(MESSAGES, ChatResponse, Llm.gpt_4o_mini))
+        client.chat.completions.create.assert_not_called()
+        async_client.chat.completions.create.assert_not_called()
+
+    assert recorded == replayed == replayed_async
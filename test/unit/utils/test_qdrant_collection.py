@@ -34,6 +34,7 @@ def mock_embeddings(monkeypatch):
 
     monkeypatch.setattr(VectorUtils, "get_dimensions_of_model", fake_dim)
     monkeypatch.setattr(VectorUtils, "get_embedding", fake_embed)
+    monkeypatch.setattr(VectorUtils, "get_embeddings", lambda texts, model=VectorUtils.text_embedding_3_small, dimensions=None: [fake_embed(text) for text in texts])
     yield
 
 
@@ -184,6 +185,7 @@ def test_flexible_dimension_handling(test_dim, monkeypatch):
 
     monkeypatch.setattr(VectorUtils, "get_dimensions_of_model", fake_dim)
     monkeypatch.setattr(VectorUtils, "get_embedding", fake_embed)
+    monkeypatch.setattr(VectorUtils, "get_embeddings", lambda texts, model=VectorUtils.text_embedding_3_small, dimensions=None: [fake_embed(text) for text in texts])
 
     name = f"test_q_{uuid.uuid4().hex[:12]}"
     col = QdrantCollection(name)
@@ -0,0 +1,139 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import httpx
+import openai
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils import deadline
+from src.utils.deadline import DeadlineExceeded
+from src.utils.ChatBot import ChatBot
+from src.utils.rate_limiter import ModelRateLimiter, RateLimit
+from src.core.Constants import Llm
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _rate_limit_error(headers):
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+    yield
+    ChatBot.disable_rate_limiter()
+
+
+def test_request_budget_spaces_out_requests():
+    # 600 RPM = 10 per second; a 0.1s burst allows a single request at a time
+    limiter = ModelRateLimiter(RateLimit(requests_per_minute=600), burst_seconds=0.1)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire(estimated_tokens=0)
+    assert time.monotonic() - start >= 0.18
+    assert limiter.get_stats()["throttled_requests"] == 2
+
+
+def test_token_budget_includes_recorded_output_tokens():
+    # 6000 TPM = 100 tokens per second, bucket of 100 tokens
+    limiter = ModelRateLimiter(RateLimit(tokens_per_minute=6000), burst_seconds=1.0)
+    limiter.acquire(estimated_tokens=50)
+    limiter.record_usage(50)
+    start = time.monotonic()
+    limiter.acquire(estimated_tokens=20)
+    assert time.monotonic() - start >= 0.15
+
+
+def test_waiters_are_served_in_arrival_order():
+    limiter = ModelRateLimiter(RateLimit(requests_per_minute=1200), burst_seconds=0.05)
+    limiter.acquire(0)  # Drain the bucket so the threads below have to queue
+    order = []
+
+    def worker(i):
+        limiter.acquire(0)
+        order.append(i)
+
+    threads = []
+    for i in range(5):
+        thread = threading.Thread(target=worker, args=(i,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    assert order == list(range(5))
+
+
+def test_async_acquire_respects_budget():
+    limiter = ModelRateLimiter(RateLimit(requests_per_minute=600), burst_seconds=0.1)
+
+    async def run():
+        await asyncio.gather(*[limiter.acquire_async(0) for _ in range(3)])
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - start >= 0.18
+
+
+def test_acquire_gives_up_when_the_wait_outlasts_the_deadline():
+    # 60 RPM with a one-request bucket: the second request would wait a second
+    limiter = ModelRateLimiter(RateLimit(requests_per_minute=60), burst_seconds=1.0)
+    limiter.acquire(0)
+    start = time.monotonic()
+    with deadline.deadline(0.2):
+        with pytest.raises(DeadlineExceeded):
+            limiter.acquire(0)
+    assert time.monotonic() - start < 0.1
+    assert limiter.get_stats()["queued"] == 0
+
+
+def test_queued_waiter_gives_up_at_its_deadline():
+    limiter = ModelRateLimiter(RateLimit(requests_per_minute=60), burst_seconds=1.0)
+    limiter.acquire(0)
+    # Next in line (without a deadline) for about a second, so the waiter behind it can't know how long it waits
+    head = threading.Thread(target=lambda: limiter.acquire(0))
+    head.start()
+    time.sleep(0.05)
+
+    async def run():
+        with deadline.deadline(0.1):
+            await limiter.acquire_async(0)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert time.monotonic() - start < 0.5
+    head.join()
+
+
+def test_call_llm_honors_retry_after_and_succeeds():
+    ChatBot.enable_rate_limiter({Llm.gpt_4o_mini: RateLimit(requests_per_minute=10_000)})
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=[_rate_limit_error({"retry-after-ms": "100"}), _completion("hello")])
+        start = time.monotonic()
+        response, _ = ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+
+    assert response == "hello"
+    assert time.monotonic() - start >= 0.1
+    assert ChatBot.rate_limiter.get_stats()[Llm.gpt_4o_mini.value]["rate_limit_errors"] == 1
+
+
+def test_retry_after_falls_back_to_exponential_backoff():
+    assert ChatBot._get_retry_after(_rate_limit_error({"retry-after": "3"}), attempt=0) == 3.0
+    assert ChatBot._get_retry_after(_rate_limit_error({}), attempt=2) == 4.0
@@ -0,0 +1,231 @@
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils import deadline
+from src.utils.deadline import DeadlineExceeded
+from src.utils.single_flight import SingleFlight
+from src.utils.ChatBot import ChatBot
+from src.utils.QdrantCollection import QdrantCollection
+from src.utils import VectorUtils
+from src.core.Constants import Llm
+
+
+def _slow(result, calls, delay=0.1):
+    def fn():
+        calls.append(1)
+        time.sleep(delay)
+        return result
+    return fn
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+    yield
+    ChatBot.set_request_coalescing(True)
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: flight.do("key", _slow("value", calls)), range(8)))
+
+    assert len(calls) == 1
+    assert all(result == "value" for result, _ in results)
+    assert sum(shared for _, shared in results) == 7
+
+
+def test_errors_propagate_to_all_waiters_and_nothing_is_cached():
+    flight = SingleFlight()
+    barrier = threading.Barrier(3)
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    def call(_):
+        barrier.wait()
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        assert list(executor.map(call, range(3))) == ["boom"] * 3
+    assert flight.do("key", lambda: "later") == ("later", False)
+
+
+def test_disabled_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    calls = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: flight.do("key", _slow("value", calls, delay=0.05)), range(4)))
+    assert len(calls) == 4
+
+
+def test_async_calls_are_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*[flight.do_async("key", fetch) for _ in range(10)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["value"] * 10
+
+
+def test_chatbot_coalesces_identical_requests_and_marks_waiters_cached():
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))])
+
+    def slow_create(**kwargs):
+        time.sleep(0.1)
+        return completion
+
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=slow_create)
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini), range(5)))
+
+    assert client.chat.completions.create.call_count == 1
+    assert all(response == "hello" for response, _ in results)
+    assert sum(token_count.cached for _, token_count in results) == 4
+
+
+def test_chatbot_coalescing_can_be_disabled():
+    ChatBot.set_request_coalescing(False)
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))])
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=lambda **kwargs: (time.sleep(0.05), completion)[1])
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda _: ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini), range(3)))
+    assert client.chat.completions.create.call_count == 3
+
+
+def _wait_for_stat(flight, stat, count):
+    """Block until flight's stat reaches count (e.g. until every waiter has joined the leader's call)"""
+    for _ in range(1000):
+        if flight.get_stats()[stat] >= count:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"{stat} only reached {flight.get_stats()[stat]} of {count}")
+
+
+def test_embeddings_are_coalesced(monkeypatch):
+    from src.utils.QdrantCollection import EMBEDDING_SINGLE_FLIGHT
+    calls = []
+    release = threading.Event()
+
+    def get_embedding(text, model=None):
+        calls.append(1)
+        release.wait(10)
+        return [0.1, 0.2]
+
+    monkeypatch.setattr(VectorUtils, "get_embedding", get_embedding)
+    collection = QdrantCollection("single_flight_test")
+    collection.embedding_cache = Mock(get=Mock(return_value=None))
+
+    coalesced_calls = EMBEDDING_SINGLE_FLIGHT.get_stats()["coalesced_calls"]
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [executor.submit(collection._get_embedding, "same search text") for _ in range(6)]
+        # The leader blocks until every other caller is waiting on its call
+        _wait_for_stat(EMBEDDING_SINGLE_FLIGHT, "coalesced_calls", coalesced_calls + 5)
+        release.set()
+        embeddings = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert embeddings == [[0.1, 0.2]] * 6
+
+
+def test_waiters_time_out_on_their_own_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(flight.do, "key", lambda: release.wait() and "value")
+        _wait_for_stat(flight, "leader_calls", 1)
+        start = time.monotonic()
+        with deadline.deadline(0.05):
+            with pytest.raises(DeadlineExceeded):
+                flight.do("key", lambda: "own call")
+        assert time.monotonic() - start < 1
+        release.set()
+        assert leader.result() == ("value", False)
+
+
+def test_leader_deadline_is_not_passed_to_waiters():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def leader_fn():
+        calls.append("leader")
+        release.wait(10)
+        raise DeadlineExceeded("leader's deadline")
+
+    def waiter_fn():
+        calls.append("waiter")
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", leader_fn)
+        _wait_for_stat(flight, "leader_calls", 1)
+        waiter = executor.submit(flight.do, "key", waiter_fn)
+        _wait_for_stat(flight, "coalesced_calls", 1)
+        release.set()
+        with pytest.raises(DeadlineExceeded):
+            leader.result()
+        # The waiter re-tried as the new leader
+        assert waiter.result() == ("value", False)
+    assert calls == ["leader", "waiter"]
+
+
+def test_async_waiters_time_out_and_retry_on_their_own_deadline():
+    flight = SingleFlight()
+    calls = []
+
+    async def leader_fn():
+        calls.append("leader")
+        await asyncio.sleep(0.1)
+        raise DeadlineExceeded("leader's deadline")
+
+    async def waiter_fn():
+        calls.append("waiter")
+        return "value"
+
+    async def impatient_waiter():
+        with deadline.deadline(0.01):
+            with pytest.raises(DeadlineExceeded):
+                await flight.do_async("key", waiter_fn)
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do_async("key", leader_fn))
+        await asyncio.sleep(0)
+        await impatient_waiter()
+        result = await flight.do_async("key", waiter_fn)
+        with pytest.raises(DeadlineExceeded):
+            await leader
+        return result
+
+    assert asyncio.run(run()) == ("value", False)
+    assert calls == ["leader", "waiter"]
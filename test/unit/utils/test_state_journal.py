@@ -0,0 +1,114 @@
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.core.ChatMessage import ChatMessage
+from src.core.Constants import Role
+from src.core.ConversationMemory import ConversationMemoryState
+from src.utils import io_utils
+from src.utils.state_journal import StateJournal, get_journal_path, replay_journal
+
+
+@dataclass
+class _State:
+    conversation_memory: ConversationMemoryState
+    user_prompt_wrapper: str
+    notes: List[str] = field(default_factory=list)
+
+
+def _message(i: int) -> ChatMessage:
+    return ChatMessage(role=Role.user if i % 2 == 0 else Role.assistant, content=f"message {i}", cot=None, off_switch=False)
+
+
+def _save(state: _State, journal: StateJournal, path: Path) -> None:
+    # What the NPCs do in _save_state
+    if not journal.append_changes(state):
+        io_utils.save_to_yaml_file(state, path)
+        journal.reset(state)
+
+
+def _load(path: Path) -> _State:
+    return replay_journal(io_utils.load_yaml_into_dataclass(path, _State), path)
+
+
+def _new_state() -> _State:
+    return _State(conversation_memory=ConversationMemoryState(chat_memory=[], conversation_summary=None), user_prompt_wrapper="{message}")
+
+
+def test_saves_append_deltas_that_replay_onto_the_snapshot(tmp_path):
+    path = tmp_path / "state.yaml"
+    journal = StateJournal(path, compact_every=50)
+    state = _new_state()
+    _save(state, journal, path)
+    snapshot = path.read_text()
+
+    chat_memory = state.conversation_memory.chat_memory
+    for i in range(6):
+        chat_memory.append(_message(i))
+        _save(state, journal, path)
+    # Trimmed by a copy (as after summarization), plus a changed leaf and a replaced list
+    state.conversation_memory.chat_memory = chat_memory[4:] + [_message(6)]
+    state.user_prompt_wrapper = "Say: {message}"
+    state.notes = ["a note"]
+    _save(state, journal, path)
+
+    assert path.read_text() == snapshot
+    entries = [json.loads(line) for line in get_journal_path(path).read_text().splitlines()[1:]]
+    assert len(entries) == 7
+    # Each save only carries the new message
+    assert entries[2]["changes"] == [{"path": ["conversation_memory", "chat_memory"], "drop": 0, "append": [{"role": "user", "cot": None, "content": "message 2", "off_switch": False}]}]
+    assert {"path": ["conversation_memory", "chat_memory"], "drop": 4, "append": [{"role": "user", "cot": None, "content": "message 6", "off_switch": False}]} in entries[6]["changes"]
+
+    loaded = _load(path)
+    assert [m.content for m in loaded.conversation_memory.chat_memory] == ["message 4", "message 5", "message 6"]
+    assert loaded.user_prompt_wrapper == "Say: {message}"
+    assert loaded.notes == ["a note"]
+
+
+def test_compacts_into_a_snapshot_every_n_saves(tmp_path):
+    path = tmp_path / "state.yaml"
+    journal = StateJournal(path, compact_every=3)
+    state = _new_state()
+    for i in range(5):
+        state.conversation_memory.chat_memory.append(_message(i))
+        _save(state, journal, path)
+
+    # Save 1 is a snapshot, saves 2-4 are journaled, save 5 compacts
+    assert len(get_journal_path(path).read_text().splitlines()) == 1
+    assert len(io_utils.load_yaml_into_dataclass(path, _State).conversation_memory.chat_memory) == 5
+    assert len(_load(path).conversation_memory.chat_memory) == 5
+
+
+def test_truncated_last_entry_is_ignored(tmp_path):
+    path = tmp_path / "state.yaml"
+    journal = StateJournal(path)
+    state = _new_state()
+    _save(state, journal, path)
+    for i in range(3):
+        state.conversation_memory.chat_memory.append(_message(i))
+        _save(state, journal, path)
+
+    journal_path = get_journal_path(path)
+    journal_path.write_text(journal_path.read_text()[:-20])
+
+    assert [m.content for m in _load(path).conversation_memory.chat_memory] == ["message 0", "message 1"]
+
+
+def test_journal_of_an_older_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "state.yaml"
+    journal = StateJournal(path)
+    state = _new_state()
+    _save(state, journal, path)
+    state.conversation_memory.chat_memory.append(_message(0))
+    _save(state, journal, path)
+    # A full save without journaling (the journal already holds message 0, so replaying it would duplicate it)
+    io_utils.save_to_yaml_file(state, path)
+
+    assert [m.content for m in _load(path).conversation_memory.chat_memory] == ["message 0"]
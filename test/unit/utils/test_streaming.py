@@ -0,0 +1,130 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.utils.ChatBot import ChatBot
+from src.utils.llm_utils import StreamingFieldExtractor
+from src.core.Constants import Llm, Role
+from src.core.ResponseTypes import ChatResponse
+from src.npcs.npc0.npc0 import NPC0
+
+
+CHAT_RESPONSE_JSON = '{"hidden_thought_process": "say \\"response\\": no", "response": "Hello \\"friend\\", caf\\u00e9!", "off_switch": false}'
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+def _chunks(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _stream_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class _AsyncChunkStream:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def mock_token_counting(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", lambda messages, model: 10)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", lambda text, model: 5)
+
+
+@pytest.fixture
+def mock_streaming_openai():
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=iter([_stream_chunk(c) for c in _chunks(CHAT_RESPONSE_JSON, 4)]))
+        yield client
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8, 1000])
+def test_extractor_yields_only_the_response_field(chunk_size):
+    extractor = StreamingFieldExtractor("response")
+    text = "".join(extractor.feed(chunk) for chunk in _chunks("```json\n" + CHAT_RESPONSE_JSON + "\n```", chunk_size))
+    assert text == 'Hello "friend", café!'
+    assert extractor.field_complete
+
+
+def test_extractor_handles_surrogate_pairs_and_nested_values():
+    extractor = StreamingFieldExtractor("response")
+    raw = '{"meta": {"response": "nested"}, "list": ["response"], "response": "hi \\ud83d\\ude00"}'
+    assert "".join(extractor.feed(chunk) for chunk in _chunks(raw, 2)) == "hi \U0001F600"
+
+
+def test_stream_llm_yields_incrementally_and_parses(mock_streaming_openai):
+    stream = ChatBot.stream_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+    pieces = list(stream)
+
+    assert len(pieces) > 1
+    assert "".join(pieces) == 'Hello "friend", café!'
+    assert isinstance(stream.response, ChatResponse)
+    assert stream.response.response == "".join(pieces)
+    assert stream.token_count.input_tokens == 10
+    assert mock_streaming_openai.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+def test_astream_llm_matches_sync_stream():
+    with patch.object(ChatBot, "chatGptAsyncClient") as client:
+        client.chat.completions.create = AsyncMock(return_value=_AsyncChunkStream([_stream_chunk(c) for c in _chunks(CHAT_RESPONSE_JSON, 5)]))
+
+        async def run():
+            stream = ChatBot.astream_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+            pieces = [piece async for piece in stream]
+            return pieces, stream.response
+
+        pieces, response = asyncio.run(run())
+
+    assert "".join(pieces) == 'Hello "friend", café!'
+    assert response.off_switch is False
+
+
+def test_unparseable_stream_falls_back_and_keeps_emitted_text():
+    broken = '{"hidden_thought_process": "x", "response": "Partial answer", "off_switch": maybe'
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(side_effect=[
+            iter([_stream_chunk(c) for c in _chunks(broken, 6)]),
+            _completion('{"hidden_thought_process": "y", "response": "Other words", "off_switch": true}'),
+        ])
+        stream = ChatBot.stream_llm(MESSAGES, ChatResponse, Llm.gpt_4o_mini)
+        pieces = list(stream)
+
+    assert "".join(pieces) == "Partial answer"
+    assert stream.response.response == "Partial answer"
+    assert stream.response.off_switch is True
+    assert stream.token_count.input_tokens == 20
+
+
+def test_npc_records_streamed_response_when_exhausted(mock_streaming_openai):
+    npc = NPC0(system_prompt="You are a test NPC.")
+    stream = npc.chat_stream("Hi")
+    assert [m.role for m in npc.message_history] == [Role.user]
+
+    text = "".join(stream)
+
+    assert npc.message_history[-1].role == Role.assistant
+    assert npc.message_history[-1].content == text
+    assert npc.response_agent.last_token_count is stream.token_count
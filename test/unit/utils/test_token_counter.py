@@ -0,0 +1,102 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure src/ is on sys.path
+PROJ_ROOT = Path(__file__).resolve().parents[3]
+if str(PROJ_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJ_ROOT))
+
+from src.core.Constants import Llm
+from src.utils import token_counter
+from src.utils.ChatBot import ChatBot
+
+
+class WordEncoding:
+    """Stands in for tiktoken (whose encodings need a download): one token per word, and counts encode calls"""
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return text.split()
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    word_encoding = WordEncoding()
+    monkeypatch.setattr(token_counter, "_get_encoding", lambda encoding_name: word_encoding)
+    token_counter._count_tokens_for_message.cache_clear()
+    yield word_encoding
+    token_counter._count_tokens_for_message.cache_clear()
+
+
+def test_only_new_messages_are_encoded(encoding):
+    history = [{"role": "system", "content": "You are a test agent"}, {"role": "user", "content": "Hi there"}]
+    first_count = token_counter.count_tokens_for_messages(history, Llm.gpt_4o_mini)
+    assert first_count == 2 * token_counter.TOKENS_PER_MESSAGE + (1 + 5) + (1 + 2) + token_counter.TOKENS_PER_REPLY
+
+    encoding.encoded.clear()
+    history += [{"role": "assistant", "content": "Hello"}, {"role": "user", "content": "How are you"}]
+    second_count = token_counter.count_tokens_for_messages(history, Llm.gpt_4o_mini)
+
+    assert encoding.encoded == ["assistant", "Hello", "user", "How are you"]
+    assert second_count == first_count + 2 * token_counter.TOKENS_PER_MESSAGE + (1 + 1) + (1 + 3)
+
+
+def test_provider_usage_is_used_instead_of_tokenizing(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    count_messages = Mock(return_value=10)
+    count_text = Mock(return_value=5)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", count_messages)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", count_text)
+
+    usage = SimpleNamespace(prompt_tokens=1234, completion_tokens=56, prompt_tokens_details=None)
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="hello"))], usage=usage)
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=completion)
+        _, token_count = ChatBot.call_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+
+    assert (token_count.input_tokens, token_count.output_tokens) == (1234, 56)
+    count_messages.assert_not_called()
+    count_text.assert_not_called()
+
+
+def test_streamed_usage_is_used_instead_of_tokenizing(monkeypatch):
+    from src.utils import ChatBot as chatbot_module
+    count_messages = Mock(return_value=10)
+    count_text = Mock(return_value=5)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_messages", count_messages)
+    monkeypatch.setattr(chatbot_module, "count_tokens_for_text", count_text)
+
+    usage = SimpleNamespace(prompt_tokens=1234, completion_tokens=56, prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="hel"))], usage=None),
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="lo"))], usage=None),
+        # With include_usage, the last chunk has no choices and carries the usage
+        SimpleNamespace(choices=[], usage=usage),
+    ]
+    with patch.object(ChatBot, "chatGptClient") as client:
+        client.chat.completions.create = Mock(return_value=iter(chunks))
+        stream = ChatBot.stream_llm([{"role": "user", "content": "Hi"}], None, Llm.gpt_4o_mini)
+        assert "".join(stream) == "hello"
+
+    assert client.chat.completions.create.call_args.kwargs["stream_options"] == {"include_usage": True}
+    assert (stream.token_count.input_tokens, stream.token_count.output_tokens, stream.token_count.cached_input_tokens) == (1234, 56, 1024)
+    count_messages.assert_not_called()
+    count_text.assert_not_called()
+
+
+def test_stream_fallback_keeps_cached_input_tokens():
+    from src.core.ResponseTypes import ChatResponse
+    from src.core.TokenTracking import TokenCount
+    streamed = TokenCount.create(Llm.gpt_4o_mini, 100, 10, cached_input_tokens=64)
+    fallback = TokenCount.create(Llm.gpt_4o_mini, 100, 20, cached_input_tokens=96)
+    response = ChatResponse(hidden_thought_process="", response="Hi", off_switch=False)
+
+    _, token_count, _ = ChatBot._merge_stream_fallback(response, fallback, streamed, "", "response")
+
+    assert (token_count.input_tokens, token_count.output_tokens, token_count.cached_input_tokens) == (200, 30, 160)